@@ -0,0 +1,182 @@
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    from .bombe import Rotor, decrypt_message, expand_unknowns, guess_offsets, score_plaintext
+    from .crib import drag_crib
+    from .mitm import guess_offsets_mitm
+    from .wordlist import load_word_list
+except ImportError:  # Running directly
+    from bombe import Rotor, decrypt_message, expand_unknowns, guess_offsets, score_plaintext
+    from crib import drag_crib
+    from mitm import guess_offsets_mitm
+    from wordlist import load_word_list
+
+
+# ------------------------- MICROBENCHMARKS -------------------------
+# Each benchmark times one hot-path function on its own and records the best of
+# `repeat` runs, so results are comparable between commits on the same machine:
+#
+#   python -m bombe.benchmark                 full sweep, JSON to stdout
+#   python -m bombe.benchmark quick out.json  smaller sweep, written to out.json
+#   python -m bombe.benchmark compare old.json new.json
+
+SAMPLE = ("the enemy will attack the northern bridge at dawn, hold the river crossing "
+          "until relieved and report all movement on the eastern road to headquarters. ")
+
+FULL = {"lengths": (64, 256, 1024), "dict_sizes": (10, 1000, 100_000),
+        "rotor_counts": (1, 2, 3), "deep_rotor_counts": (3, 4, 5, 6, 7, 8)}
+QUICK = {"lengths": (64, 256), "dict_sizes": (10, 1000),
+         "rotor_counts": (1, 2), "deep_rotor_counts": (3, 5, 8)}
+
+
+def _text(length: int) -> str:
+    return (SAMPLE * (length // len(SAMPLE) + 1))[:length]
+
+
+def _words(size: int) -> list[str]:
+    # Real words first, then reproducible filler
+    words = sorted(set(SAMPLE.replace(",", "").replace(".", "").split()))[:size]
+    rng = random.Random(size)
+    while len(words) < size:
+        words.append("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10))))
+    return words
+
+
+def _time(fn, repeat: int, number: int = 1) -> float:
+    # Best wall time of `repeat` runs, per call
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _calls_for(fn) -> int:
+    # Loop short calls enough times that one timed run takes ~50 ms
+    once = _time(fn, 1)
+    return max(1, int(0.05 / max(once, 1e-7)))
+
+
+def _record(results: list, bench: str, seconds: float, items: int = 1, **params) -> None:
+    results.append({"bench": bench, "params": params, "seconds": seconds,
+                    "per_second": items / seconds if seconds else None})
+
+
+def run_benchmarks(lengths=FULL["lengths"], dict_sizes=FULL["dict_sizes"],
+                   rotor_counts=FULL["rotor_counts"], deep_rotor_counts=FULL["deep_rotor_counts"],
+                   repeat: int = 3) -> dict:
+    """Run the whole sweep and return {"meta": ..., "results": [...]}.
+
+    Every result has the benchmark name, its parameters, the best time per
+    call in seconds and the matching rate ("per_second" counts candidates for
+    expand_unknowns and the searches, characters for the decrypts and drag_crib,
+    words for load_word_list). drag_crib runs on messages 1000 times each length.
+    """
+    results = []
+    rotors3 = [Rotor(3), Rotor(17), Rotor(9)]
+
+    for length in lengths:
+        ct = _text(length)
+        fn = lambda: decrypt_message(ct, rotors3, {'a': 'q', 'q': 'a'})
+        _record(results, "decrypt_message", _time(fn, repeat, _calls_for(fn)), length, length=length)
+
+        rotor = Rotor(11)
+        fn = lambda: rotor.decrypt(ct)
+        _record(results, "Rotor.decrypt", _time(fn, repeat, _calls_for(fn)), length, length=length)
+
+        for size in dict_sizes:
+            words = _words(size)
+            fn = lambda: score_plaintext(ct, words)
+            _record(results, "score_plaintext", _time(fn, repeat, _calls_for(fn)), 1,
+                    length=length, dict_size=size)
+
+        long_ct = _text(length * 1000)
+        fn = lambda: drag_crib(long_ct, "hold the river crossing", ['?', '?', '?'])
+        _record(results, "drag_crib", _time(fn, repeat), len(long_ct), length=len(long_ct))
+
+    # Opening an already compiled word list (the file is memory-mapped, not read)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in dict_sizes:
+            path = Path(tmp) / f"words{size}.txt"
+            path.write_text("\n".join(_words(size)))
+            load_word_list(path)
+            fn = lambda: load_word_list(path)
+            _record(results, "load_word_list", _time(fn, repeat, _calls_for(fn)), size, dict_size=size)
+
+    for n in rotor_counts:
+        pattern = ['?'] * n
+        fn = lambda: sum(1 for _ in expand_unknowns(pattern))
+        _record(results, "expand_unknowns", _time(fn, repeat, _calls_for(fn)), 26 ** n, rotors=n)
+
+        # End to end, on the shortest text so three rotors stay affordable
+        ct = _text(lengths[0])
+        for size in dict_sizes[:2]:
+            words = _words(size)
+            fn = lambda: guess_offsets(ct, pattern, {}, words, top_n=10, verbose=False)
+            _record(results, "guess_offsets", _time(fn, 1 if n >= 3 else repeat), 26 ** n,
+                    rotors=n, length=len(ct), dict_size=size)
+
+    ct = _text(lengths[0])
+    for n in deep_rotor_counts:
+        fn = lambda: guess_offsets_mitm(ct, ['?'] * n, {}, [], top_n=10, scorer="quadgram")
+        _record(results, "guess_offsets_mitm", _time(fn, 1), 26 ** n, rotors=n, length=len(ct))
+
+    return {"meta": _meta(), "results": results}
+
+
+def _meta() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "machine": platform.machine(),
+            "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def compare(old: dict, new: dict) -> list[tuple[str, dict, float, float, float]]:
+    # (bench, params, old seconds, new seconds, speedup) for benchmarks in both runs
+    before = {(r["bench"], json.dumps(r["params"], sort_keys=True)): r["seconds"] for r in old["results"]}
+    rows = []
+    for r in new["results"]:
+        key = (r["bench"], json.dumps(r["params"], sort_keys=True))
+        if key in before:
+            rows.append((r["bench"], r["params"], before[key], r["seconds"], before[key] / r["seconds"]))
+    return rows
+
+
+def main():
+    args = sys.argv[1:]
+
+    if args and args[0] == "compare":
+        if len(args) != 3:
+            print("Usage: benchmark.py compare OLD.json NEW.json")
+            sys.exit(1)
+        old, new = (json.loads(Path(p).read_text()) for p in args[1:])
+        for bench, params, before, after, speedup in compare(old, new):
+            shown = ", ".join(f"{k}={v}" for k, v in params.items())
+            print(f"{bench:<20} {shown:<36} {before:>10.6f}s -> {after:>10.6f}s  x{speedup:.2f}")
+        return
+
+    sweep = FULL
+    if args and args[0] == "quick":
+        sweep = QUICK
+        args = args[1:]
+    report = json.dumps(run_benchmarks(**sweep), indent=2)
+    if args:
+        Path(args[0]).write_text(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
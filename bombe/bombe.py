@@ -1,6 +1,32 @@
 #!/usr/bin/env python3
-from itertools import product
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import heapq
+import itertools
+import json
+import os
 import re
+import time
+
+try:
+    import numpy as np
+except ImportError:  # optional, only the vectorized search needs it
+    np = None
+
+try:
+    from .scoring import ENGLISH_LETTER_LOGP, SCORERS, WordScorer, chi_squared, make_scorer
+    from .wordlist import load_word_list
+    from .database import (CACHE_PATH, INDEX_PATH, init_checkpoints, init_results, close_db, save_checkpoint,
+                           load_checkpoint, clear_checkpoint, save_results, load_results, touch_results)
+except ImportError:  # Running directly
+    from scoring import ENGLISH_LETTER_LOGP, SCORERS, WordScorer, chi_squared, make_scorer
+    from wordlist import load_word_list
+    from database import (CACHE_PATH, INDEX_PATH, init_checkpoints, init_results, close_db, save_checkpoint,
+                          load_checkpoint, clear_checkpoint, save_results, load_results, touch_results)
+
+# Dictionary used when none is given; load_word_list() opens large word list files
+DEFAULT_DICTIONARY = ["THE", "AND", "TO", "OF", "YOU", "IS", "IN", "THAT", "IT", "FOR"]
+
 
 # ------------------------- ROTOR -------------------------
 class Rotor:
@@ -109,73 +135,1006 @@ def decrypt_message(ciphertext: str, rotors: list[Rotor], plugboard_map: dict) -
 
 
 # ------------------------- GUESSING UTILITIES -------------------------
-def expand_unknowns(pattern_list):
-    # pattern_list like ['?', '5', '?'] -> iterator of all tuples
-    iterables = []
-    for p in pattern_list:
-        if p == "?":
-            iterables.append(range(26))
+# A rotor pattern has one entry per rotor, rotor 1 first. Each entry is one or more
+# terms joined by "&", all of which must hold:
+#   ?           any offset                 7         just 7
+#   3-9         3 to 9 (24-2 wraps round)  {1,4,7}   any of these, ranges allowed inside
+#   !5, !{1,2}  anything but these
+#   >r1, <=r3   compared with another rotor's offset (r1 = rotor 1), +/- a constant: >r1+2
+#   =r1+1, !=r2 equal / not equal to another rotor's offset, mod 26
+# e.g. ['3-9', '{1,4,7}&!=r1', '>r1'] or, as typed, parse_pattern("3-9, {1,4,7}&!=r1, >r1")
+_RELATION_RE = re.compile(r"(<=|>=|!=|<|>|=)r(\d+)([+-]\d+)?")
+
+
+def _spec_terms(spec) -> list[str]:
+    return str(spec).replace(" ", "").split("&")
+
+
+def _term_values(term: str) -> set[int]:
+    # Offsets allowed by one non-relational term
+    if term == "?":
+        return set(range(26))
+    if term.startswith("!"):
+        return set(range(26)) - _term_values(term[1:])
+    if term.startswith("{") and term.endswith("}"):
+        values = set()
+        for item in term[1:-1].split(","):
+            values |= _term_values(item)
+        return values
+    if re.fullmatch(r"-?\d+", term):
+        return {int(term) % 26}
+    match = re.fullmatch(r"(\d+)-(\d+)", term)
+    if match:
+        lo, hi = int(match[1]) % 26, int(match[2]) % 26
+        return set(range(lo, hi + 1)) if lo <= hi else set(range(lo, 26)) | set(range(hi + 1))
+    raise ValueError(f"Can't read rotor offset '{term}'")
+
+
+def _pattern_values(pattern_list) -> list[list[int]]:
+    # ['?', '5', '3-5'] -> [[0..25], [5], [3, 4, 5]], the candidate offsets for each rotor.
+    # Relations between rotors are not applied here, see _pattern_relations.
+    values = []
+    for i, spec in enumerate(pattern_list):
+        allowed = set(range(26))
+        for term in _spec_terms(spec):
+            if not _RELATION_RE.fullmatch(term):
+                allowed &= _term_values(term)
+        if not allowed:
+            raise ValueError(f"Rotor {i + 1} ('{spec}') allows no offsets")
+        values.append(sorted(allowed))
+    return values
+
+
+def _pattern_relations(pattern_list) -> list[tuple[int, str, int, int]]:
+    # '>r1+2' on rotor 3 -> (2, '>', 0, 2): combo[2] > combo[0] + 2
+    relations = []
+    for i, spec in enumerate(pattern_list):
+        for term in _spec_terms(spec):
+            match = _RELATION_RE.fullmatch(term)
+            if match:
+                j = int(match[2]) - 1
+                if not 0 <= j < len(pattern_list) or j == i:
+                    raise ValueError(f"Rotor {i + 1} can't be compared with r{j + 1}")
+                relations.append((i, match[1], j, int(match[3] or 0)))
+    return relations
+
+
+def _relations_hold(relations, combo) -> bool:
+    for i, op, j, k in relations:
+        a, b = combo[i], combo[j] + k
+        if op == "=" and a != b % 26 or op == "!=" and a == b % 26:
+            return False
+        if op == "<" and not a < b or op == "<=" and not a <= b:
+            return False
+        if op == ">" and not a > b or op == ">=" and not a >= b:
+            return False
+    return True
+
+
+def parse_pattern(text: str) -> list[str]:
+    """Split a typed pattern such as "3-9, {1,4,7}, ?&!=r1" into one entry per rotor.
+
+    Commas inside braces stay with their set. Raises ValueError when an entry
+    can't be read.
+    """
+    entries, depth, current = [], 0, ""
+    for ch in text:
+        if ch == "," and depth == 0:
+            entries.append(current.strip() or "?")
+            current = ""
+            continue
+        depth += (ch == "{") - (ch == "}")
+        current += ch
+    entries.append(current.strip() or "?")
+    _pattern_values(entries)
+    _pattern_relations(entries)
+    return entries
+
+
+def _odometer(values: list[list[int]], start: int = 0):
+    # Every tuple of the candidate lists, last rotor fastest, from index `start` on
+    size = 1
+    for vals in values:
+        size *= len(vals)
+    if start >= size:
+        return
+    # Decode start as a mixed-radix number, one digit per rotor
+    digits = []
+    for vals in reversed(values):
+        start, d = divmod(start, len(vals))
+        digits.append(d)
+    digits.reverse()
+
+    while True:
+        yield tuple(vals[d] for vals, d in zip(values, digits))
+        # Odometer step over the candidate lists
+        for i in range(len(digits) - 1, -1, -1):
+            digits[i] += 1
+            if digits[i] < len(values[i]):
+                break
+            digits[i] = 0
         else:
-            iterables.append([int(p) % 26])
-    return product(*iterables)
+            return
+
+
+def expand_unknowns(pattern_list, start: int = 0):
+    # pattern_list like ['?', '5', '3-9'] -> iterator of all tuples, last rotor fastest.
+    # The order is fixed, so `start` (a count of tuples already seen) resumes the
+    # enumeration exactly where an earlier one stopped.
+    values = _pattern_values(pattern_list)
+    relations = _pattern_relations(pattern_list)
+    if not relations:
+        yield from _odometer(values, start)
+        return
+    # Relations make the keyspace irregular, skip `start` matching tuples
+    for combo in _odometer(values):
+        if _relations_hold(relations, combo):
+            if start:
+                start -= 1
+            else:
+                yield combo
+
+
+def _shard_pattern(pattern_list) -> list[list[str]]:
+    # Split the keyspace on the first rotor that has more than one candidate
+    values = _pattern_values(pattern_list)
+    for i, vals in enumerate(values):
+        if len(vals) > 1:
+            # The rotor's relations to other rotors go with every piece
+            relations = [t for t in _spec_terms(pattern_list[i]) if _RELATION_RE.fullmatch(t)]
+            return [list(pattern_list[:i]) + ["&".join([str(v)] + relations)] + list(pattern_list[i + 1:])
+                    for v in vals]
+    return [list(pattern_list)]
 
 
 def score_plaintext(pt: str, words: list[str]) -> int:
-    # Simple word counter using word boundaries
-    pt_up = pt.upper()
-    count = 0
-    for w in words:
-        if not w:
+    # Simple word counter using word boundaries.
+    # Searches should build one WordScorer up front instead of calling this per candidate.
+    return WordScorer(words).score(pt)
+
+
+class TopN:
+    """Bounded heap of the best ``size`` (score, offsets) pairs seen so far.
+
+    Ranking matches a full sort on ``(-score, offsets)``: higher scores win and
+    ties go to the smaller offsets tuple. Only scores and offsets are kept, so
+    memory stays constant no matter how large the keyspace is.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(0, size)
+        # Min-heap keyed on (score, negated offsets): the worst entry sits at [0]
+        self._heap = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, score, combo: tuple[int, ...]) -> bool:
+        # Offer a candidate, returns True if it made it into the heap
+        if self.size == 0:
+            return False
+        item = (score, tuple(-o for o in combo), tuple(combo))
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+            return True
+        if item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+            return True
+        return False
+
+    def could_enter(self, score, combo: tuple[int, ...]) -> bool:
+        # Would a candidate scoring `score` still make it into the heap?
+        if self.size == 0:
+            return False
+        if len(self._heap) < self.size:
+            return True
+        return (score, tuple(-o for o in combo), tuple(combo)) > self._heap[0]
+
+    def items(self) -> list[tuple]:
+        # Best first, same order the old full sort produced
+        return sorted(((s, c) for s, _, c in self._heap), key=lambda x: (-x[0], x[1]))
+
+    def merge(self, items) -> None:
+        # Fold in (score, offsets) pairs from another heap, e.g. a worker's result
+        for score, combo in items:
+            self.push(score, combo)
+
+
+def _advance_offsets(combo: tuple[int, ...], steps: int) -> tuple[int, ...]:
+    # Rotor offsets after the odometer has stepped `steps` times
+    value = 0
+    for o in combo:
+        value = value * 26 + o % 26
+    value = (value + steps) % (26 ** len(combo))
+    out = []
+    for _ in combo:
+        out.append(value % 26)
+        value //= 26
+    return tuple(reversed(out))
+
+
+def _prefix_stages(length: int) -> list[int]:
+    # Prefix lengths checked by the pruned search: 16, 64, 256, ... up to half the text,
+    # then every eighth of it. Bounds only get tight near the end, so that is where
+    # most candidates are dropped.
+    stages = []
+    cut = 16
+    while cut < length // 2:
+        stages.append(cut)
+        cut *= 4
+    for k in range(4, 8):
+        cut = length * k // 8
+        if cut > (stages[-1] if stages else 0):
+            stages.append(cut)
+    stages.append(length)
+    return stages
+
+
+def _letters_only(plugboard_map: dict) -> bool:
+    # Every plugboard cable joins two of a-z
+    letters = set("abcdefghijklmnopqrstuvwxyz")
+    return all(isinstance(k, str) and isinstance(v, str) and k in letters and v in letters
+               for k, v in plugboard_map.items())
+
+
+def _can_prune(ciphertext: str, plugboard_map: dict) -> bool:
+    # Bounds rely on letters staying letters and on prefixes decrypting independently
+    return ciphertext.isascii() and _letters_only(plugboard_map)
+
+
+def _scan(ciphertext: str, rotor_pattern: list[str], plugboard_map: dict, scorer, best: TopN,
+          prune: bool = False, report_every: int = 0, start: int = 0):
+    # Score every candidate of the pattern (from keyspace index `start` on) into `best`.
+    # This is a generator: it yields the keyspace position reached (candidates done,
+    # counting the skipped ones) every `report_every` candidates and once at the end.
+    #
+    # With prune=True (and a scorer that provides bound_for) it runs branch-and-bound:
+    # progressively longer prefixes are decrypted and a candidate is dropped as soon as
+    # its upper bound can no longer reach the current top N. Scorers whose bound is too
+    # loose to drop anything on a prefix (prunes_prefixes = False) are scanned plainly.
+    bound = None
+    if (prune and _can_prune(ciphertext, plugboard_map) and hasattr(scorer, "bound_for")
+            and getattr(scorer, "prunes_prefixes", True)):
+        bound = scorer.bound_for(ciphertext)
+    if bound is not None:
+        stages = _prefix_stages(len(ciphertext))
+        # Steps the odometer has taken at the start of each stage
+        steps_before = [sum(1 for ch in ciphertext[:cut] if ch.isalpha()) for cut in [0] + stages]
+
+    processed = start
+    # decrypt_message restores the rotors' offsets, so one set serves every stage and combo
+    rotors = [Rotor() for _ in rotor_pattern]
+    for combo in expand_unknowns(rotor_pattern, start):
+        if bound is None:
+            for r, o in zip(rotors, combo):
+                r.set_offset(o)
+            pt = decrypt_message(ciphertext, rotors, plugboard_map)
+            best.push(scorer.score(pt), combo)
+        else:
+            pt = ""
+            prev = 0
+            for i, cut in enumerate(stages):
+                for r, o in zip(rotors, _advance_offsets(combo, steps_before[i])):
+                    r.set_offset(o)
+                pt += decrypt_message(ciphertext[prev:cut], rotors, plugboard_map)
+                prev = cut
+                if cut < len(ciphertext) and not best.could_enter(bound(pt), combo):
+                    break
+            else:
+                best.push(scorer.score(pt), combo)
+
+        processed += 1
+        if report_every and (processed - start) % report_every == 0:
+            yield processed
+    yield processed
+
+
+def _search_shard(ciphertext: str, rotor_pattern: list[str], plugboard_map: dict,
+                  dict_words: list[str], top_n: int, scorer="words", prune: bool = False,
+                  start: int = 0) -> list[tuple]:
+    # Exhaustive search of one pattern, returns the local top-N (score, offsets) pairs.
+    # Module level so ProcessPoolExecutor workers can pickle it.
+    best = TopN(top_n)
+    for _ in _scan(ciphertext, rotor_pattern, plugboard_map, make_scorer(scorer, dict_words), best,
+                   prune, start=start):
+        pass
+    return best.items()
+
+
+def _keyspace_size(rotor_pattern) -> int:
+    # Exact candidate count. Relations between rotors are counted rotor by rotor,
+    # keeping only the offsets of earlier rotors that a later relation still needs
+    # (so a chain like '?', '>r1', '>r2' costs 26 states per rotor, not 26^3 tuples).
+    values = _pattern_values(rotor_pattern)
+    relations = _pattern_relations(rotor_pattern)
+    last_use = {}
+    for i, _, j, _ in relations:
+        for r in (i, j):
+            last_use[r] = max(last_use.get(r, 0), i, j)
+    counts = {(): 1}  # offsets of the kept rotors -> tuples reaching them
+    kept = []
+    for r, vals in enumerate(values):
+        checks = [rel for rel in relations if max(rel[0], rel[2]) == r]
+        if not checks and last_use.get(r, 0) <= r:
+            # No relation touches this rotor from here on, every offset counts the same
+            counts = {state: count * len(vals) for state, count in counts.items()}
             continue
-        if re.search(r"\b" + re.escape(w.upper()) + r"\b", pt_up):
-            count += 1
-    return count
+        next_kept = [q for q in kept if last_use[q] > r] + ([r] if last_use.get(r, 0) > r else [])
+        next_counts = {}
+        for state, count in counts.items():
+            offsets = dict(zip(kept, state))
+            for v in vals:
+                offsets[r] = v
+                if _relations_hold(checks, offsets):
+                    key = tuple(offsets[q] for q in next_kept)
+                    next_counts[key] = next_counts.get(key, 0) + count
+        counts, kept = next_counts, next_kept
+    return sum(counts.values())
+
+
+def _search_keyspace(ciphertext: str, rotor_pattern: list[str], plugboard_map: dict,
+                     dict_words: list[str], top_n: int, scorer, prune: bool, workers: int,
+                     on_progress=None, report_every: int = 1000,
+                     start: int = 0, best: TopN | None = None,
+                     on_checkpoint=None, checkpoint_every: int = 10000) -> TopN:
+    # Run the whole keyspace, sharded over worker processes when asked to.
+    # on_progress(processed, best) is called once before starting and then as candidates
+    # complete (per shard when parallel).
+    # To resume, pass the keyspace position reached and the TopN holding everything before it.
+    # on_checkpoint(position, best) is called with a consistent pair of those as the search
+    # goes: every checkpoint_every candidates, or each time the finished shards form a
+    # longer unbroken run from the start of the keyspace when parallel.
+    if best is None:
+        best = TopN(top_n)
+    if on_progress:
+        on_progress(start, best)
+    shards = _shard_pattern(rotor_pattern)
+    if workers > 1 and len(shards) > 1:
+        # Where each shard starts in the keyspace; relations between rotors can make them uneven
+        bounds = [0]
+        for shard in shards:
+            bounds.append(bounds[-1] + _keyspace_size(shard))
+        processed = start
+        # Everything so far (for progress) vs. only the unbroken run (safe to checkpoint)
+        seen = TopN(top_n)
+        seen.merge(best.items())
+        finished = {}
+        next_shard = sum(1 for hi in bounds[1:] if hi <= start)
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+            futures = {}
+            for i, shard in enumerate(shards):
+                lo, hi = bounds[i], bounds[i + 1]
+                if hi <= start:
+                    continue
+                local_start = max(0, start - lo)
+                future = pool.submit(_search_shard, ciphertext, shard, plugboard_map, dict_words,
+                                     top_n, scorer, prune, local_start)
+                futures[future] = (i, hi - lo - local_start)
+            for future in as_completed(futures):
+                i, count = futures[future]
+                items = future.result()
+                seen.merge(items)
+                processed += count
+                if on_progress:
+                    on_progress(processed, seen)
+                finished[i] = items
+                if next_shard in finished:
+                    while next_shard in finished:
+                        best.merge(finished.pop(next_shard))
+                        next_shard += 1
+                    if on_checkpoint:
+                        on_checkpoint(bounds[next_shard], best)
+    else:
+        every = report_every if on_progress else 0
+        if on_checkpoint:
+            every = min(every or checkpoint_every, checkpoint_every)
+        last_saved = start
+        scan = _scan(ciphertext, rotor_pattern, plugboard_map, make_scorer(scorer, dict_words), best,
+                     prune, every, start)
+        for processed in scan:
+            if on_progress:
+                on_progress(processed, best)
+            if on_checkpoint and processed - last_saved >= checkpoint_every:
+                on_checkpoint(processed, best)
+                last_saved = processed
+    return best
+
+
+def _chi2_keyspace(ciphertext: str, rotor_pattern: list[str], plugboard_map: dict, top_n: int) -> TopN:
+    """The "chi2" scorer over the whole keyspace, from histograms instead of decryptions.
+
+    With the last offset x0 fixed, a letter read at step s gets x0 + s mod 26 from
+    the last rotor, and the other rotors add one shift per block of 26 steps,
+    the digit sum of the higher digits plus the block's carries. So the
+    ciphertext is binned once per x0 into block histograms of c - (x0 + s), and a
+    candidate's letter counts are those histograms rotated by its block shifts
+    and added up: O(26 * blocks) per candidate instead of a full decryption.
+    Scores equal ChiSquaredScorer on the decrypted text.
+    """
+    n = len(rotor_pattern)
+    codes, steps = _letter_layout(ciphertext, plugboard_map)
+    # The final plugboard pass just relabels the counts
+    out = list(range(26))
+    for k, v in plugboard_map.items():
+        out[ord(k) - 97] = ord(v) - 97
+
+    # rotated[x0][block][t]: counts that block adds to the middle letters when its shift is t
+    rotated = []
+    for x0 in range(26):
+        blocks = [[0] * 26 for _ in range((x0 + (steps[-1] if steps else 0)) // 26 + 1)]
+        for c, step in zip(codes, steps):
+            block, digit = divmod(x0 + step, 26)
+            blocks[block][(c - digit) % 26] += 1
+        rotated.append([[[h[(y + t) % 26] for y in range(26)] for t in range(26)] for h in blocks])
+
+    high_size = 26 ** (n - 1)
+    digit_sums = {}
+
+    def high_shift(value: int) -> int:
+        # Digit sum of the higher rotors' odometer value, mod 26
+        value %= high_size
+        if value not in digit_sums:
+            total, v = 0, value
+            while v:
+                v, d = divmod(v, 26)
+                total += d
+            digit_sums[value] = total % 26
+        return digit_sums[value]
+
+    best = TopN(top_n)
+    q, shifts = None, None
+    for combo in expand_unknowns(rotor_pattern):
+        value = 0
+        for o in combo[:-1]:
+            value = value * 26 + o
+        if value != q:
+            q = value
+            shifts = [high_shift(q + b) for b in range(len(rotated[25]))]
+        x0 = combo[-1]
+        mid = map(sum, zip(*[rot[t] for rot, t in zip(rotated[x0], shifts)]))
+        counts = [0] * 26
+        for y, count in enumerate(mid):
+            counts[out[y]] = count
+        best.push(-chi_squared(counts), combo)
+    return best
+
+
+def _config_hash(*parts) -> str:
+    # Stable hash of a search's inputs. Plugboards and dictionaries are order-free, so they
+    # are sorted first; scorer objects are identified by their class name.
+    def normal(x):
+        if isinstance(x, dict):
+            return sorted([str(k), str(v)] for k, v in x.items())
+        if isinstance(x, (set, frozenset)):
+            return sorted(normal(v) for v in x)
+        if isinstance(x, (list, tuple)):
+            return [normal(v) for v in x]
+        if x is None or isinstance(x, (str, int, float, bool)):
+            return x
+        return type(x).__name__
+    return hashlib.sha256(json.dumps([normal(p) for p in parts]).encode()).hexdigest()
+
+
+def _checkpointed_search(checkpoint: str, ciphertext: str, rotor_pattern: list[str], plugboard_map: dict,
+                         dict_words: list[str], top_n: int, scorer, prune: bool, workers: int,
+                         on_progress=None, report_every: int = 1000,
+                         checkpoint_every: int = 10000) -> TopN:
+    # _search_keyspace that saves its position and top N to the SQLite file `checkpoint`
+    # and, if a checkpoint for the same configuration is already there, carries on from it.
+    # The record is removed once the keyspace is finished.
+    key = _checkpoint_key(ciphertext, rotor_pattern, plugboard_map, dict_words, top_n, scorer, prune)
+    total = _keyspace_size(rotor_pattern)
+    database = init_checkpoints(checkpoint)
+    try:
+        best = TopN(top_n)
+        start = 0
+        saved = load_checkpoint(database, key)
+        if saved is not None:
+            start, items = saved
+            best.merge(items)
+
+        def on_checkpoint(position, best):
+            save_checkpoint(database, key, position, total, best.items())
+
+        best = _search_keyspace(ciphertext, rotor_pattern, plugboard_map, dict_words, top_n, scorer,
+                                prune, workers, on_progress, report_every, start, best,
+                                on_checkpoint, checkpoint_every)
+        clear_checkpoint(database, key)
+    finally:
+        close_db(database)
+    return best
+
+
+def _checkpoint_key(ciphertext: str, rotor_pattern: list[str], plugboard_map: dict, dict_words: list[str],
+                    top_n: int, scorer, prune: bool) -> str:
+    return _config_hash("keyspace", ciphertext, rotor_pattern, plugboard_map,
+                        _words_key(dict_words), top_n, scorer, prune)
+
+
+def drop_checkpoint(checkpoint: str,
+                    ciphertext: str,
+                    rotor_pattern: list[str],
+                    plugboard_map: dict,
+                    dict_words: list[str],
+                    top_n: int = 10,
+                    scorer="words",
+                    prune: bool = False,
+                    cascade: list[tuple] | None = None):
+    # Remove the checkpoint guess_offsets(..., checkpoint=checkpoint) keeps for these
+    # arguments, for a search that is abandoned rather than resumed. Only the keyspace
+    # scan checkpoints: the whole search, or a cascade's first stage.
+    if cascade:
+        stage_scorer, prefix_chars, keep = cascade[0]
+        text = ciphertext if prefix_chars is None else ciphertext[:prefix_chars]
+        key = _checkpoint_key(text, rotor_pattern, plugboard_map, dict_words, keep, stage_scorer, False)
+    else:
+        key = _checkpoint_key(ciphertext, rotor_pattern, plugboard_map, dict_words, top_n, scorer, prune)
+    database = init_checkpoints(checkpoint)
+    try:
+        clear_checkpoint(database, key)
+    finally:
+        close_db(database)
+
+
+def _normal_pattern(rotor_pattern) -> list[str]:
+    # One spelling per keyspace: ['?', '29', '{5,4}&>r1', '4-5'] -> ['?', '3', '{4,5}&>r1', '{4,5}']
+    normal = []
+    for spec, vals in zip(rotor_pattern, _pattern_values(rotor_pattern)):
+        if len(vals) == 26:
+            text = "?"
+        elif len(vals) == 1:
+            text = str(vals[0])
+        else:
+            text = "{" + ",".join(map(str, vals)) + "}"
+        relations = sorted(t for t in _spec_terms(spec) if _RELATION_RE.fullmatch(t))
+        normal.append("&".join([text] + relations))
+    return normal
+
+
+def _words_key(dict_words):
+    # Order-free identity of a dictionary; compiled word lists carry their own digest
+    if hasattr(dict_words, "digest"):
+        return dict_words.digest
+    return sorted(w.lower() for w in dict_words)
+
+
+def _results_key(ciphertext: str, plugboard_map: dict, dict_words: list[str], scorer, cascade) -> str | None:
+    # Result-cache key: everything that decides a search's ranking except the rotor pattern
+    # (kept separately so narrower patterns can reuse wider results) and top_n. Scorer
+    # objects can't be told apart reliably, so only searches using named scorers are cached.
+    if not isinstance(scorer, str) or not all(isinstance(stage[0], str) for stage in cascade or []):
+        return None
+    # Decryption lowercases the text, so "ABC" and "abc" share one entry
+    return _config_hash("results", ciphertext.lower(), plugboard_map, _words_key(dict_words), scorer, cascade)
+
+
+def _cached_top(database, cache_key: str, rotor_pattern: list[str], top_n: int, exact: bool = False):
+    # The (score, offsets) list a search of rotor_pattern would return, from a cached search of
+    # the same pattern or of a wider one, or None. A wider search's list narrowed to this
+    # pattern is still in rank order, and anything it dropped ranks below all of it, so it is
+    # the right answer when it still has top_n entries or when it held every candidate.
+    # exact=True (cascades, whose survivors depend on the whole keyspace) needs the same pattern.
+    pattern = _normal_pattern(rotor_pattern)
+    wanted = [set(vals) for vals in _pattern_values(pattern)]
+    relations = _pattern_relations(pattern)
+    for cached_pattern, _, complete, top in load_results(database, cache_key):
+        # A search restricted by relations only stands in for itself
+        if (exact or _pattern_relations(cached_pattern)) and cached_pattern != pattern:
+            continue
+        cached = _pattern_values(cached_pattern)
+        if len(cached) != len(wanted) or not all(w <= set(c) for w, c in zip(wanted, cached)):
+            continue
+        matching = [(s, combo) for s, combo in top if all(o in w for o, w in zip(combo, wanted))
+                    and _relations_hold(relations, combo)]
+        if len(matching) >= top_n or complete:
+            touch_results(database, cache_key, cached_pattern)
+            return matching[:top_n]
+    return None
+
+
+def cached_results(ciphertext: str, rotor_pattern: list[str], plugboard_map: dict, dict_words,
+                   top_n: int = 10, scorer="words", cache: str = CACHE_PATH):
+    # What guess_offsets(..., cache=cache) would answer from the cache alone, or None when
+    # the search has to run
+    cache_key = _results_key(ciphertext, plugboard_map, dict_words, scorer, None)
+    if cache_key is None or not os.path.exists(cache):
+        return None
+    database = init_results(cache)
+    try:
+        ranked = _cached_top(database, cache_key, rotor_pattern, top_n)
+    finally:
+        close_db(database)
+    if ranked is None:
+        return None
+    return [(s, combo, decrypt_message(ciphertext, [Rotor(o) for o in combo], plugboard_map))
+            for s, combo in ranked]
+
+
+def cache_results(ciphertext: str, rotor_pattern: list[str], plugboard_map: dict, dict_words,
+                  results: list, top_n: int = 10, scorer="words", cache: str = CACHE_PATH):
+    # Store a guess_offsets-style result list found some other way (CandidateSet.rank)
+    # so later searches can be answered from the cache
+    cache_key = _results_key(ciphertext, plugboard_map, dict_words, scorer, None)
+    if cache_key is None:
+        return
+    ranked = [(s, combo) for s, combo, _ in results]
+    database = init_results(cache)
+    try:
+        save_results(database, cache_key, _normal_pattern(rotor_pattern), top_n,
+                     len(ranked) == _keyspace_size(rotor_pattern), ranked)
+    finally:
+        close_db(database)
+
+
+def _progress_snapshot(processed: int, total: int, started: float, best: TopN,
+                       ciphertext: str, plugboard_map: dict, resumed_at: int = 0) -> dict:
+    # What progress callbacks and iter_guess_offsets report: counts, speed, ETA and the current top N.
+    # Speed only counts work done since `started`, not candidates restored from a checkpoint.
+    elapsed = time.perf_counter() - started
+    rate = (processed - resumed_at) / elapsed if elapsed > 0 else 0.0
+    top = [(s, combo, decrypt_message(ciphertext, [Rotor(o) for o in combo], plugboard_map))
+           for s, combo in best.items()]
+    return {"processed": processed, "total": total, "per_second": rate,
+            "eta_seconds": (total - processed) / rate if rate else None, "top": top}
+
+
+def iter_guess_offsets(ciphertext: str,
+                       rotor_pattern: list[str],
+                       plugboard_map: dict,
+                       dict_words: list[str],
+                       top_n: int = 10,
+                       scorer="words",
+                       prune: bool = False,
+                       report_every: int = 1000):
+    # Streaming guess_offsets: yields a progress snapshot every report_every candidates
+    # (see _progress_snapshot). The last snapshot has processed == total and its "top"
+    # is the same list guess_offsets returns.
+    best = TopN(top_n)
+    total = _keyspace_size(rotor_pattern)
+    started = time.perf_counter()
+    for processed in _scan(ciphertext, rotor_pattern, plugboard_map, make_scorer(scorer, dict_words),
+                           best, prune, report_every):
+        yield _progress_snapshot(processed, total, started, best, ciphertext, plugboard_map)
+
+
+def estimate_run(ciphertext: str,
+                 rotor_pattern: list[str],
+                 plugboard_map: dict,
+                 dict_words: list[str],
+                 scorer="words",
+                 workers: int = 1,
+                 sample: int = 200) -> dict:
+    # How long guess_offsets would take, before starting it: the exact number of
+    # candidates in rotor_pattern and the decrypt + score rate measured on this machine
+    # over the first `sample` of them. Returns {"candidates", "per_second", "seconds"};
+    # seconds assumes the plain keyspace scan shared by `workers` processes, so
+    # prune, a cascade or the cache can only make the real run faster.
+    total = _keyspace_size(rotor_pattern)
+    score = make_scorer(scorer, dict_words).score
+    timed = 0
+    started = time.perf_counter()
+    for combo in expand_unknowns(rotor_pattern):
+        if timed == sample:
+            break
+        score(decrypt_message(ciphertext, [Rotor(o) for o in combo], plugboard_map))
+        timed += 1
+    elapsed = time.perf_counter() - started
+    per_second = timed / elapsed if timed and elapsed > 0 else None
+    seconds = None
+    if per_second:
+        seconds = total / per_second / max(1, min(workers, len(_shard_pattern(rotor_pattern))))
+    return {"candidates": total, "per_second": per_second, "seconds": seconds}
+
+
+def _rescore(ciphertext: str, combos, plugboard_map: dict, scorer, top_n: int) -> TopN:
+    # Score a list of surviving offsets with a (usually more expensive) scorer
+    best = TopN(top_n)
+    for combo in combos:
+        pt = decrypt_message(ciphertext, [Rotor(o) for o in combo], plugboard_map)
+        best.push(scorer.score(pt), combo)
+    return best
 
 
 def guess_offsets(ciphertext: str,
                   rotor_pattern: list[str],
                   plugboard_map: dict,
                   dict_words: list[str],
-                  top_n: int = 10) -> list[tuple[int, tuple[int, ...], str]]:
+                  top_n: int = 10,
+                  workers: int | None = 1,
+                  scorer="words",
+                  prune: bool = False,
+                  cascade: list[tuple] | None = None,
+                  stats: list | None = None,
+                  progress=None,
+                  report_every: int = 1000,
+                  verbose: bool = True,
+                  checkpoint: str | None = None,
+                  checkpoint_every: int = 10000,
+                  cache: str | None = None,
+                  vectorized: bool = False) -> list[tuple[int, tuple[int, ...], str]]:
     # Brute-force unknown offsets. Returns top_n results sorted by score.
     # Each result is (score, offsets_tuple, plaintext)
+    # workers > 1 shards the keyspace across processes (None = one per CPU);
+    # the merged results are identical to the sequential search.
+    # scorer is a name from scoring.SCORERS ("words", "quadgram", "letters", "chi2", "segment") or an
+    # object with score(pt). A "chi2" keyspace pass works from letter histograms without
+    # decrypting, which makes it a fast first cascade stage: [("chi2", None, 500)].
+    # prune=True uses branch-and-bound on growing prefixes; results are unchanged. Only the
+    # "quadgram" bound is tight enough to drop candidates, and only late in the message, so it
+    # pays off with "quadgram" on long messages. The "words" scorer ignores prune=True here
+    # (its bound still serves guess_offsets_depth, across messages).
+    # cascade is a list of cheap (scorer, prefix_chars, keep) stages run before `scorer`,
+    # e.g. [("letters", 64, 500)]: every candidate gets the first stage on its first
+    # 64 characters and only the best 500 go on. prefix_chars None means the whole text.
+    # Per-stage candidate/survivor counts and timings are appended to `stats` if given.
+    # progress(snapshot) is called while the keyspace is scanned (every report_every
+    # candidates, or per finished shard with workers) with the dict iter_guess_offsets yields;
+    # in a cascade the snapshots come from the first stage. verbose=False skips printing.
+    # checkpoint names an SQLite file the keyspace scan saves its position and top N to
+    # (every checkpoint_every candidates); running the same search again with the same
+    # file resumes from there. The checkpoint is deleted when the scan completes.
+    # cache names an SQLite file of finished results (see _cached_top): identical searches,
+    # and searches on a narrower pattern, are answered from it without decrypting anything.
+    # vectorized=True decrypts whole blocks of candidates with NumPy when the keyspace is
+    # scored with "letters" (as the scorer or a cascade's first stage) and numpy is
+    # installed and the plugboard only joins letters; otherwise the normal search runs.
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    stage_stats = []
+
+    total = _keyspace_size(rotor_pattern)
+    on_progress = None
+    if progress:
+        started = time.perf_counter()
+        # A cascade's first stage only decrypts a prefix, preview that same text
+        scan_text = ciphertext
+        if cascade and cascade[0][1] is not None:
+            scan_text = ciphertext[:cascade[0][1]]
+
+        resumed_at = []
+
+        def on_progress(processed, best):
+            # The first call comes before any work, at the resume position (0 for a fresh run)
+            if not resumed_at:
+                resumed_at.append(processed)
+            progress(_progress_snapshot(processed, total, started, best, scan_text, plugboard_map,
+                                        resumed_at[0]))
+
+    def keyspace_search(text, top, stage_scorer, stage_prune):
+        if stage_scorer == "chi2" and rotor_pattern and _letters_only(plugboard_map):
+            # Cheap enough that checkpoints and worker processes aren't worth it
+            if on_progress:
+                on_progress(0, TopN(top))
+            best = _chi2_keyspace(text, rotor_pattern, plugboard_map, top)
+            if on_progress:
+                on_progress(total, best)
+            return best
+        if (vectorized and np is not None and stage_scorer == "letters" and rotor_pattern
+                and _letters_only(plugboard_map)):
+            if on_progress:
+                on_progress(0, TopN(top))
+            best = _letters_keyspace(text, rotor_pattern, plugboard_map, top)
+            if on_progress:
+                on_progress(total, best)
+            return best
+        if checkpoint:
+            return _checkpointed_search(checkpoint, text, rotor_pattern, plugboard_map, dict_words, top,
+                                        stage_scorer, stage_prune, workers, on_progress, report_every,
+                                        checkpoint_every)
+        return _search_keyspace(text, rotor_pattern, plugboard_map, dict_words, top,
+                                stage_scorer, stage_prune, workers, on_progress, report_every)
+
+    # A finished search with the same inputs (on this pattern or a wider one) answers instantly
+    cache_key = _results_key(ciphertext, plugboard_map, dict_words, scorer, cascade) if cache else None
+    ranked = None
+    if cache_key:
+        start = time.perf_counter()
+        database = init_results(cache)
+        try:
+            ranked = _cached_top(database, cache_key, rotor_pattern, top_n, exact=bool(cascade))
+        finally:
+            close_db(database)
+        if ranked is not None:
+            stage_stats.append({"stage": "cache", "prefix_chars": None, "candidates": len(ranked),
+                                "survivors": len(ranked), "seconds": time.perf_counter() - start})
+
+    if ranked is None:
+        survivors = None
+        for stage_scorer, prefix_chars, keep in cascade or []:
+            start = time.perf_counter()
+            text = ciphertext if prefix_chars is None else ciphertext[:prefix_chars]
+            if survivors is None:
+                count = total
+                stage = keyspace_search(text, keep, stage_scorer, False)
+            else:
+                count = len(survivors)
+                stage = _rescore(text, survivors, plugboard_map, make_scorer(stage_scorer, dict_words), keep)
+            survivors = [combo for _, combo in stage.items()]
+            stage_stats.append({"stage": str(stage_scorer), "prefix_chars": prefix_chars, "candidates": count,
+                                "survivors": len(survivors), "seconds": time.perf_counter() - start})
+
+        start = time.perf_counter()
+        if survivors is None:
+            count = total
+            best = keyspace_search(ciphertext, top_n, scorer, prune)
+        else:
+            count = len(survivors)
+            best = _rescore(ciphertext, survivors, plugboard_map, make_scorer(scorer, dict_words), top_n)
+        stage_stats.append({"stage": str(scorer), "prefix_chars": None, "candidates": count,
+                            "survivors": len(best), "seconds": time.perf_counter() - start})
+        ranked = best.items()
+        if cache_key:
+            # Without a cascade, holding every candidate lets any narrower pattern reuse it
+            complete = not cascade and len(ranked) == total
+            database = init_results(cache)
+            try:
+                save_results(database, cache_key, _normal_pattern(rotor_pattern), top_n, complete, ranked)
+            finally:
+                close_db(database)
+
+    if stats is not None:
+        stats.extend(stage_stats)
+
+    # Plaintext is only re-derived for the winners
     results = []
-    for combo in expand_unknowns(rotor_pattern):
-        # Build rotors fresh for each combo
-        rotors = [Rotor(o) for o in combo]
-        pt = decrypt_message(ciphertext, rotors, plugboard_map)
-        s = score_plaintext(pt, dict_words)
+    for s, combo in ranked:
+        pt = decrypt_message(ciphertext, [Rotor(o) for o in combo], plugboard_map)
         results.append((s, combo, pt))
 
-    results.sort(key=lambda x: (-x[0], x[1]))
+    if not verbose:
+        return results
+
+    if stage_stats[0]["stage"] == "cache":
+        print("\n(from the result cache)")
+    elif cascade:
+        print("\nCascade:")
+        for st in stage_stats:
+            print(f"  {st['stage']:<10} {st['candidates']:>8} -> {st['survivors']:<8} {st['seconds']:.3f}s")
 
     print(f"\nTop {top_n} candidates:")
-    for s, combo, pt in results[:top_n]:
-        print(f"Offsets {combo} | Score={s}\n{pt}\n")
+    for s, combo, pt in results:
+        print(f"Offsets {combo} | Score={s:g}\n{pt}\n")
+
+    return results
+
+
+# ------------------------- VECTORIZED SEARCH -------------------------
+def _letter_layout(ciphertext: str, plugboard_map: dict):
+    # Letter codes (after the first plugboard pass) and the odometer step each one is read at.
+    # Every alphabetic char steps the rotors, only a-z are actually shifted.
+    codes, steps = [], []
+    step = 0
+    for ch in plugboard_apply(ciphertext, plugboard_map):
+        if ch.isalpha():
+            step += 1
+            if 'a' <= ch <= 'z':
+                codes.append(ord(ch) - 97)
+                steps.append(step)
+    return codes, steps
+
+
+def _combo_chunks(rotor_pattern, chunk: int):
+    # The candidate offsets as (rows x rotors) arrays of at most `chunk` rows, in
+    # expand_unknowns order, built as they are needed so memory stays flat however
+    # large the keyspace
+    values = _pattern_values(rotor_pattern)
+    if not values:
+        yield np.zeros((1, 0), dtype=np.int64)
+        return
+    if _pattern_relations(rotor_pattern):
+        combos = expand_unknowns(rotor_pattern)
+        while True:
+            block = list(itertools.islice(combos, chunk))
+            if not block:
+                return
+            yield np.array(block, dtype=np.int64)
+    # The last rotors, as many as fit in a chunk, form a grid repeated under each
+    # group of settings of the leading rotors
+    split, size = len(values), 1
+    while split > 0 and size * len(values[split - 1]) <= chunk:
+        split -= 1
+        size *= len(values[split])
+    tail = np.zeros((1, 0), dtype=np.int64)
+    if split < len(values):
+        grids = np.meshgrid(*[np.array(v, dtype=np.int64) for v in values[split:]], indexing="ij")
+        tail = np.stack([g.ravel() for g in grids], axis=1)
+    heads = _odometer(values[:split])
+    while True:
+        group = list(itertools.islice(heads, max(1, chunk // size)))
+        if not group:
+            return
+        head = np.array(group, dtype=np.int64).reshape(len(group), split)
+        yield np.hstack([np.repeat(head, len(tail), axis=0), np.tile(tail, (len(group), 1))])
+
+
+def decrypt_candidates(ciphertext: str, combos, plugboard_map: dict) -> "np.ndarray":
+    """Decrypt the a-z letters of ciphertext under every offsets row in combos at once.
 
-    return results[:top_n]
+    Returns a (candidates x letters) uint8 array of plaintext letter codes (0 = 'a'),
+    matching the letters decrypt_message would produce for each candidate.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for the vectorized bombe")
+    if not _letters_only(plugboard_map):
+        raise ValueError("The vectorized bombe needs a plugboard joining letters a-z")
+    combos = np.asarray(combos, dtype=np.int64)
+    n_rotors = combos.shape[1]
+    codes, steps = _letter_layout(ciphertext, plugboard_map)
+    codes = np.array(codes, dtype=np.int64)
+    steps = np.array(steps, dtype=np.int64)
+
+    # Shift matrix: the decrypt shift is the digit sum of start offsets + steps taken.
+    # Added digit by digit from the last rotor with a carry, so the odometer value
+    # itself (26^rotors, past int64 from 14 rotors on) is never formed.
+    shifts = np.zeros((len(combos), len(steps)), dtype=np.int64)
+    carry = np.zeros_like(shifts)
+    add = steps.copy()
+    for i in range(n_rotors - 1, -1, -1):
+        digit = combos[:, i, None] % 26 + add[None, :] % 26 + carry
+        shifts += digit % 26
+        carry = digit // 26
+        add //= 26
+
+    # Undo the rotors, then the final plugboard pass on the letters
+    pb_table = np.array([ord(plugboard_map.get(chr(97 + i), chr(97 + i))) - 97 for i in range(26)],
+                        dtype=np.uint8)
+    return pb_table[(codes[None, :] - shifts) % 26]
+
+
+def _letters_keyspace(ciphertext: str, rotor_pattern: list[str], plugboard_map: dict, top_n: int,
+                      chunk_cells: int = 4_000_000) -> TopN:
+    # The "letters" scorer over the whole keyspace, decrypted with array operations.
+    # chunk_cells caps the size of each shift matrix, and of the candidates held at once.
+    n_letters = len(_letter_layout(ciphertext, plugboard_map)[0])
+    chunk = max(1, chunk_cells // max(1, n_letters))
+    logp = np.array(ENGLISH_LETTER_LOGP)
+
+    best = TopN(top_n)
+    for block in _combo_chunks(rotor_pattern, chunk):
+        scores = logp[decrypt_candidates(ciphertext, block, plugboard_map)].sum(axis=1)
+        # Rows are in offsets order, so a stable sort keeps the (-score, offsets) ranking
+        for idx in np.argsort(-scores, kind="stable")[:top_n]:
+            best.push(float(scores[idx]), tuple(int(o) for o in block[idx]))
+    return best
+
+
+def guess_offsets_vectorized(ciphertext: str,
+                             rotor_pattern: list[str],
+                             plugboard_map: dict,
+                             top_n: int = 10,
+                             chunk_cells: int = 4_000_000) -> list[tuple[float, tuple[int, ...], str]]:
+    # Decrypt every candidate with array operations and rank them by English
+    # letter log-probability (the "letters" scorer). guess_offsets(..., scorer="letters",
+    # vectorized=True) uses the same path.
+    if np is None:
+        raise RuntimeError("numpy is required for the vectorized bombe")
+    best = _letters_keyspace(ciphertext, rotor_pattern, plugboard_map, top_n, chunk_cells)
+    results = []
+    for s, combo in best.items():
+        pt = decrypt_message(ciphertext, [Rotor(o) for o in combo], plugboard_map)
+        results.append((s, combo, pt))
+    return results
 
 
 # ------------------------- CLI / MAIN -------------------------
-def array_match():
-    # Replicates the earlier array_Match idea: compare ciphertext against a crib and list mismatches.
+def array_match(rotor_pattern=("?", "?", "?"), plugboard_map: dict | None = None) -> list[tuple[int, int]]:
+    # Interactive crib dragging: ask for a ciphertext and a crib, then list the positions the
+    # crib could sit at (see crib.drag_crib), closest fits first.
+    try:
+        from .crib import drag_crib
+    except ImportError:  # Running directly
+        from crib import drag_crib
+
     message_crypt = input("Type in the enigma message you wish to decrypt: ").lower()
     decoder_machine = input("What do you think the message is (crib)? ").lower()
 
-    crypt_len = len([c for c in message_crypt if c.isalpha()])
-    guess_len = len([c for c in decoder_machine if c.isalpha()])
-    diff = crypt_len - guess_len
-    print("Length difference:", diff)
-
-    poss_combo = []
-    for y in range(diff + 1):
-        for x in range(y, guess_len + y):
-            if x < len(message_crypt) and (x - y) < len(decoder_machine):
-                if message_crypt[x].isalpha() and decoder_machine[x - y].isalpha():
-                    if message_crypt[x] != decoder_machine[x - y]:
-                        poss_combo.append([message_crypt[x], decoder_machine[x - y]])
-    print("Possible pairs:", poss_combo)
-    return poss_combo
+    ranked = drag_crib(message_crypt, decoder_machine, list(rotor_pattern), plugboard_map,
+                       max_mismatches=1, limit=20)
+    if not ranked:
+        print("The crib fits nowhere in this message")
+    for position, mismatches in ranked:
+        print(f"Position {position}: {'fits' if mismatches == 0 else f'{mismatches} mismatched step(s)'}")
+    return ranked
 
 # -------------------------- MAIN --------------------------
 def main():
@@ -194,16 +1153,23 @@ def main():
               " 2) Enter plugboard pairs\n"
               " 3) Decrypt message\n"
               " 4) Guess unknown offsets\n"
-              " 5) Crib helper (array_match)\n"
+              " 5) Crib dragging (where could a crib sit?)\n"
+              " 6) Crib attack (solve offsets from known plaintext)\n"
+              " 7) Depth attack (several messages, same key)\n"
+              " 8) Job queue (submit, list, cancel, collect)\n"
               " 0) Quit")
         choice = int(input("Select: "))
 
         match choice:
             case 1:
-                r1 = input("Rotor 1 offset (0-25 or ?): ").strip()
-                r2 = input("Rotor 2 offset (0-25 or ?): ").strip()
-                r3 = input("Rotor 3 offset (0-25 or ?): ").strip()
-                rotor_pattern = [r1, r2, r3]
+                r1 = input("Rotor 1 offset (0-25, ?, 3-9, {1,4,7}, !5, >r2 ...): ").strip()
+                r2 = input("Rotor 2 offset: ").strip()
+                r3 = input("Rotor 3 offset: ").strip()
+                try:
+                    rotor_pattern = parse_pattern(f"{r1},{r2},{r3}")
+                except ValueError as e:
+                    print(e)
+                    continue
                 print("Pattern set:", rotor_pattern)
 
             case 2:
@@ -223,33 +1189,173 @@ def main():
 
             case 3:  
                 ct = input("Ciphertext: ")
-                if '?' in rotor_pattern:
+                values = _pattern_values(rotor_pattern)
+                if any(len(v) != 1 for v in values):
                     print("You have unknown offsets. Set them or use guessing.")
                     continue
-                offsets = [int(x) % 26 for x in rotor_pattern]
+                offsets = [v[0] for v in values]
                 rotors = [Rotor(o) for o in offsets]
                 pt = decrypt_message(ct, rotors, plugboard)
                 print("Plaintext:", pt)
 
             case 4:
                 ct = input("Ciphertext to test: ")
-                pat_in = input("Pattern (comma-separated, ?=unknown) or blank to reuse current: ").strip()
+                pat_in = input("Pattern (comma-separated, e.g. ?, 3-9, {1,4,7}) or blank to reuse current: ").strip()
                 if pat_in:
-                    rotor_pattern = [p.strip() for p in pat_in.split(',')]
+                    try:
+                        rotor_pattern = parse_pattern(pat_in)
+                    except ValueError as e:
+                        print(e)
+                        continue
 
-                words_in = input("Dictionary words comma-separated (blank = default): ").strip()
-                if words_in:
+                # A message opening with an indexed stock phrase gives up its key without a search
+                if os.path.exists(INDEX_PATH):
+                    try:
+                        from .cribindex import lookup_key
+                    except ImportError:  # Running directly
+                        from cribindex import lookup_key
+                    hits = lookup_key(ct, rotor_pattern, plugboard)
+                    for crib, offsets in hits[:10]:
+                        pt = decrypt_message(ct, [Rotor(o) for o in offsets], plugboard)
+                        print(f"Crib index: starts with '{crib}' | Offsets {offsets}\n{pt}\n")
+                    if hits and input("Search anyway? [y/N]: ").strip().lower() != 'y':
+                        continue
+
+                words_in = input("Dictionary words comma-separated, or @wordlist.txt (blank = default): ").strip()
+                if words_in.startswith('@'):
+                    dict_words = load_word_list(words_in[1:].strip())
+                    print(f"Loaded {len(dict_words)} words")
+                elif words_in:
                     dict_words = [w.strip() for w in words_in.split(',') if w.strip()]
                 else:
-                    dict_words = ["THE", "AND", "TO", "OF", "YOU", "IS", "IN", "THAT", "IT", "FOR"]
+                    dict_words = DEFAULT_DICTIONARY
 
                 top_n = input("Show top how many? [10]: ").strip() or '10'
                 top_n = int(top_n)
 
-                guess_offsets(ct, rotor_pattern, plugboard, dict_words, top_n)
+                workers = input("Worker processes (0 = all CPUs) [1]: ").strip() or '1'
+                workers = int(workers)
+
+                scorer = input(f"Scorer ({'/'.join(SCORERS)}) [words]: ").strip().lower() or 'words'
+                if scorer not in SCORERS:
+                    print("Unknown scorer.")
+                    continue
+
+                # Optional cheap first pass: chi-squared letter counts, computed without decrypting
+                keep = input("Letter-frequency prefilter, keep best how many? [off]: ").strip()
+                cascade = [("chi2", None, int(keep))] if keep else None
+
+                # Re-running with the same checkpoint file picks up where a stopped run left off
+                checkpoint = input("Checkpoint file (blank = none): ").strip() or None
+
+                estimate = estimate_run(ct, rotor_pattern, plugboard, dict_words, scorer,
+                                        workers or os.cpu_count() or 1)
+                eta = "?" if estimate["seconds"] is None else f"{estimate['seconds']:.0f}s"
+                print(f"{estimate['candidates']} candidates, about {eta} on this machine")
+                if input("Run? [Y/n]: ").strip().lower() == 'n':
+                    continue
+
+                def show_progress(snap):
+                    eta = "?" if snap["eta_seconds"] is None else f"{snap['eta_seconds']:.0f}s"
+                    print(f"\r  {snap['processed']}/{snap['total']} candidates, "
+                          f"{snap['per_second']:.0f}/s, ETA {eta}   ", end="", flush=True)
+
+                guess_offsets(ct, rotor_pattern, plugboard, dict_words, top_n, workers, scorer,
+                              cascade=cascade, progress=show_progress, checkpoint=checkpoint, vectorized=True)
 
             case 5:
-                array_match()
+                array_match(rotor_pattern, plugboard)
+
+            case 6:
+                try:
+                    from .crib import solve_crib
+                except ImportError:  # Running directly
+                    from crib import solve_crib
+
+                ct = input("Ciphertext: ")
+                crib = input("Crib (suspected plaintext): ")
+                pat_in = input("Pattern (comma-separated, e.g. ?, 3-9, {1,4,7}) or blank to reuse current: ").strip()
+                if pat_in:
+                    try:
+                        rotor_pattern = parse_pattern(pat_in)
+                    except ValueError as e:
+                        print(e)
+                        continue
+                pos_in = input("Crib position in the ciphertext (blank = try all): ").strip()
+                position = int(pos_in) if pos_in else None
+
+                solutions = solve_crib(ct, crib, rotor_pattern, plugboard, position)
+                print(f"\n{len(solutions)} consistent key(s)")
+                for pos, offsets in solutions[:20]:
+                    pt = decrypt_message(ct, [Rotor(o) for o in offsets], plugboard)
+                    print(f"Position {pos} | Offsets {offsets}\n{pt}\n")
+
+            case 7:
+                try:
+                    from .depth import guess_offsets_depth
+                except ImportError:  # Running directly
+                    from depth import guess_offsets_depth
+
+                cts = []
+                while True:
+                    ct = input(f"Ciphertext {len(cts) + 1} (blank to stop): ")
+                    if not ct.strip():
+                        break
+                    cts.append(ct)
+                if not cts:
+                    continue
+                pat_in = input("Pattern (comma-separated, e.g. ?, 3-9, {1,4,7}) or blank to reuse current: ").strip()
+                if pat_in:
+                    try:
+                        rotor_pattern = parse_pattern(pat_in)
+                    except ValueError as e:
+                        print(e)
+                        continue
+                scorer = input(f"Scorer ({'/'.join(SCORERS)}) [quadgram]: ").strip().lower() or 'quadgram'
+                if scorer not in SCORERS:
+                    print("Unknown scorer.")
+                    continue
+
+                results = guess_offsets_depth(cts, rotor_pattern, plugboard, DEFAULT_DICTIONARY, top_n=5, scorer=scorer)
+                for s, combo, pts in results:
+                    print(f"\nOffsets {combo} | Score={s:g}")
+                    for pt in pts:
+                        print(f"  {pt}")
+
+            case 8:
+                try:
+                    from . import jobs
+                except ImportError:  # Running directly
+                    import jobs
+
+                action = input("1) Submit  2) List  3) Cancel  4) Collect: ").strip()
+                if action == '1':
+                    ct = input("Ciphertext: ")
+                    pat_in = input("Pattern (comma-separated, e.g. ?, 3-9, {1,4,7}) or blank to reuse current: ").strip()
+                    scorer = input(f"Scorer ({'/'.join(SCORERS)}) [words]: ").strip().lower() or 'words'
+                    priority = int(input("Priority (higher runs first) [0]: ").strip() or '0')
+                    workers = int(input("CPUs for this job [1]: ").strip() or '1')
+                    try:
+                        pattern = parse_pattern(pat_in) if pat_in else rotor_pattern
+                        job_id = jobs.submit_job(ct, pattern, plugboard, priority=priority, scorer=scorer,
+                                                 workers=workers)
+                    except ValueError as e:
+                        print(e)
+                        continue
+                    print(f"Queued job #{job_id}. Run the queue with: python -m bombe.jobs run")
+                elif action == '2':
+                    for job in jobs.list_jobs():
+                        print(jobs.format_job(job))
+                elif action == '3':
+                    job_id = int(input("Job id: "))
+                    print("Cancelled" if jobs.cancel_job(job_id) else "Job already finished")
+                elif action == '4':
+                    job = jobs.collect(int(input("Job id: ")))
+                    if job is None or job["status"] != "done":
+                        print("No results yet" if job else "No such job")
+                        continue
+                    for s, combo, pt in job["results"]:
+                        print(f"Score={s:g} | Offsets {combo}\n{pt}\n")
 
             case _:
                 print("Unknown choice.")
@@ -0,0 +1,156 @@
+from array import array
+from collections import Counter
+import re
+
+try:
+    from .bombe import (Rotor, TopN, _keyspace_size, _normal_pattern, _pattern_values,
+                        decrypt_message, expand_unknowns)
+    from .scoring import _TOKEN_RE, WordScorer, make_scorer
+    from .wordlist import WordList
+except ImportError:  # Running directly
+    from bombe import (Rotor, TopN, _keyspace_size, _normal_pattern, _pattern_values,
+                       decrypt_message, expand_unknowns)
+    from scoring import _TOKEN_RE, WordScorer, make_scorer
+    from wordlist import WordList
+
+
+# ------------------------- CANDIDATE SET -------------------------
+# Changing the dictionary or the scorer doesn't change what any rotor setting
+# decrypts to, so a CandidateSet decrypts a keyspace once and later runs only
+# rescore. Settings that decrypt to the same text (equivalent keys) share one
+# stored plaintext, and each plaintext keeps its settings as an array of
+# keyspace positions. With the "words" scorer, adding or removing a few words
+# only touches the plaintexts that contain them.
+
+# Candidates x message length a CandidateSet may hold (about that many bytes of plaintext,
+# ASCII); bigger jobs use the streaming guess_offsets search, whose memory doesn't grow
+MAX_LETTERS = 16 * 1024 * 1024
+
+
+def fits(ciphertext: str, candidates: int) -> bool:
+    # Whether a CandidateSet of this many candidates stays within MAX_LETTERS
+    return candidates * max(1, len(ciphertext)) <= MAX_LETTERS
+
+
+def _dictionary_key(dict_words):
+    # (identity of a compiled word list or None, multiset of the loose words)
+    if isinstance(dict_words, WordList):
+        return dict_words.base_digest, Counter(dict_words.extra)
+    return None, Counter(w.upper() for w in dict_words if w)
+
+
+class CandidateSet:
+    """Every plaintext of one ciphertext/pattern/plugboard, ready to be re-ranked.
+
+    Building it decrypts the whole keyspace (progress(processed, total) is
+    called every report_every candidates); rank() then gives the same results as
+    guess_offsets without decrypting anything.
+    """
+
+    def __init__(self, ciphertext: str, rotor_pattern: list[str], plugboard_map: dict,
+                 progress=None, report_every: int = 1000):
+        self.ciphertext = ciphertext
+        self.rotor_pattern = _normal_pattern(rotor_pattern)
+        self.plugboard_map = dict(plugboard_map)
+        self._values = _pattern_values(self.rotor_pattern)
+        self.total = _keyspace_size(self.rotor_pattern)
+
+        self.plaintexts: list[str] = []
+        self.positions: list[array] = []  # keyspace positions decrypting to each plaintext
+        seen = {}
+        digit = [{v: d for d, v in enumerate(vals)} for vals in self._values]
+        for done, combo in enumerate(expand_unknowns(self.rotor_pattern)):
+            if progress and done % report_every == 0:
+                progress(done, self.total)
+            # Position in the full product of the rotor domains, so _combo can decode it
+            # even when relations between rotors leave gaps
+            position = 0
+            for o, vals, index in zip(combo, self._values, digit):
+                position = position * len(vals) + index[o]
+            pt = decrypt_message(ciphertext, [Rotor(o) for o in combo], plugboard_map)
+            group = seen.get(pt)
+            if group is None:
+                group = seen[pt] = len(self.plaintexts)
+                self.plaintexts.append(pt)
+                self.positions.append(array("I"))
+            self.positions[group].append(position)
+        if progress:
+            progress(self.total, self.total)
+
+        self._tokens = None      # token -> plaintexts containing it, built on the first word delta
+        self._words = None       # (word list identity, word multiset, scores) of the last "words" ranking
+        self._named = {}         # other scorer name -> scores
+
+    def matches(self, ciphertext: str, rotor_pattern: list[str], plugboard_map: dict) -> bool:
+        return (ciphertext == self.ciphertext and _normal_pattern(rotor_pattern) == self.rotor_pattern
+                and dict(plugboard_map) == self.plugboard_map)
+
+    def _combo(self, position: int) -> tuple[int, ...]:
+        # Keyspace position -> offsets, the inverse of expand_unknowns' order
+        digits = []
+        for vals in reversed(self._values):
+            position, d = divmod(position, len(vals))
+            digits.append(vals[d])
+        return tuple(reversed(digits))
+
+    def _token_index(self) -> dict:
+        if self._tokens is None:
+            index = {}
+            for group, pt in enumerate(self.plaintexts):
+                for token in set(_TOKEN_RE.findall(pt.upper())):
+                    index.setdefault(token, array("I")).append(group)
+            self._tokens = index
+        return self._tokens
+
+    def _apply_words(self, scores: list, words: Counter, sign: int) -> None:
+        # WordScorer scores add up over the dictionary, so a word's share can be added or removed alone
+        for word, n in words.items():
+            if _TOKEN_RE.fullmatch(word):
+                for group in self._token_index().get(word, ()):
+                    scores[group] += sign * n
+            else:
+                pattern = re.compile(r"\b" + re.escape(word) + r"\b")
+                for group, pt in enumerate(self.plaintexts):
+                    if pattern.search(pt.upper()):
+                        scores[group] += sign * n
+
+    def _scores(self, dict_words, scorer) -> list:
+        if scorer != "words":
+            if not isinstance(scorer, str):
+                return [scorer.score(pt) for pt in self.plaintexts]
+            if scorer not in self._named:
+                score = make_scorer(scorer, dict_words).score
+                self._named[scorer] = [score(pt) for pt in self.plaintexts]
+            return self._named[scorer]
+
+        base, words = _dictionary_key(dict_words)
+        if self._words is not None and self._words[0] == base:
+            _, previous, scores = self._words
+            scores = list(scores)
+            self._apply_words(scores, words - previous, 1)
+            self._apply_words(scores, previous - words, -1)
+        else:
+            score = WordScorer(dict_words).score
+            scores = [score(pt) for pt in self.plaintexts]
+        self._words = (base, words, scores)
+        return scores
+
+    def rank(self, dict_words, scorer="words", top_n: int = 10) -> list[tuple[int, tuple[int, ...], str]]:
+        # Same (score, offsets, plaintext) list guess_offsets returns for this ciphertext and pattern
+        scores = self._scores(dict_words, scorer)
+        best = TopN(top_n)
+        where = {}
+        pushed = 0
+        cutoff = None
+        for group in sorted(range(len(scores)), key=lambda g: -scores[g]):
+            # Take whole score levels until top_n settings are in, ties are settled by TopN
+            if cutoff is not None and scores[group] < cutoff:
+                break
+            for position in self.positions[group]:
+                combo = self._combo(position)
+                if best.push(scores[group], combo):
+                    where[combo] = group
+            pushed += len(self.positions[group])
+            if cutoff is None and pushed >= top_n:
+                cutoff = scores[group]
+        return [(s, combo, self.plaintexts[where[combo]]) for s, combo in best.items()]
@@ -0,0 +1,206 @@
+try:
+    from .bombe import _pattern_relations, _pattern_values, _relations_hold, plugboard_apply
+except ImportError:  # Running directly
+    from bombe import _pattern_relations, _pattern_values, _relations_hold, plugboard_apply
+
+
+# ------------------------- KNOWN-PLAINTEXT SOLVER -------------------------
+def _solve_odometer(shifts: list[int], n_rotors: int) -> list[int]:
+    """All odometer values u (n_rotors base-26 digits) whose digit sums give `shifts`.
+
+    shifts[j] is the decrypt shift needed j steps after u, i.e. the digit sum of
+    (u + j) mod 26^n_rotors, taken mod 26. The last digit x0 is tried directly;
+    it fixes where the carries fall, and each block of 26 steps then needs one
+    digit sum from the remaining rotors, which is the same problem one rotor
+    shorter.
+    """
+    if n_rotors == 0:
+        return [0] if all(s % 26 == 0 for s in shifts) else []
+
+    values = []
+    for x0 in range(26):
+        higher: list[int] = []
+        for j, s in enumerate(shifts):
+            block, digit = divmod(x0 + j, 26)
+            need = (s - digit) % 26
+            if block == len(higher):
+                higher.append(need)
+            elif higher[block] != need:
+                break
+        else:
+            for q in _solve_odometer(higher, n_rotors - 1):
+                values.append(q * 26 + x0)
+    return values
+
+
+def _letter_stream(ciphertext: str, plugboard_map: dict) -> tuple[list[int], list[int]]:
+    # (letter code or -1, index into ciphertext) for every char that steps the rotors
+    codes, where = [], []
+    for i, ch in enumerate(plugboard_apply(ciphertext, plugboard_map)):
+        if ch.isalpha():
+            codes.append(ord(ch) - 97 if 'a' <= ch <= 'z' else -1)
+            where.append(i)
+    return codes, where
+
+
+def _offsets_from_value(value: int, n_rotors: int) -> tuple[int, ...]:
+    digits = []
+    for _ in range(n_rotors):
+        digits.append(value % 26)
+        value //= 26
+    return tuple(reversed(digits))
+
+
+def solve_crib(ciphertext: str,
+               crib: str,
+               rotor_pattern: list[str],
+               plugboard_map: dict | None = None,
+               position: int | None = None) -> list[tuple[int, tuple[int, ...]]]:
+    """Solve rotor offsets from a suspected plaintext fragment (crib).
+
+    The crib's letters are slid along the ciphertext letters (non-letters are
+    ignored on both sides). Each alignment implies one decrypt shift per letter;
+    only offsets whose odometer stepping produces exactly those shifts are kept,
+    so impossible alignments drop out immediately.
+
+    rotor_pattern gives the number of rotors and any offsets already known
+    ('?' = unknown). position, if given, is the ciphertext index the crib
+    starts at. Returns (position, offsets) pairs sorted by position then offsets.
+    """
+    plugboard_map = plugboard_map or {}
+    allowed = [set(vals) for vals in _pattern_values(rotor_pattern)]
+    relations = _pattern_relations(rotor_pattern)
+    n_rotors = len(allowed)
+    modulus = 26 ** n_rotors
+
+    # Plugboard the crib so that shift = pb(ciphertext) - pb(plaintext)
+    crib_codes = [ord(ch) - 97 for ch in plugboard_apply(crib, plugboard_map) if 'a' <= ch <= 'z']
+    codes, where = _letter_stream(ciphertext, plugboard_map)
+    if not crib_codes or len(crib_codes) > len(codes):
+        return []
+
+    if position is not None:
+        starts = [a for a in range(len(codes) - len(crib_codes) + 1) if where[a] == position]
+    elif n_rotors:
+        # Only alignments whose shifts step the way the rotors do can have a solution
+        starts = [a for a, _ in _drag(codes, crib_codes, n_rotors)]
+    else:
+        starts = range(len(codes) - len(crib_codes) + 1)
+
+    solutions = []
+    for a in starts:
+        window = codes[a:a + len(crib_codes)]
+        if -1 in window:
+            continue
+        shifts = [(c - p) % 26 for c, p in zip(window, crib_codes)]
+        for u in _solve_odometer(shifts, n_rotors):
+            # u is the odometer value at the crib's first letter, a + 1 steps in
+            offsets = _offsets_from_value((u - a - 1) % modulus, n_rotors)
+            if all(o in ok for o, ok in zip(offsets, allowed)) and _relations_hold(relations, offsets):
+                solutions.append((where[a], offsets))
+    solutions.sort()
+    return solutions
+
+
+# ------------------------- CRIB DRAGGING -------------------------
+# Between two letters the decrypt shift goes up by exactly 1, except once every
+# 26 letters, when the last rotor carries and it goes up by 2..n_rotors (mod 26).
+# In differences of neighbouring letters, crib alignment a therefore fits when
+#
+#     dc[a + j] - dp[j] == 1   (mod 26)   for every j but one carry per 26
+#
+# where dc and dp are the ciphertext and crib differences. One big int per
+# difference value has a bit for every ciphertext position holding it, so a crib
+# letter is checked against every alignment at once with a shift and an AND.
+
+_NO_LETTER = 26  # difference next to a character that steps the rotors but isn't shifted
+
+
+def _difference_masks(codes: list[int]) -> list[int]:
+    # masks[v] has bit i set where codes[i + 1] - codes[i] == v (mod 26)
+    diffs = bytes(_NO_LETTER if c < 0 or d < 0 else (d - c) % 26 for c, d in zip(codes, codes[1:]))
+    masks = []
+    for v in range(26):
+        bits = diffs.translate(bytes(ord("1") if b == v else ord("0") for b in range(256)))
+        masks.append(int(bits[::-1], 2) if bits else 0)
+    return masks
+
+
+def _set_bits(value: int) -> list[int]:
+    bits = bin(value)[:1:-1]
+    out = []
+    i = bits.find("1")
+    while i >= 0:
+        out.append(i)
+        i = bits.find("1", i + 1)
+    return out
+
+
+def _drag(codes: list[int], crib_codes: list[int], n_rotors: int,
+          max_mismatches: int = 0) -> list[tuple[int, int]]:
+    # (alignment, mismatched differences) for every alignment with at most max_mismatches,
+    # best first. Alignments index the letter stream, not the ciphertext.
+    m = len(crib_codes)
+    alignments = len(codes) - m + 1
+    if m == 0 or alignments <= 0:
+        return []
+    if m == 1:
+        return [(a, 0) for a in range(alignments) if codes[a] >= 0]
+
+    masks = _difference_masks(codes)
+    valid = (1 << alignments) - 1
+    steps, carries = [], []
+    for j in range(m - 1):
+        dp = (crib_codes[j + 1] - crib_codes[j]) % 26
+        steps.append((masks[(dp + 1) % 26] >> j) & valid)
+        carry = 0
+        for k in range(2, n_rotors + 1):
+            carry |= masks[(dp + k) % 26]
+        carries.append((carry >> j) & valid)
+
+    # Carry phases: the carry falls on every 26th difference from r on, or not at all (None,
+    # only possible for cribs shorter than 27 letters). One rotor never changes the step.
+    if n_rotors > 1:
+        phases = list(range(min(26, m - 1))) + ([None] if m - 1 < 26 else [])
+    else:
+        phases = [None]
+    best = [0] * (max_mismatches + 1)
+    for r in phases:
+        # counts[i] = alignments with exactly i mismatches so far
+        counts = [valid] + [0] * max_mismatches
+        for j in range(m - 1):
+            fits = carries[j] if r is not None and j % 26 == r else steps[j]
+            miss = valid ^ fits
+            for i in range(max_mismatches, 0, -1):
+                counts[i] = (counts[i] & ~miss) | (counts[i - 1] & miss)
+            counts[0] &= ~miss
+        for i in range(max_mismatches + 1):
+            best[i] |= counts[i]
+
+    ranked, seen = [], 0
+    for i, found in enumerate(best):
+        ranked.extend((a, i) for a in _set_bits(found & ~seen))
+        seen |= found
+    return ranked
+
+
+def drag_crib(ciphertext: str,
+              crib: str,
+              rotor_pattern: list[str],
+              plugboard_map: dict | None = None,
+              max_mismatches: int = 0,
+              limit: int | None = None) -> list[tuple[int, int]]:
+    """Slide a crib along the ciphertext and rank the positions it could sit at.
+
+    An alignment is plausible when the shifts it implies step the way
+    len(rotor_pattern) rotors do. Returns (position, mismatches) pairs, fewest
+    mismatched letter steps first, then by ciphertext position; max_mismatches
+    > 0 also lists near misses (e.g. under a wrong plugboard). Works on whole
+    ciphertexts of megabytes; positions with 0 mismatches can go straight to
+    solve_crib(..., position=position).
+    """
+    plugboard_map = plugboard_map or {}
+    crib_codes = [ord(ch) - 97 for ch in plugboard_apply(crib, plugboard_map) if 'a' <= ch <= 'z']
+    codes, where = _letter_stream(ciphertext, plugboard_map)
+    ranked = [(where[a], miss) for a, miss in _drag(codes, crib_codes, len(rotor_pattern), max_mismatches)]
+    return ranked if limit is None else ranked[:limit]
@@ -0,0 +1,125 @@
+import json
+import sys
+
+try:
+    from .bombe import _pattern_relations, _pattern_values, _relations_hold, plugboard_apply
+    from .crib import _offsets_from_value
+    from .database import (INDEX_MAX_BYTES, INDEX_PATH, init_cribs, close_db, save_crib, load_cribs,
+                           find_fragment, touch_crib)
+except ImportError:  # Running directly
+    from bombe import _pattern_relations, _pattern_values, _relations_hold, plugboard_apply
+    from crib import _offsets_from_value
+    from database import (INDEX_MAX_BYTES, INDEX_PATH, init_cribs, close_db, save_crib, load_cribs,
+                          find_fragment, touch_crib)
+
+
+# ------------------------- CRIB INDEX -------------------------
+# Stock openings ("weather report", "nothing to report", ...) are enciphered
+# once under every rotor setting and the resulting ciphertext fragments stored
+# in SQLite (database.py), indexed by fragment. A new message that starts with
+# a registered crib then gives up its key with one indexed lookup per crib
+# length, before any search runs. Fragments hold only the characters that step
+# the rotors, so spacing and punctuation in the message don't matter.
+
+def _plugboard_key(plugboard_map: dict) -> str:
+    return json.dumps(sorted([k, v] for k, v in plugboard_map.items()))
+
+
+def _stream(text: str) -> str:
+    # The characters that step the rotors, lowercased
+    return "".join(ch for ch in text.lower() if ch.isalpha())
+
+
+def _fragments(crib: str, rotors: int, plugboard_map: dict):
+    # (ciphertext fragment, odometer value) for a message starting with `crib`, every setting
+    letters = _stream(plugboard_apply(crib, plugboard_map))
+    modulus = 26 ** rotors
+    digit_sums = [0] * modulus
+    for v in range(1, modulus):
+        digit_sums[v] = (digit_sums[v // 26] + v % 26) % 26
+    shifted = [(t + 1, ord(ch) - 97) for t, ch in enumerate(letters) if 'a' <= ch <= 'z']
+    out = list(letters)
+    for value in range(modulus):
+        for t, code in shifted:
+            out[t - 1] = chr(97 + (code + digit_sums[(value + t) % modulus]) % 26)
+        yield plugboard_apply("".join(out), plugboard_map), value
+
+
+def add_cribs(cribs, rotors: int = 3, plugboard_map: dict | None = None, path: str = INDEX_PATH,
+              max_bytes: int = INDEX_MAX_BYTES) -> int:
+    """Index message openings under every setting of `rotors` rotors.
+
+    Cribs already in the index (for this rotor count and plugboard) are
+    skipped, so new ones can be added at any time. Once the index grows past
+    max_bytes, the cribs matched least recently are dropped. Returns the
+    number of cribs added.
+    """
+    plugboard_map = plugboard_map or {}
+    plugboard = _plugboard_key(plugboard_map)
+    database = init_cribs(path)
+    try:
+        known = {(crib, r, pb) for _, crib, r, pb, _ in load_cribs(database)}
+        added = 0
+        for crib in cribs:
+            crib = crib.strip().lower()
+            if not _stream(crib) or (crib, rotors, plugboard) in known:
+                continue
+            save_crib(database, crib, rotors, plugboard, len(_stream(crib)),
+                      _fragments(crib, rotors, plugboard_map), max_bytes)
+            known.add((crib, rotors, plugboard))
+            added += 1
+    finally:
+        close_db(database)
+    return added
+
+
+def lookup_key(ciphertext: str, rotor_pattern: list[str], plugboard_map: dict | None = None,
+               path: str = INDEX_PATH) -> list[tuple[str, tuple[int, ...]]]:
+    # (crib, offsets) for every registered crib the message could start with, sorted.
+    # Offsets must fit rotor_pattern; several can match when settings are equivalent.
+    plugboard_map = plugboard_map or {}
+    plugboard = _plugboard_key(plugboard_map)
+    allowed = [set(vals) for vals in _pattern_values(rotor_pattern)]
+    relations = _pattern_relations(rotor_pattern)
+    stream = _stream(ciphertext)
+    database = init_cribs(path)
+    try:
+        cribs = {crib_id: (crib, length) for crib_id, crib, rotors, pb, length in load_cribs(database)
+                 if rotors == len(rotor_pattern) and pb == plugboard and length <= len(stream)}
+        hits, matched = [], set()
+        for length in {length for _, length in cribs.values()}:
+            for crib_id, value in find_fragment(database, stream[:length]):
+                if crib_id not in cribs:
+                    continue
+                offsets = _offsets_from_value(value, len(rotor_pattern))
+                if all(o in ok for o, ok in zip(offsets, allowed)) and _relations_hold(relations, offsets):
+                    hits.append((cribs[crib_id][0], offsets))
+                    matched.add(crib_id)
+        for crib_id in matched:
+            touch_crib(database, crib_id)
+    finally:
+        close_db(database)
+    return sorted(set(hits))
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) >= 2 and args[0] == "add":
+        added = add_cribs(args[1:])
+        print(f"Indexed {added} new crib(s)")
+    elif len(args) == 2 and args[0] == "lookup":
+        for crib, offsets in lookup_key(args[1], ['?', '?', '?']):
+            print(f"Offsets {offsets} | starts with '{crib}'")
+    elif args == ["list"]:
+        database = init_cribs(INDEX_PATH)
+        for _, crib, rotors, plugboard, _ in load_cribs(database):
+            print(f"{crib!r} ({rotors} rotors, plugboard {plugboard})")
+        close_db(database)
+    else:
+        print("Usage: cribindex.py add CRIB [CRIB ...] | lookup CIPHERTEXT | list\n"
+              " Indexes message openings for 3 rotors and no plugboard in " + INDEX_PATH)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+import json
+import sqlite3
+import sys
+import time
+
+CHECKPOINT_PATH = "bombe_checkpoint.db"
+CACHE_PATH = "bombe_cache.db"
+CACHE_MAX_BYTES = 16 * 1024 * 1024
+INDEX_PATH = "bombe_cribs.db"
+INDEX_MAX_BYTES = 64 * 1024 * 1024
+JOBS_PATH = "bombe_jobs.db"
+
+##########################################################
+# Connect to a bombe DB file (shared with job processes) #
+##########################################################
+def _connect(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect(db_path, timeout=30)
+
+###############################################
+# Open a checkpoint file (searches to resume) #
+###############################################
+def init_checkpoints(db_path=CHECKPOINT_PATH):
+    # One row per search in progress, keyed by the hash of its configuration
+    database = _connect(db_path)
+    database.execute("""
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            config_hash TEXT    PRIMARY KEY,
+            position    INTEGER NOT NULL,
+            total       INTEGER NOT NULL,
+            top         TEXT    NOT NULL,
+            updated     REAL    NOT NULL
+        );
+    """)
+    database.commit()
+    return database
+
+#################################################
+# Open a result cache (finished search results) #
+#################################################
+def init_results(db_path=CACHE_PATH):
+    # Finished guess_offsets results, one row per (search inputs, rotor pattern)
+    database = _connect(db_path)
+    database.execute("""
+        CREATE TABLE IF NOT EXISTS results (
+            config_hash TEXT    NOT NULL,
+            pattern     TEXT    NOT NULL,
+            top_n       INTEGER NOT NULL,
+            complete    INTEGER NOT NULL,
+            top         TEXT    NOT NULL,
+            size        INTEGER NOT NULL,
+            used        REAL    NOT NULL,
+            PRIMARY KEY (config_hash, pattern)
+        );
+    """)
+    database.commit()
+    return database
+
+##########################
+# Open a crib index file #
+##########################
+def init_cribs(db_path=INDEX_PATH):
+    # One row per registered crib, one per (crib, rotor setting) ciphertext fragment
+    database = _connect(db_path)
+    cursor = database.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cribs (
+            crib_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+            crib        TEXT    NOT NULL,
+            rotors      INTEGER NOT NULL,
+            plugboard   TEXT    NOT NULL,
+            length      INTEGER NOT NULL,
+            size        INTEGER NOT NULL,
+            used        REAL    NOT NULL,
+            UNIQUE (crib, rotors, plugboard)
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS crib_fragments (
+            fragment    TEXT    NOT NULL,
+            crib_id     INTEGER NOT NULL,
+            value       INTEGER NOT NULL
+        );
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS crib_fragments_by_fragment ON crib_fragments (fragment)")
+    database.commit()
+    return database
+
+#########################
+# Open a job queue file #
+#########################
+def init_jobs(db_path=JOBS_PATH):
+    # One row per submitted search, run by jobs.Scheduler highest priority first.
+    # Running jobs also checkpoint into this file (see init_checkpoints).
+    database = _connect(db_path)
+    cursor = database.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+            priority    INTEGER NOT NULL,
+            status      TEXT    NOT NULL,
+            ciphertext  TEXT    NOT NULL,
+            params      TEXT    NOT NULL,
+            workers     INTEGER NOT NULL,
+            processed   INTEGER NOT NULL DEFAULT 0,
+            total       INTEGER NOT NULL DEFAULT 0,
+            results     TEXT,
+            error       TEXT,
+            submitted   REAL    NOT NULL,
+            started     REAL,
+            finished    REAL,
+            owner       TEXT,
+            held        INTEGER NOT NULL DEFAULT 0,
+            heartbeat   REAL
+        );
+    """)
+    # Files from before running jobs recorded the scheduler holding them
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(jobs)")}
+    for column, kind in (("owner", "TEXT"), ("held", "INTEGER NOT NULL DEFAULT 0"), ("heartbeat", "REAL")):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+    database.commit()
+    return database
+
+##################################
+# Function to close the database #
+##################################
+def close_db(database: sqlite3.Connection):
+    database.commit()
+    database.close()
+
+###########################################
+# Save how far a search got (and its top) #
+###########################################
+def save_checkpoint(database: sqlite3.Connection, config_hash: str, position: int, total: int, top: list):
+    # top is the search's current (score, offsets) list; position is the keyspace
+    # index the search would look at next (everything before it is in top)
+    cursor = database.cursor()
+    cursor.execute(
+        "INSERT OR REPLACE INTO checkpoints (config_hash, position, total, top, updated) VALUES (?, ?, ?, ?, ?)",
+        (config_hash, position, total, json.dumps([[s, list(c)] for s, c in top]), time.time())
+    )
+    database.commit()
+
+##########################################
+# Load a checkpoint, None if there isn't #
+##########################################
+def load_checkpoint(database: sqlite3.Connection, config_hash: str):
+    # Returns (position, [(score, offsets), ...]) or None
+    cursor = database.cursor()
+    cursor.execute("SELECT position, top FROM checkpoints WHERE config_hash = ?", (config_hash,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return row[0], [(s, tuple(c)) for s, c in json.loads(row[1])]
+
+###################################
+# Drop a finished search's record #
+###################################
+def clear_checkpoint(database: sqlite3.Connection, config_hash: str):
+    cursor = database.cursor()
+    cursor.execute("DELETE FROM checkpoints WHERE config_hash = ?", (config_hash,))
+    database.commit()
+
+########################################
+# Store a finished search's top N list #
+########################################
+def save_results(database: sqlite3.Connection, config_hash: str, pattern: list, top_n: int,
+                 complete: bool, top: list, max_bytes: int = CACHE_MAX_BYTES):
+    # complete means top holds every candidate of the pattern, not just the best top_n
+    data = json.dumps([[s, list(c)] for s, c in top])
+    cursor = database.cursor()
+    cursor.execute(
+        "INSERT OR REPLACE INTO results (config_hash, pattern, top_n, complete, top, size, used) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (config_hash, json.dumps(pattern), top_n, int(complete), data, len(data), time.time())
+    )
+
+    # Evict the least recently used rows once the cache is over its size budget
+    cursor.execute("SELECT rowid, size FROM results ORDER BY used DESC, rowid DESC")
+    kept = 0
+    for rowid, size in cursor.fetchall():
+        kept += size
+        if kept > max_bytes:
+            database.execute("DELETE FROM results WHERE rowid = ?", (rowid,))
+    database.commit()
+
+#############################################
+# Every cached result for one set of inputs #
+#############################################
+def load_results(database: sqlite3.Connection, config_hash: str):
+    # Returns [(pattern, top_n, complete, [(score, offsets), ...]), ...]
+    cursor = database.cursor()
+    cursor.execute("SELECT pattern, top_n, complete, top FROM results WHERE config_hash = ?", (config_hash,))
+    return [(json.loads(pattern), top_n, bool(complete), [(s, tuple(c)) for s, c in json.loads(top)])
+            for pattern, top_n, complete, top in cursor.fetchall()]
+
+#####################################
+# Mark a cached result as just used #
+#####################################
+def touch_results(database: sqlite3.Connection, config_hash: str, pattern: list):
+    database.execute("UPDATE results SET used = ? WHERE config_hash = ? AND pattern = ?",
+                     (time.time(), config_hash, json.dumps(pattern)))
+    database.commit()
+
+#########################################
+# Add one crib's fragments to the index #
+#########################################
+def save_crib(database: sqlite3.Connection, crib: str, rotors: int, plugboard: str, length: int,
+              fragments, max_bytes: int = INDEX_MAX_BYTES):
+    # fragments is an iterable of (fragment, odometer value); plugboard is a JSON string
+    cursor = database.cursor()
+    cursor.execute("INSERT INTO cribs (crib, rotors, plugboard, length, size, used) VALUES (?, ?, ?, ?, 0, ?)",
+                   (crib, rotors, plugboard, length, time.time()))
+    crib_id = cursor.lastrowid
+    rows = [(fragment, crib_id, value) for fragment, value in fragments]
+    cursor.executemany("INSERT INTO crib_fragments (fragment, crib_id, value) VALUES (?, ?, ?)", rows)
+    cursor.execute("UPDATE cribs SET size = ? WHERE crib_id = ?",
+                   (sum(2 * len(f) + 24 for f, _, _ in rows), crib_id))  # fragment is stored twice, row + index
+
+    # Drop the least recently matched cribs once the index is over its size budget
+    cursor.execute("SELECT crib_id, size FROM cribs ORDER BY used DESC, crib_id DESC")
+    kept = 0
+    for old_id, size in cursor.fetchall():
+        kept += size
+        if kept > max_bytes:
+            database.execute("DELETE FROM crib_fragments WHERE crib_id = ?", (old_id,))
+            database.execute("DELETE FROM cribs WHERE crib_id = ?", (old_id,))
+    database.commit()
+
+######################################
+# Registered cribs, newest use first #
+######################################
+def load_cribs(database: sqlite3.Connection):
+    # Returns [(crib_id, crib, rotors, plugboard, length), ...]
+    cursor = database.cursor()
+    cursor.execute("SELECT crib_id, crib, rotors, plugboard, length FROM cribs ORDER BY used DESC, crib_id DESC")
+    return cursor.fetchall()
+
+###########################################
+# Every (crib_id, value) for one fragment #
+###########################################
+def find_fragment(database: sqlite3.Connection, fragment: str):
+    cursor = database.cursor()
+    cursor.execute("SELECT crib_id, value FROM crib_fragments WHERE fragment = ?", (fragment,))
+    return cursor.fetchall()
+
+###############################
+# Mark a crib as just matched #
+###############################
+def touch_crib(database: sqlite3.Connection, crib_id: int):
+    database.execute("UPDATE cribs SET used = ? WHERE crib_id = ?", (time.time(), crib_id))
+    database.commit()
+
+#######################################
+# Queue a job, returns its new job_id #
+#######################################
+def save_job(database: sqlite3.Connection, ciphertext: str, params: dict, priority: int, workers: int) -> int:
+    cursor = database.cursor()
+    cursor.execute("INSERT INTO jobs (priority, status, ciphertext, params, workers, submitted) "
+                   "VALUES (?, 'queued', ?, ?, ?, ?)",
+                   (priority, ciphertext, json.dumps(params), workers, time.time()))
+    database.commit()
+    return cursor.lastrowid
+
+###########################################
+# Jobs as dicts, newest first (or one id) #
+###########################################
+def load_jobs(database: sqlite3.Connection, status: str | None = None, job_id: int | None = None) -> list[dict]:
+    # results is [(score, offsets, plaintext), ...] once the job is done, else None
+    query = "SELECT * FROM jobs"
+    where, args = [], []
+    if status is not None:
+        where.append("status = ?")
+        args.append(status)
+    if job_id is not None:
+        where.append("job_id = ?")
+        args.append(job_id)
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    cursor = database.cursor()
+    cursor.execute(query + " ORDER BY job_id DESC", args)
+    names = [d[0] for d in cursor.description]
+    jobs = []
+    for row in cursor.fetchall():
+        job = dict(zip(names, row))
+        job["params"] = json.loads(job["params"])
+        if job["results"] is not None:
+            job["results"] = [(s, tuple(c), pt) for s, c, pt in json.loads(job["results"])]
+        jobs.append(job)
+    return jobs
+
+#################################################
+# Take the next queued job, None if there isn't #
+#################################################
+def claim_job(database: sqlite3.Connection, owner: str, cpus: int):
+    # Highest priority first, oldest first within a priority. CPUs held by running jobs,
+    # whichever scheduler runs them, count against the budget of `cpus`; a job wanting more
+    # than is free waits, unless nothing is running, when it gets all `cpus`.
+    # Returns the job_id, now marked running for `owner`.
+    cursor = database.cursor()
+    cursor.execute("BEGIN IMMEDIATE")  # no other scheduler can claim the same row
+    cursor.execute("SELECT COUNT(*), COALESCE(SUM(held), 0) FROM jobs WHERE status = 'running'")
+    running, used = cursor.fetchone()
+    row = None
+    if cpus - used > 0:
+        cursor.execute("SELECT job_id, workers FROM jobs WHERE status = 'queued' AND workers <= ? "
+                       "ORDER BY priority DESC, job_id LIMIT 1", (cpus - used if running else sys.maxsize,))
+        row = cursor.fetchone()
+    if row is not None:
+        now = time.time()
+        cursor.execute("UPDATE jobs SET status = 'running', started = ?, owner = ?, held = ?, heartbeat = ? "
+                       "WHERE job_id = ?", (now, owner, min(row[1], cpus), now, row[0]))
+    database.commit()
+    return None if row is None else row[0]
+
+################################
+# Record how far a job has got #
+################################
+def update_job_progress(database: sqlite3.Connection, job_id: int, processed: int, total: int):
+    database.execute("UPDATE jobs SET processed = ?, total = ? WHERE job_id = ?", (processed, total, job_id))
+    database.commit()
+
+############################################
+# Close a job as done, failed or cancelled #
+############################################
+def finish_job(database: sqlite3.Connection, job_id: int, status: str, results: list | None = None,
+               error: str | None = None, owner: str | None = None):
+    # Only a running (or queued, when cancelling) job is closed; a cancelled one stays cancelled.
+    # With an owner, only while that scheduler still holds the job.
+    data = None if results is None else json.dumps([[s, list(c), pt] for s, c, pt in results])
+    cursor = database.cursor()
+    cursor.execute("UPDATE jobs SET status = ?, results = ?, error = ?, finished = ? "
+                   "WHERE job_id = ? AND status IN ('queued', 'running') AND (? IS NULL OR owner = ?)",
+                   (status, data, error, time.time(), job_id, owner, owner))
+    database.commit()
+    return cursor.rowcount > 0
+
+#################################################
+# Mark the jobs a scheduler runs as still alive #
+#################################################
+def heartbeat_jobs(database: sqlite3.Connection, owner: str):
+    database.execute("UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status = 'running'", (time.time(), owner))
+    database.commit()
+
+################################################################
+# Put a running job back in the queue, if `owner` still has it #
+################################################################
+def requeue_job(database: sqlite3.Connection, job_id: int, owner: str | None):
+    cursor = database.cursor()
+    cursor.execute("UPDATE jobs SET status = 'queued', started = NULL, owner = NULL, held = 0, heartbeat = NULL "
+                   "WHERE job_id = ? AND status = 'running' AND owner IS ?", (job_id, owner))
+    database.commit()
+    return cursor.rowcount > 0
@@ -0,0 +1,85 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+try:
+    from .bombe import Rotor, TopN, _can_prune, _shard_pattern, decrypt_message, expand_unknowns
+    from .scoring import make_scorer
+except ImportError:  # Running directly
+    from bombe import Rotor, TopN, _can_prune, _shard_pattern, decrypt_message, expand_unknowns
+    from scoring import make_scorer
+
+
+# ------------------------- MESSAGES IN DEPTH -------------------------
+def _depth_scan(ciphertexts: list[str], rotor_pattern: list[str], plugboard_map: dict,
+                scorer, best: TopN, prune: bool = True) -> int:
+    """Score every candidate on the sum of its scores over all messages into `best`.
+
+    Messages are decrypted longest first. With prune=True and a scorer that
+    provides bound_for, a candidate is dropped as soon as its score so far plus
+    the best the remaining messages could add can no longer reach the top N.
+    Returns the number of message decryptions done.
+    """
+    order = sorted(range(len(ciphertexts)), key=lambda i: -len(ciphertexts[i]))
+    # Most each message could still add, for the messages after position k in `order`
+    ceilings = [float("inf")] * len(order)
+    if prune and hasattr(scorer, "bound_for"):
+        for k, i in enumerate(order):
+            bound = scorer.bound_for(ciphertexts[i]) if _can_prune(ciphertexts[i], plugboard_map) else None
+            if bound is not None:
+                ceilings[k] = bound("")
+    remaining = [sum(ceilings[k + 1:]) for k in range(len(order))]
+
+    decrypts = 0
+    for combo in expand_unknowns(rotor_pattern):
+        total = 0
+        for k, i in enumerate(order):
+            pt = decrypt_message(ciphertexts[i], [Rotor(o) for o in combo], plugboard_map)
+            decrypts += 1
+            total += scorer.score(pt)
+            if k + 1 < len(order) and not best.could_enter(total + remaining[k], combo):
+                break
+        else:
+            best.push(total, combo)
+    return decrypts
+
+
+def _depth_shard(ciphertexts: list[str], rotor_pattern: list[str], plugboard_map: dict,
+                 dict_words: list[str], top_n: int, scorer="words", prune: bool = True) -> list[tuple]:
+    # Module level so ProcessPoolExecutor workers can pickle it
+    best = TopN(top_n)
+    _depth_scan(ciphertexts, rotor_pattern, plugboard_map, make_scorer(scorer, dict_words), best, prune)
+    return best.items()
+
+
+def guess_offsets_depth(ciphertexts: list[str],
+                        rotor_pattern: list[str],
+                        plugboard_map: dict,
+                        dict_words: list[str],
+                        top_n: int = 10,
+                        workers: int | None = 1,
+                        scorer="words",
+                        prune: bool = True) -> list[tuple[float, tuple[int, ...], list[str]]]:
+    # Bombe for several messages sent with the same rotor offsets and plugboard.
+    # Each candidate is tried once against all of them and ranked on the summed
+    # score, so short messages that are ambiguous alone still pin the key down.
+    # Returns (total_score, offsets, plaintexts) best first, plaintexts in input order.
+    # workers and scorer work as in guess_offsets; prune=True rejects a candidate
+    # early once the messages decrypted so far rule it out (same results either way).
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    best = TopN(top_n)
+    shards = _shard_pattern(rotor_pattern)
+    if workers > 1 and len(shards) > 1:
+        n = len(shards)
+        with ProcessPoolExecutor(max_workers=min(workers, n)) as pool:
+            for items in pool.map(_depth_shard, [ciphertexts] * n, shards, [plugboard_map] * n,
+                                  [dict_words] * n, [top_n] * n, [scorer] * n, [prune] * n):
+                best.merge(items)
+    else:
+        _depth_scan(ciphertexts, rotor_pattern, plugboard_map, make_scorer(scorer, dict_words), best, prune)
+
+    results = []
+    for s, combo in best.items():
+        rotors = [Rotor(o) for o in combo]
+        results.append((s, combo, [decrypt_message(ct, rotors, plugboard_map) for ct in ciphertexts]))
+    return results
@@ -0,0 +1,241 @@
+from collections import deque
+import json
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+try:
+    from .bombe import Rotor, TopN, _search_shard, _shard_pattern, decrypt_message
+    from .wordlist import WordList, load_word_list
+except ImportError:  # Running directly
+    from bombe import Rotor, TopN, _search_shard, _shard_pattern, decrypt_message
+    from wordlist import WordList, load_word_list
+
+
+# ------------------------- DISTRIBUTED SEARCH -------------------------
+# A coordinator splits a guess_offsets keyspace into work units and serves them
+# over TCP; workers (here or on other hosts) pull units, search them and send
+# back their local top N. Every message is one JSON object per line:
+#
+#   worker -> {"op": "hello"}                      <- {"op": "job", "job": {...}}
+#   worker -> {"op": "next"}                       <- {"op": "unit", "id": 3, "pattern": [...]}
+#                                                     {"op": "wait"} or {"op": "done"}
+#   worker -> {"op": "result", "id": 3, "top": [[score, [offsets]], ...]}
+#
+# Units held by a worker whose connection drops go back on the queue. Once the
+# queue is empty, idle workers are handed a copy of the longest-running unit
+# still out (work stealing), and whichever copy finishes first counts.
+
+def _split_pattern(rotor_pattern: list[str], units: int) -> list[list[str]]:
+    # Shard on successive unknown rotors until there are at least `units` pieces
+    pieces = [list(rotor_pattern)]
+    while len(pieces) < units:
+        split = []
+        for piece in pieces:
+            split.extend(_shard_pattern(piece))
+        if len(split) == len(pieces):
+            break
+        pieces = split
+    return pieces
+
+
+def _send(stream, message: dict) -> None:
+    stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+
+def _receive(stream) -> dict | None:
+    line = stream.readline()
+    return json.loads(line) if line else None
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _LineWriter:
+    # Text wrapper around a handler's binary wfile so _send works on both ends
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text: str) -> None:
+        self.wfile.write(text.encode())
+
+    def flush(self) -> None:
+        self.wfile.flush()
+
+
+class Coordinator:
+    """Serves one guess_offsets search to any number of workers.
+
+    Use start(), point workers at .address (run_worker or the command line),
+    then wait() for the results, which match guess_offsets. The scorer must be
+    a name from scoring.SCORERS; a compiled word list is sent as its path, so
+    workers on other hosts need the same file at the same path.
+    """
+
+    def __init__(self, ciphertext: str, rotor_pattern: list[str], plugboard_map: dict,
+                 dict_words, top_n: int = 10, scorer: str = "words", prune: bool = False,
+                 units: int = 64, host: str = "127.0.0.1", port: int = 0):
+        if not isinstance(scorer, str):
+            raise ValueError("Distributed searches need a scorer name")
+        if isinstance(dict_words, WordList):
+            words = {"word_list": dict_words.path, "extra": list(dict_words.extra)}
+        else:
+            words = list(dict_words)
+        self.ciphertext = ciphertext
+        self.plugboard_map = plugboard_map
+        self.job = {"ciphertext": ciphertext, "plugboard_map": plugboard_map, "words": words,
+                    "top_n": top_n, "scorer": scorer, "prune": prune}
+        self.units = _split_pattern(rotor_pattern, units)
+        self.best = TopN(top_n)
+
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._pending = deque(range(len(self.units)))
+        self._holders: dict[int, int] = {}   # unit id -> connections working on it
+        self._leased: dict[int, float] = {}  # unit id -> when it was first handed out
+        self._done: set[int] = set()
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                # Messages are small request/reply pairs, don't let Nagle hold them back
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def handle(self):
+                held = set()
+                try:
+                    coordinator._serve(self.rfile, _LineWriter(self.wfile), held)
+                except (OSError, ValueError):
+                    pass
+                finally:
+                    coordinator._release(held)
+
+        self._server = _Server((host, port), Handler)
+        self.address = self._server.server_address
+
+    def _serve(self, rfile, writer, held: set) -> None:
+        while True:
+            message = _receive(rfile)
+            if message is None:
+                return
+            op = message.get("op")
+            if op == "hello":
+                _send(writer, {"op": "job", "job": self.job})
+            elif op == "next":
+                _send(writer, self._next_unit(held))
+            elif op == "result":
+                self._finish(message["id"], message["top"], held)
+
+    def _next_unit(self, held: set) -> dict:
+        with self._lock:
+            if self._finished.is_set():
+                return {"op": "done"}
+            if self._pending:
+                unit = self._pending.popleft()
+                self._leased.setdefault(unit, time.monotonic())
+            else:
+                # Steal: duplicate the unit that has been out the longest
+                out = [u for u in self._leased if u not in self._done and u not in held]
+                if not out:
+                    return {"op": "wait"}
+                unit = min(out, key=self._leased.get)
+            held.add(unit)
+            self._holders[unit] = self._holders.get(unit, 0) + 1
+            return {"op": "unit", "id": unit, "pattern": self.units[unit]}
+
+    def _finish(self, unit: int, top: list, held: set) -> None:
+        with self._lock:
+            # A result for a unit this connection doesn't hold (an unknown id, or one already
+            # reported) is ignored rather than allowed to upset the bookkeeping
+            if unit not in held:
+                return
+            held.discard(unit)
+            self._holders[unit] -= 1
+            if unit in self._done:
+                return
+            self._done.add(unit)
+            self.best.merge((s, tuple(combo)) for s, combo in top)
+            if len(self._done) == len(self.units):
+                self._finished.set()
+
+    def _release(self, held: set) -> None:
+        # Connection gone: its unfinished units go back to the front of the queue
+        with self._lock:
+            for unit in held:
+                self._holders[unit] -= 1
+                if unit not in self._done and self._holders[unit] == 0 and unit not in self._pending:
+                    self._leased.pop(unit, None)
+                    self._pending.appendleft(unit)
+            held.clear()
+
+    def start(self) -> tuple:
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.address
+
+    def wait(self, timeout: float | None = None) -> list[tuple[int, tuple[int, ...], str]]:
+        # Block until every unit is in, then stop serving. Raises TimeoutError on timeout.
+        try:
+            if not self._finished.wait(timeout):
+                raise TimeoutError(f"{len(self._done)}/{len(self.units)} units finished")
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
+        results = []
+        for s, combo in self.best.items():
+            pt = decrypt_message(self.ciphertext, [Rotor(o) for o in combo], self.plugboard_map)
+            results.append((s, combo, pt))
+        return results
+
+
+def run_worker(host: str, port: int, poll_seconds: float = 0.2) -> int:
+    """Connect to a coordinator and search units until it says done.
+
+    Returns the number of units this worker finished.
+    """
+    finished = 0
+    with socket.create_connection((host, port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = sock.makefile("rw", encoding="utf-8", newline="\n")
+        _send(stream, {"op": "hello"})
+        job = _receive(stream)["job"]
+        words = job["words"]
+        if isinstance(words, dict):
+            words = load_word_list(words["word_list"]).with_words(words["extra"])
+
+        while True:
+            _send(stream, {"op": "next"})
+            message = _receive(stream)
+            if message is None or message["op"] == "done":
+                break
+            if message["op"] == "wait":
+                time.sleep(poll_seconds)
+                continue
+            top = _search_shard(job["ciphertext"], message["pattern"], job["plugboard_map"], words,
+                                job["top_n"], job["scorer"], job["prune"])
+            _send(stream, {"op": "result", "id": message["id"], "top": [[s, list(c)] for s, c in top]})
+            finished += 1
+    return finished
+
+
+def main():
+    args = sys.argv[1:]
+
+    # Return "help" message unless started as a worker
+    if len(args) != 3 or args[0] != "worker":
+        print("Usage: distributed.py worker HOST PORT\n"
+              " Connects to a bombe Coordinator and works until the search is done")
+        sys.exit(1)
+
+    units = run_worker(args[1], int(args[2]))
+    print(f"Finished {units} unit(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+try:
+    from .bombe import DEFAULT_DICTIONARY, _keyspace_size, drop_checkpoint, guess_offsets, parse_pattern
+    from .database import (JOBS_PATH, init_jobs, close_db, save_job, load_jobs, claim_job, update_job_progress,
+                           finish_job, heartbeat_jobs, requeue_job)
+    from .scoring import SCORERS
+    from .wordlist import WordList
+except ImportError:  # Running directly
+    from bombe import DEFAULT_DICTIONARY, _keyspace_size, drop_checkpoint, guess_offsets, parse_pattern
+    from database import (JOBS_PATH, init_jobs, close_db, save_job, load_jobs, claim_job, update_job_progress,
+                          finish_job, heartbeat_jobs, requeue_job)
+    from scoring import SCORERS
+    from wordlist import WordList
+
+
+# ------------------------- JOB QUEUE -------------------------
+# Searches submitted as jobs wait in SQLite (database.py) instead of blocking
+# the session that asked for them. A Scheduler takes queued jobs highest
+# priority first and runs each guess_offsets call in its own process, as many
+# at once as its CPU budget allows (a job uses as many CPUs as its `workers`).
+# Several schedulers can share one file: they share the CPU budget, and each
+# marks the jobs it runs with its owner (host:pid:tag) and a heartbeat. Each
+# job checkpoints into the same file, so jobs of a scheduler that is stopped,
+# or that died (its process is gone or its heartbeat went stale), go back in
+# the queue and resume where they were. Results are stored with the job until
+# collected.
+#
+#   python -m bombe.jobs submit "<ciphertext>" "?,?,?" 5     queue with priority 5
+#   python -m bombe.jobs run 4                              run jobs on 4 CPUs
+#   python -m bombe.jobs list | cancel ID | collect ID
+
+PROGRESS_SECONDS = 2.0  # How often a running job writes its progress to the store
+HEARTBEAT_SECONDS = 10.0  # How often a scheduler marks its jobs as still running
+STALE_SECONDS = 60.0  # A running job not marked for this long has lost its scheduler
+
+
+def submit_job(ciphertext: str,
+               rotor_pattern: list[str],
+               plugboard_map: dict | None = None,
+               dict_words=None,
+               priority: int = 0,
+               top_n: int = 10,
+               scorer: str = "words",
+               workers: int = 1,
+               prune: bool = False,
+               cascade: list[tuple] | None = None,
+               path: str = JOBS_PATH) -> int:
+    """Queue a guess_offsets search and return its job id.
+
+    The arguments are those of guess_offsets. dict_words None means
+    DEFAULT_DICTIONARY when the job runs; a WordList is stored as its file
+    path. Higher priorities run first. Raises ValueError for a pattern or
+    scorer the search would reject.
+    """
+    if scorer not in SCORERS:
+        raise ValueError(f"Unknown scorer '{scorer}'")
+    rotor_pattern = parse_pattern(",".join(rotor_pattern))
+    if isinstance(dict_words, WordList):
+        words = {"word_list": dict_words.path, "words": list(dict_words.extra)}
+    else:
+        words = {"word_list": None, "words": None if dict_words is None else list(dict_words)}
+    params = {"rotor_pattern": rotor_pattern, "plugboard": dict(plugboard_map or {}), "dict_words": words,
+              "top_n": top_n, "scorer": scorer, "prune": prune,
+              "cascade": [list(stage) for stage in cascade] if cascade else None}
+    database = init_jobs(path)
+    try:
+        return save_job(database, ciphertext, params, priority, max(1, workers))
+    finally:
+        close_db(database)
+
+
+def list_jobs(status: str | None = None, path: str = JOBS_PATH) -> list[dict]:
+    # Every job, newest first, optionally only those with one status
+    # ("queued", "running", "done", "failed" or "cancelled")
+    database = init_jobs(path)
+    try:
+        return load_jobs(database, status)
+    finally:
+        close_db(database)
+
+
+def cancel_job(job_id: int, path: str = JOBS_PATH) -> bool:
+    # A queued job won't start; a running one is stopped by its scheduler. Either way
+    # its checkpoint goes. False if the job had already finished.
+    database = init_jobs(path)
+    try:
+        cancelled = finish_job(database, job_id, "cancelled")
+        job = load_jobs(database, job_id=job_id)[0] if cancelled else None
+    finally:
+        close_db(database)
+    if job is not None:
+        _drop_job_checkpoint(path, job)
+    return cancelled
+
+
+def collect(job_id: int, path: str = JOBS_PATH) -> dict | None:
+    # The job as a dict; its "results" are guess_offsets' list once "status" is "done"
+    database = init_jobs(path)
+    try:
+        jobs = load_jobs(database, job_id=job_id)
+    finally:
+        close_db(database)
+    return jobs[0] if jobs else None
+
+
+def _dictionary(words: dict):
+    if words["word_list"] is not None:
+        return WordList(words["word_list"], words["words"])
+    return DEFAULT_DICTIONARY if words["words"] is None else words["words"]
+
+
+def _cascade(params: dict):
+    return [tuple(stage) for stage in params["cascade"]] if params["cascade"] else None
+
+
+def _drop_job_checkpoint(path: str, job: dict):
+    # The checkpoint a job's search keeps in the jobs file, once the job won't resume
+    params = job["params"]
+    drop_checkpoint(path, job["ciphertext"], params["rotor_pattern"], params["plugboard"],
+                    _dictionary(params["dict_words"]), params["top_n"], params["scorer"], params["prune"],
+                    _cascade(params))
+
+
+def _run_job(path: str, job_id: int, workers: int, owner: str | None = None):
+    # Job process: run the search, then store its results (or the error) with the job.
+    # Only while `owner` still holds the job: one requeued meanwhile belongs to another scheduler.
+    database = init_jobs(path)
+    try:
+        job = load_jobs(database, job_id=job_id)[0]
+        params = job["params"]
+        last = [0.0]
+
+        def progress(snap):
+            if time.monotonic() - last[0] >= PROGRESS_SECONDS or snap["processed"] == snap["total"]:
+                last[0] = time.monotonic()
+                update_job_progress(database, job_id, snap["processed"], snap["total"])
+
+        try:
+            results = guess_offsets(job["ciphertext"], params["rotor_pattern"], params["plugboard"],
+                                    _dictionary(params["dict_words"]), params["top_n"], workers,
+                                    params["scorer"], prune=params["prune"], cascade=_cascade(params),
+                                    progress=progress, verbose=False, checkpoint=path)
+        except Exception as e:
+            finish_job(database, job_id, "failed", error=f"{type(e).__name__}: {e}", owner=owner)
+        else:
+            total = _keyspace_size(params["rotor_pattern"])
+            update_job_progress(database, job_id, total, total)
+            finish_job(database, job_id, "done", results, owner=owner)
+    finally:
+        close_db(database)
+
+
+def _owner_alive(owner: str) -> bool:
+    # False once the scheduler process named by owner has gone. Only a process on this
+    # host can be checked (and not on Windows, where os.kill can't probe); elsewhere the
+    # heartbeat has to tell.
+    host, pid, _ = owner.rsplit(":", 2)
+    if host != socket.gethostname() or os.name == "nt":
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Scheduler:
+    """Runs queued jobs, several at once, within a budget of `cpus` CPUs.
+
+    Call step() now and then (the Bombe window does, from its event loop) or
+    run() to loop until stopped. max_jobs caps how many jobs run at once
+    whatever their size. A job asking for more workers than the budget runs
+    alone with `cpus` workers. CPUs held by other schedulers' jobs in the
+    same file count against the budget. Steps more than STALE_SECONDS apart
+    let other schedulers take this one's jobs back.
+    """
+
+    def __init__(self, path: str = JOBS_PATH, cpus: int | None = None, max_jobs: int | None = None):
+        self.path = path
+        self.cpus = cpus or os.cpu_count() or 1
+        self.max_jobs = max_jobs
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{os.urandom(4).hex()}"
+        self.running = {}  # job_id -> (process, cpus it holds)
+        self.beat = 0.0
+        # Jobs a dead scheduler was running start again, from their checkpoints
+        database = init_jobs(path)
+        try:
+            self._requeue_orphans(database)
+        finally:
+            close_db(database)
+
+    def _requeue_orphans(self, database):
+        # Running jobs whose scheduler is gone: not marked for STALE_SECONDS, its process
+        # has exited, or from before jobs recorded their owner
+        stale = time.time() - STALE_SECONDS
+        for job in load_jobs(database, "running"):
+            if job["owner"] == self.owner:
+                continue
+            if job["owner"] is None or job["heartbeat"] < stale or not _owner_alive(job["owner"]):
+                requeue_job(database, job["job_id"], job["owner"])
+
+    def step(self) -> int:
+        # Reap finished jobs, stop cancelled ones, start what fits. Returns the number running.
+        database = init_jobs(self.path)
+        try:
+            if time.monotonic() - self.beat >= HEARTBEAT_SECONDS:
+                self.beat = time.monotonic()
+                heartbeat_jobs(database, self.owner)
+                self._requeue_orphans(database)
+            status = {job["job_id"]: job["status"] for job in load_jobs(database, "cancelled")}
+            for job_id, (process, _) in list(self.running.items()):
+                if status.get(job_id) == "cancelled" and process.is_alive():
+                    process.terminate()
+                    process.join()
+                    # It may have saved a checkpoint after cancel_job removed it
+                    _drop_job_checkpoint(self.path, load_jobs(database, job_id=job_id)[0])
+                if not process.is_alive():
+                    process.join()
+                    # A process that died without closing its job
+                    finish_job(database, job_id, "failed", error=f"Job process exited with code {process.exitcode}",
+                               owner=self.owner)
+                    del self.running[job_id]
+
+            while self.max_jobs is None or len(self.running) < self.max_jobs:
+                job_id = claim_job(database, self.owner, self.cpus)
+                if job_id is None:
+                    break
+                held = load_jobs(database, job_id=job_id)[0]["held"]
+                process = multiprocessing.Process(target=_run_job, args=(self.path, job_id, held, self.owner),
+                                                  daemon=False)
+                process.start()
+                self.running[job_id] = (process, held)
+        finally:
+            close_db(database)
+        return len(self.running)
+
+    def run(self, poll: float = 1.0, until_idle: bool = False):
+        # Keep stepping; until_idle stops once nothing is running or queued
+        while True:
+            self.step()
+            if until_idle and not self.running and not list_jobs("queued", self.path):
+                return
+            time.sleep(poll)
+
+    def stop(self):
+        # Stop this scheduler's jobs; they go back to the queue and resume from their checkpoints
+        for process, _ in self.running.values():
+            process.terminate()
+            process.join()
+        database = init_jobs(self.path)
+        try:
+            for job_id in self.running:
+                requeue_job(database, job_id, self.owner)
+        finally:
+            close_db(database)
+        self.running.clear()
+
+
+def format_job(job: dict) -> str:
+    # One line per job for listings
+    progress = f"{job['processed']}/{job['total']}" if job["total"] else "-"
+    return (f"#{job['job_id']:<4} {job['status']:<10} priority {job['priority']:<3} {progress:>15}  "
+            f"{','.join(job['params']['rotor_pattern'])}  {job['ciphertext'][:30]}")
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) >= 2 and args[0] == "submit" and len(args) <= 5:
+        pattern = parse_pattern(args[2]) if len(args) > 2 else ['?', '?', '?']
+        priority = int(args[3]) if len(args) > 3 else 0
+        scorer = args[4] if len(args) > 4 else "words"
+        print(f"Queued job #{submit_job(args[1], pattern, priority=priority, scorer=scorer)}")
+    elif args == ["list"]:
+        for job in list_jobs():
+            print(format_job(job))
+    elif len(args) == 2 and args[0] == "cancel" and args[1].isdigit():
+        print("Cancelled" if cancel_job(int(args[1])) else "Job already finished")
+    elif len(args) == 2 and args[0] == "collect" and args[1].isdigit():
+        job = collect(int(args[1]))
+        if job is None:
+            print("No such job")
+        elif job["status"] != "done":
+            print(format_job(job))
+            if job["error"]:
+                print(job["error"])
+        else:
+            for s, offsets, pt in job["results"]:
+                print(f"Score={s:g} | Offsets {offsets}\n{pt}\n")
+    elif len(args) <= 2 and args[:1] == ["run"] and all(a.isdigit() for a in args[1:]):
+        scheduler = Scheduler(cpus=int(args[1]) if len(args) > 1 else None)
+        print(f"Running jobs from {JOBS_PATH} on {scheduler.cpus} CPU(s), Ctrl+C to stop")
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            scheduler.stop()
+    else:
+        print("Usage: jobs.py submit CIPHERTEXT [PATTERN] [PRIORITY] [SCORER] | list | cancel ID | collect ID"
+              " | run [CPUS]\n Jobs are kept in " + JOBS_PATH)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+try:
+    from .bombe import TopN, _pattern_relations, _pattern_values, expand_unknowns, plugboard_apply
+    from .scoring import make_scorer
+except ImportError:  # Running directly
+    from bombe import TopN, _pattern_relations, _pattern_values, expand_unknowns, plugboard_apply
+    from scoring import make_scorer
+
+
+# ------------------------- MEET-IN-THE-MIDDLE SEARCH -------------------------
+# Split the odometer value N into a high part h (left rotors) and a low part l
+# (the m right rotors), N = h * 26^m + l. After j steps the shift is
+#
+#     digitsum((l + j) mod 26^m) + digitsum(h + carry_j)     (mod 26)
+#
+# and when the message is shorter than 26^m steps the low half carries into the
+# high half at most once. The high half therefore only ever adds one of two
+# constants, D(h) before the carry and D(h + 1) after it. Every high setting is
+# indexed by that pair (its "signature"), and each low setting is matched against
+# the signatures instead of against every high setting: a message of T letters
+# costs about 26^m * 26 decrypts however deep the stack is.
+
+def _split_point(n_rotors: int, steps: int) -> int:
+    # Fewest right-hand rotors whose odometer outlasts the message
+    m = 1
+    while 26 ** m <= steps:
+        m += 1
+    return min(m, n_rotors)
+
+
+def _digits(value: int, n: int) -> tuple[int, ...]:
+    out = []
+    for _ in range(n):
+        value, d = divmod(value, 26)
+        out.append(d)
+    return tuple(reversed(out))
+
+
+def _high_signatures(values: list[list[int]]) -> dict:
+    """Index the high half: (D(h), D(h+1)) mod 26 -> (smallest h, how many h).
+
+    Built digit by digit from the right with states (digit sum, trailing 25s,
+    all digits 25 so far), so memory stays at a few hundred entries whatever the
+    number of rotors; no high setting is ever listed.
+    """
+    states = {(0, 0, True): (0, 1)}
+    scale = 1
+    for vals in reversed(values):
+        nxt = {}
+        for (s, t, all25), (low, count) in states.items():
+            for d in vals:
+                key = ((s + d) % 26, t + 1 if all25 and d == 25 else t, all25 and d == 25)
+                value = d * scale + low
+                if key in nxt:
+                    best, total = nxt[key]
+                    nxt[key] = (min(best, value), total + count)
+                else:
+                    nxt[key] = (value, count)
+        states = nxt
+        scale *= 26
+
+    signatures = {}
+    for (s, t, all25), (low, count) in states.items():
+        # h + 1 turns t trailing 25s into 0s and bumps the next digit, unless h wraps to 0
+        after = (s + t) % 26 if all25 else (s + 1 + t) % 26
+        key = (s, after)
+        if key in signatures:
+            best, total = signatures[key]
+            signatures[key] = (min(best, low), total + count)
+        else:
+            signatures[key] = (low, count)
+    return signatures
+
+
+def guess_offsets_mitm(ciphertext: str,
+                       rotor_pattern: list[str],
+                       plugboard_map: dict,
+                       dict_words: list[str],
+                       top_n: int = 10,
+                       scorer="words") -> list[tuple]:
+    """Rank rotor settings for deep rotor stacks without trying every one.
+
+    High-half settings that add the same shifts to this message decrypt it
+    identically, so each such group is scored once per low-half setting.
+    Returns (score, offsets, plaintext, equivalent_settings) best first, where
+    offsets is the smallest setting in the group (the one guess_offsets would
+    list first) and equivalent_settings counts every setting of the whole key
+    that decrypts the message identically, so groups that differ only in their
+    low half report the same count. The high-half index holds at most 26 * 26
+    entries and only the current top N plaintexts are kept, so memory does not
+    grow with the number of rotors or candidates.
+    """
+    if _pattern_relations(rotor_pattern):
+        # Settings are grouped by the shifts they add, which relations would split
+        raise ValueError("guess_offsets_mitm doesn't take relations between rotors")
+    values = _pattern_values(rotor_pattern)
+    n = len(values)
+    score = make_scorer(scorer, dict_words).score
+
+    # Letter positions and the odometer step each letter is read at
+    text = list(plugboard_apply(ciphertext, plugboard_map))
+    where, codes, steps = [], [], []
+    step = 0
+    for i, ch in enumerate(text):
+        if ch.isalpha():
+            step += 1
+            if 'a' <= ch <= 'z':
+                where.append(i)
+                codes.append(ord(ch) - 97)
+                steps.append(step)
+
+    m = _split_point(n, step)
+    low_size = 26 ** m
+    digit_sums = [sum(_digits(v, m)) % 26 for v in range(low_size)]
+    signatures = _high_signatures(values[:n - m])
+    # Before a carry only D(h) matters, so merge signatures sharing it
+    by_before = {}
+    for (before, _), (h, count) in signatures.items():
+        if before in by_before:
+            best, total = by_before[before]
+            by_before[before] = (min(best, h), total + count)
+        else:
+            by_before[before] = (h, count)
+
+    def decrypt(shifts):
+        out = text[:]
+        for i, c, s in zip(where, codes, shifts):
+            out[i] = chr(97 + (c - s) % 26)
+        return plugboard_apply(''.join(out), plugboard_map)
+
+    def groups():
+        # Every (low setting, high group): smallest offsets, the shift at each letter, group size
+        for low_digits in expand_unknowns(rotor_pattern[n - m:]):
+            l = 0
+            for d in low_digits:
+                l = l * 26 + d
+            low_shifts = [digit_sums[(l + j) % low_size] for j in steps]
+            carry_at = sum(1 for j in steps if l + j < low_size)  # letters read before the carry
+
+            high = by_before.items() if carry_at == len(steps) else signatures.items()
+            for sig, (h, count) in high:
+                before, after = sig if isinstance(sig, tuple) else (sig, sig)
+                shifts = ([(s + before) % 26 for s in low_shifts[:carry_at]]
+                          + [(s + after) % 26 for s in low_shifts[carry_at:]])
+                yield _digits(h, n - m) + tuple(low_digits), shifts, count
+
+    best = TopN(top_n)
+    found = {}  # offsets -> (plaintext, shifts), for what is in best
+    for offsets, shifts, _ in groups():
+        pt = decrypt(shifts)
+        if best.push(score(pt), offsets):
+            found[offsets] = (pt, tuple(shifts))
+            if len(found) > 2 * top_n:
+                # Drop the entries best has evicted since
+                kept = {combo for _, combo in best.items()}
+                found = {o: v for o, v in found.items() if o in kept}
+
+    # Groups with a different low half can still add the same shifts; a second pass
+    # counts every setting of the whole key that decrypts like each result
+    equivalent = {found[offsets][1]: 0 for _, offsets in best.items()}
+    for _, shifts, count in groups():
+        shifts = tuple(shifts)
+        if shifts in equivalent:
+            equivalent[shifts] += count
+
+    return [(s, offsets, found[offsets][0], equivalent[found[offsets][1]]) for s, offsets in best.items()]
@@ -0,0 +1,214 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+
+try:
+    from .bombe import Rotor, TopN, _advance_offsets, _letter_layout, decrypt_message, expand_unknowns
+    from .scoring import QuadgramScorer
+except ImportError:  # Running directly
+    from bombe import Rotor, TopN, _advance_offsets, _letter_layout, decrypt_message, expand_unknowns
+    from scoring import QuadgramScorer
+
+
+# ------------------------- PLUGBOARD HILL CLIMBING -------------------------
+def _letter_shifts(offsets: tuple[int, ...], steps: list[int]) -> list[int]:
+    # Decrypt shift (odometer digit sum) for each letter, given the step it is read at
+    shifts = []
+    for step in steps:
+        shifts.append(sum(_advance_offsets(offsets, step)) % 26)
+    return shifts
+
+
+def _move(P: list[int], x: int, y: int, max_pairs: int) -> list[int] | None:
+    # One hill-climbing move: unplug x<->y if they are connected, otherwise plug
+    # them together (freeing whatever they were plugged to before)
+    new = P[:]
+    if P[x] == y:
+        new[x], new[y] = x, y
+        return new
+    for letter in (x, y):
+        partner = new[letter]
+        if partner != letter:
+            new[partner] = partner
+            new[letter] = letter
+    new[x], new[y] = y, x
+    if sum(1 for i in range(26) if new[i] > i) > max_pairs:
+        return None
+    return new
+
+
+def _quad_index(letters, k: int, overlay: dict | None = None) -> int:
+    # Table index of the quadgram ending at position k
+    idx = 0
+    for i in range(k - 3, k + 1):
+        idx = idx * 26 + (overlay[i] if overlay and i in overlay else letters[i])
+    return idx
+
+
+def _climb(codes: list[int], shifts: list[int], max_pairs: int, seed: int | None) -> tuple[float, list[int]]:
+    """Hill-climb one random starting plugboard, returns (quadgram score, permutation).
+
+    seed None starts from an empty plugboard instead.
+
+    A move only changes the few letters it rewires, so only the positions whose
+    ciphertext letter or middle (post-rotor) letter is one of them are recomputed,
+    and only the quadgrams covering those positions are rescored.
+    """
+    table = QuadgramScorer().table
+    rng = random.Random(seed)
+    n = len(codes)
+
+    # Random start with up to max_pairs cables
+    P = list(range(26))
+    order = list(range(26))
+    rng.shuffle(order)
+    for k in range(rng.randint(0, max_pairs) if seed is not None else 0):
+        a, b = order[2 * k], order[2 * k + 1]
+        P[a], P[b] = b, a
+
+    mid = [(P[c] - s) % 26 for c, s in zip(codes, shifts)]
+    pt = [P[m] for m in mid]
+    by_code = [[] for _ in range(26)]
+    by_mid = [set() for _ in range(26)]
+    for i, (c, m) in enumerate(zip(codes, mid)):
+        by_code[c].append(i)
+        by_mid[m].add(i)
+    score = sum(table[_quad_index(pt, k)] for k in range(3, n))
+
+    improved = True
+    while improved:
+        improved = False
+        for x in range(26):
+            for y in range(x + 1, 26):
+                new = _move(P, x, y, max_pairs)
+                if new is None:
+                    continue
+                touched = [letter for letter in range(26) if new[letter] != P[letter]]
+
+                # Positions whose plaintext can change: new middle letter or new output letter
+                new_mid = {}
+                new_pt = {}
+                for letter in touched:
+                    for i in by_code[letter]:
+                        m = (new[codes[i]] - shifts[i]) % 26
+                        new_mid[i] = m
+                        new_pt[i] = new[m]
+                for letter in touched:
+                    for i in by_mid[letter]:
+                        if i not in new_mid:
+                            new_pt[i] = new[mid[i]]
+                new_pt = {i: v for i, v in new_pt.items() if v != pt[i]}
+
+                ends = {k for i in new_pt for k in range(i, i + 4) if 3 <= k < n}
+                delta = sum(table[_quad_index(pt, k, new_pt)] - table[_quad_index(pt, k)] for k in ends)
+                if delta <= 1e-9:
+                    continue
+
+                # Accept the move
+                for i, m in new_mid.items():
+                    by_mid[mid[i]].discard(i)
+                    by_mid[m].add(i)
+                    mid[i] = m
+                for i, v in new_pt.items():
+                    pt[i] = v
+                P = new
+                score += delta
+                improved = True
+    return score, P
+
+
+def recover_plugboard(ciphertext: str,
+                      offsets: tuple[int, ...],
+                      max_pairs: int = 10,
+                      restarts: int = 8,
+                      workers: int | None = 1,
+                      seed: int = 0) -> tuple[float, dict, str]:
+    """Search for the plugboard at a fixed rotor setting by hill climbing over pair swaps.
+
+    Runs `restarts` climbs from random plugboards (in parallel when workers > 1)
+    and keeps the most English-looking one by quadgram score.
+    Returns (score, plugboard_map, plaintext).
+    """
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    # Letter positions and stepping don't depend on the plugboard
+    codes, steps = _letter_layout(ciphertext, {})
+    shifts = _letter_shifts(tuple(offsets), steps)
+    seeds = [seed + r for r in range(restarts)]
+    n = len(seeds)
+
+    if workers > 1 and n > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, n)) as pool:
+            climbs = list(pool.map(_climb, [codes] * n, [shifts] * n, [max_pairs] * n, seeds))
+    else:
+        climbs = [_climb(codes, shifts, max_pairs, s) for s in seeds]
+
+    # Best score, ties to the earliest restart so results don't depend on workers
+    _, P = max(climbs, key=lambda c: c[0])
+    pb_map = {chr(97 + i): chr(97 + P[i]) for i in range(26) if P[i] != i}
+    pt = decrypt_message(ciphertext, [Rotor(o) for o in offsets], pb_map)
+    return QuadgramScorer().score(pt), pb_map, pt
+
+
+def guess_offsets_with_plugboard(ciphertext: str,
+                                 rotor_pattern: list[str],
+                                 settings: int = 100,
+                                 top_n: int = 5,
+                                 max_pairs: int = 10,
+                                 restarts: int = 8,
+                                 workers: int | None = 1,
+                                 seed: int = 0) -> list[tuple[float, tuple[int, ...], dict, str]]:
+    # Unknown plugboard. A quadgram needs all four of its letters unplugged to read right,
+    # so with no plugboard the true setting can rank hundreds down on a short message with
+    # a few cables. Rotor settings are ranked that way only to shortlist the best `settings`,
+    # each of those is screened with one hill climb from an empty plugboard (which lifts the
+    # true setting back near the top), and the best top_n screened get the full `restarts`.
+    # Settings that lead once the best plugboard found is applied get them as well.
+    # Each result is (score, offsets, plugboard_map, plaintext), best first.
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    scorer = QuadgramScorer()
+    promising = TopN(settings)
+    for combo in expand_unknowns(rotor_pattern):
+        promising.push(scorer.score(decrypt_message(ciphertext, [Rotor(o) for o in combo], {})), combo)
+
+    combos = [combo for _, combo in promising.items()]
+    codes, steps = _letter_layout(ciphertext, {})
+    shifts = [_letter_shifts(combo, steps) for combo in combos]
+    n = len(combos)
+    if workers > 1 and n > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, n)) as pool:
+            screens = list(pool.map(_climb, [codes] * n, shifts, [max_pairs] * n, [None] * n))
+    else:
+        screens = [_climb(codes, s, max_pairs, None) for s in shifts]
+    screened = TopN(top_n)
+    for (score, _), combo in zip(screens, combos):
+        screened.push(score, combo)
+
+    results = {}
+    for _, combo in screened.items():
+        score, pb_map, pt = recover_plugboard(ciphertext, combo, max_pairs, restarts, workers, seed)
+        results[combo] = (score, combo, pb_map, pt)
+
+    # Neighbouring settings share most of the true one's shifts and can beat it in the
+    # screen. Under a good enough plugboard they no longer do, so rank every setting
+    # again with the best plugboard found and climb any new leaders, until the best
+    # result stops changing.
+    best = None
+    while True:
+        leader = min(results.values(), key=lambda r: (-r[0], r[1]))
+        if leader is best:
+            break
+        best = leader
+        reranked = TopN(top_n)
+        for combo in expand_unknowns(rotor_pattern):
+            reranked.push(scorer.score(decrypt_message(ciphertext, [Rotor(o) for o in combo], best[2])), combo)
+        for ranked_score, combo in reranked.items():
+            if combo not in results:
+                score, pb_map, pt = recover_plugboard(ciphertext, combo, max_pairs, restarts, workers, seed)
+                if ranked_score > score:
+                    # Its own climbs fell short of the plugboard that ranked it
+                    score, pb_map = ranked_score, dict(best[2])
+                    pt = decrypt_message(ciphertext, [Rotor(o) for o in combo], pb_map)
+                results[combo] = (score, combo, pb_map, pt)
+    return sorted(results.values(), key=lambda r: (-r[0], r[1]))[:top_n]
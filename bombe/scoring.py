@@ -0,0 +1,331 @@
+from array import array
+from pathlib import Path
+import math
+import re
+
+try:
+    from .wordlist import WordList
+except ImportError:  # Running directly
+    from wordlist import WordList
+
+# ------------------------- LETTER STATISTICS -------------------------
+# Relative frequency (percent) of each letter a-z in English text
+ENGLISH_LETTER_FREQ = [
+    8.167, 1.492, 2.782, 4.253, 12.702, 2.228, 2.015, 6.094, 6.966, 0.153,
+    0.772, 4.025, 2.406, 6.749, 7.507, 1.929, 0.095, 5.987, 6.327, 9.056,
+    2.758, 0.978, 2.360, 0.150, 1.974, 0.074,
+]
+
+# Natural log probability of each letter, summed to score a candidate plaintext
+ENGLISH_LETTER_LOGP = [math.log(f / 100) for f in ENGLISH_LETTER_FREQ]
+
+
+class LetterScorer:
+    """Sums English letter log probabilities, a cheap first check for a search cascade."""
+
+    def score(self, pt: str) -> float:
+        total = 0.0
+        for ch in pt.lower():
+            if 'a' <= ch <= 'z':
+                total += ENGLISH_LETTER_LOGP[ord(ch) - 97]
+        return total
+
+
+def chi_squared(counts) -> float:
+    # Chi-squared distance of a-z letter counts from English letter frequencies
+    n = sum(counts)
+    if n == 0:
+        return 0.0
+    total = 0.0
+    for observed, freq in zip(counts, ENGLISH_LETTER_FREQ):
+        expected = n * freq / 100
+        total += (observed - expected) ** 2 / expected
+    return total
+
+
+class ChiSquaredScorer:
+    """Negated chi-squared of the plaintext's letter counts against English.
+
+    Only letter counts matter, so a keyspace pass with this scorer doesn't need
+    to decrypt anything (guess_offsets does it from ciphertext histograms).
+    """
+
+    def score(self, pt: str) -> float:
+        counts = [0] * 26
+        for ch in pt.lower():
+            if 'a' <= ch <= 'z':
+                counts[ord(ch) - 97] += 1
+        return -chi_squared(counts)
+
+
+# ------------------------- DICTIONARY SCORING -------------------------
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class WordScorer:
+    """Counts how many dictionary words appear as whole words in a plaintext.
+
+    Built once per search. Plain words are checked with one tokenization pass
+    and set membership; words containing non-word characters fall back to a
+    precompiled ``\\bWORD\\b`` regex. Scores are identical to score_plaintext.
+    A compiled WordList is used in place as the weights (every word counts once).
+    """
+
+    # Every unfinished token could still be a word, so a prefix almost never rules a
+    # candidate out; guess_offsets doesn't prune with this bound (depth.py still does)
+    prunes_prefixes = False
+
+    def __init__(self, words):
+        if isinstance(words, WordList):
+            self.weights = words
+            self.patterns = []
+            return
+        # Uppercase word -> number of times it appears in the word list
+        self.weights: dict[str, int] = {}
+        self.patterns: list[re.Pattern] = []
+        for w in words:
+            if not w:
+                continue
+            up = w.upper()
+            if _TOKEN_RE.fullmatch(up):
+                self.weights[up] = self.weights.get(up, 0) + 1
+            else:
+                self.patterns.append(re.compile(r"\b" + re.escape(up) + r"\b"))
+
+    def score(self, pt: str) -> int:
+        pt_up = pt.upper()
+        tokens = set(_TOKEN_RE.findall(pt_up))
+        count = sum(self.weights.get(t, 0) for t in tokens)
+        for pat in self.patterns:
+            if pat.search(pt_up):
+                count += 1
+        return count
+
+    def bound_for(self, ciphertext: str):
+        """Return bound(prefix) -> upper bound on the score of the full plaintext.
+
+        Decryption only changes letters into letters, so the token boundaries of
+        the plaintext are those of the ciphertext. Tokens that end inside the
+        prefix are final; every other token can match at most one word of its
+        own length. Returns None for non-ASCII text, where upper() may move
+        token boundaries.
+        """
+        if not ciphertext.isascii():
+            return None
+        full_len = len(ciphertext)
+        spans = [(m.start(), m.end()) for m in _TOKEN_RE.finditer(ciphertext)]
+        # Total dictionary weight available for each token length
+        weight_by_len: dict[int, int] = {}
+        best_by_len: dict[int, int] = {}
+        for w, weight in self.weights.items():
+            weight_by_len[len(w)] = weight_by_len.get(len(w), 0) + weight
+            best_by_len[len(w)] = max(best_by_len.get(len(w), 0), weight)
+        n_patterns = len(self.patterns)
+        # Which tokens are final only depends on the prefix length, cache it per length
+        layouts: dict[int, tuple] = {}
+
+        def layout(length: int) -> tuple:
+            if length not in layouts:
+                done = length >= full_len
+                final = [(s, e) for s, e in spans if done or e < length]
+                open_by_len: dict[int, int] = {}
+                for s, e in spans:
+                    if not (done or e < length):
+                        open_by_len[e - s] = open_by_len.get(e - s, 0) + 1
+                layouts[length] = (final, open_by_len)
+            return layouts[length]
+
+        def bound(prefix: str) -> int:
+            final_spans, open_by_len = layout(len(prefix))
+            up = prefix.upper()
+            score = 0
+            used_by_len: dict[int, int] = {}
+            for t in {up[s:e] for s, e in final_spans}:
+                weight = self.weights.get(t, 0)
+                if weight:
+                    score += weight
+                    used_by_len[len(t)] = used_by_len.get(len(t), 0) + weight
+            for length, count in open_by_len.items():
+                left = weight_by_len.get(length, 0) - used_by_len.get(length, 0)
+                score += min(left, count * best_by_len.get(length, 0))
+            # Regex words are not bounded, assume they all still match
+            return score + n_patterns
+
+        return bound
+
+
+# ------------------------- WORD SEGMENTATION -------------------------
+class SegmentScorer:
+    """Counts the letters covered by dictionary words in the best split of each token.
+
+    Meant for traffic with spaces and punctuation stripped ("attackatdawn"),
+    where WordScorer finds no whole words. Each token is split by dynamic
+    programming from its end: a letter is either skipped or starts a dictionary
+    word, found by walking a trie of the dictionary (or by hashing substrings of
+    a compiled WordList). Words longer than max_word_len (default: the longest
+    in the dictionary) are never tried, so a token costs at most
+    len(token) * max_word_len steps. Results for recent tokens are memoized.
+    """
+
+    def __init__(self, words, max_word_len: int | None = None):
+        self.words = words if isinstance(words, WordList) else None
+        self.trie: dict = {}
+        longest = 0
+        for w in words:
+            up = w.upper()
+            if not _TOKEN_RE.fullmatch(up):
+                continue
+            longest = max(longest, len(up))
+            if self.words is None:
+                node = self.trie
+                for ch in up:
+                    node = node.setdefault(ch, {})
+                node[None] = True  # a word ends here
+        self.max_word_len = longest if max_word_len is None else max_word_len
+        self._recent = {}
+
+    def _segment(self, token: str) -> int:
+        n = len(token)
+        best = [0] * (n + 1)  # best[i]: most letters covered in token[i:]
+        for i in range(n - 1, -1, -1):
+            b = best[i + 1]
+            end = min(n, i + self.max_word_len)
+            if self.words is None:
+                node = self.trie
+                for j in range(i, end):
+                    node = node.get(token[j])
+                    if node is None:
+                        break
+                    if None in node and j + 1 - i + best[j + 1] > b:
+                        b = j + 1 - i + best[j + 1]
+            else:
+                for j in range(i + 1, end + 1):
+                    if j - i + best[j] > b and self.words.get(token[i:j]):
+                        b = j - i + best[j]
+            best[i] = b
+        return best[0]
+
+    def score(self, pt: str) -> int:
+        total = 0
+        for token in _TOKEN_RE.findall(pt.upper()):
+            found = self._recent.get(token)
+            if found is None:
+                found = self._segment(token)
+                if len(self._recent) >= 1 << 16:
+                    self._recent.clear()
+                self._recent[token] = found
+            total += found
+        return total
+
+
+# ------------------------- QUADGRAM SCORING -------------------------
+QUADGRAM_PATH = Path(__file__).with_name("english_quadgrams.txt")
+_QUAD_SIZE = 26 ** 4
+_default_quadgram_table = None
+
+
+def load_quadgrams(path=QUADGRAM_PATH) -> array:
+    """Read 'QUAD COUNT' lines into a flat 26^4 table of log probabilities.
+
+    Quadgram ABCD lives at index ((A*26 + B)*26 + C)*26 + D. Unseen quadgrams
+    get a floor of log(0.01 / total).
+    """
+    counts = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            quad, count = line.split()
+            counts[quad.upper()] = int(count)
+
+    total = sum(counts.values())
+    table = array("d", [math.log(0.01 / total)]) * _QUAD_SIZE
+    for quad, count in counts.items():
+        idx = 0
+        for ch in quad:
+            idx = idx * 26 + ord(ch) - 65
+        table[idx] = math.log(count / total)
+    return table
+
+
+class QuadgramScorer:
+    """Sums quadgram log probabilities over a sliding window of the plaintext letters.
+
+    Non-letters are skipped, so space-stripped and short messages still get a
+    meaningful score. Higher (less negative) is more English-like.
+    """
+
+    def __init__(self, table: array | None = None):
+        global _default_quadgram_table
+        if table is None:
+            if _default_quadgram_table is None:
+                _default_quadgram_table = load_quadgrams()
+            table = _default_quadgram_table
+        self.table = table
+
+    def score(self, pt: str) -> float:
+        table = self.table
+        total = 0.0
+        idx = 0
+        n = 0
+        for ch in pt.lower():
+            if 'a' <= ch <= 'z':
+                idx = (idx * 26 + ord(ch) - 97) % _QUAD_SIZE
+                n += 1
+                if n >= 4:
+                    total += table[idx]
+        return total
+
+    def bound_for(self, ciphertext: str):
+        """Return bound(prefix) -> upper bound on the score of the full plaintext.
+
+        Every quadgram not yet decrypted adds at most the best log probability
+        in the table. Returns None for non-ASCII text.
+        """
+        if not ciphertext.isascii():
+            return None
+        n_letters = sum(1 for ch in ciphertext.lower() if 'a' <= ch <= 'z')
+        best = max(self.table)
+        table = self.table
+        # The pruned search asks about ever longer prefixes of one plaintext, so carry on
+        # from the last prefix instead of rescoring it: (prefix, total, idx, letters seen)
+        state = ["", 0.0, 0, 0]
+
+        def bound(prefix: str) -> float:
+            last, total, idx, n = state
+            if not prefix.startswith(last):
+                last, total, idx, n = "", 0.0, 0, 0
+            for ch in prefix[len(last):].lower():
+                if 'a' <= ch <= 'z':
+                    idx = (idx * 26 + ord(ch) - 97) % _QUAD_SIZE
+                    n += 1
+                    if n >= 4:
+                        total += table[idx]
+            state[:] = [prefix, total, idx, n]
+            remaining = max(0, n_letters - 3) - max(0, n - 3)
+            # Small slack so float summation order can never beat the bound
+            return total + remaining * best + 1e-9
+
+        return bound
+
+
+# Scorers selectable by name from guess_offsets, the CLI and the GUI
+SCORERS = ("words", "quadgram", "letters", "chi2", "segment")
+
+
+def make_scorer(scorer, dict_words):
+    # Turn a scorer name into a scorer object, objects with a score() method pass through
+    if not isinstance(scorer, str):
+        return scorer
+    if scorer == "words":
+        return WordScorer(dict_words)
+    if scorer == "quadgram":
+        return QuadgramScorer()
+    if scorer == "letters":
+        return LetterScorer()
+    if scorer == "chi2":
+        return ChiSquaredScorer()
+    if scorer == "segment":
+        return SegmentScorer(dict_words)
+    raise ValueError(f"Unknown scorer '{scorer}', expected one of {', '.join(SCORERS)}")
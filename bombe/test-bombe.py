@@ -1,5 +1,35 @@
 # test-bombe.py
+import itertools
+import json
+import os
+import pickle
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
 import unittest
+from collections import Counter
+from itertools import product
+from bombe import bombe as bombe_mod
+from bombe.scoring import ChiSquaredScorer, QuadgramScorer, SegmentScorer, WordScorer, make_scorer
+from bombe.crib import drag_crib, solve_crib
+from bombe.database import (init_checkpoints, init_cribs, init_jobs, init_results, close_db, save_results,
+                            load_results, claim_job)
+from bombe.plugboard_search import guess_offsets_with_plugboard, recover_plugboard
+from bombe.mitm import guess_offsets_mitm
+from bombe.depth import guess_offsets_depth, _depth_scan
+from bombe.wordlist import WordList, compile_word_list, load_word_list
+from bombe.distributed import Coordinator
+from bombe.benchmark import compare, run_benchmarks
+from bombe.traffic import evaluate, make_corpus
+from bombe.candidates import CandidateSet, fits as candidates_fit
+from bombe.cribindex import add_cribs, lookup_key
+from bombe import jobs as jobs_mod
+from bombe.jobs import Scheduler, cancel_job, collect, list_jobs, submit_job
 from bombe.bombe import (
     Rotor,
     add_mapping,
@@ -7,7 +37,15 @@ from bombe.bombe import (
     decrypt_message,
     score_plaintext,
     guess_offsets,
-    expand_unknowns
+    iter_guess_offsets,
+    expand_unknowns,
+    TopN,
+    decrypt_candidates,
+    guess_offsets_vectorized,
+    parse_pattern,
+    estimate_run,
+    cached_results,
+    cache_results
 )
 
 class TestRotor(unittest.TestCase):
@@ -59,6 +97,21 @@ class TestUnknownsAndScoring(unittest.TestCase):
         self.assertEqual(score_plaintext("hello world", words), 2)
         self.assertEqual(score_plaintext("HELL0 W0RLD", words), 0)
 
+    def test_word_scorer_matches_regex_scan(self):
+        def regex_score(pt, words):
+            # The original per-word regex implementation
+            count = 0
+            for w in words:
+                if w and re.search(r"\b" + re.escape(w.upper()) + r"\b", pt.upper()):
+                    count += 1
+            return count
+
+        words = ["the", "THE", "it's", "a", "", "o'clock", "x-ray", "_id", "dawn", "at"]
+        scorer = WordScorer(words)
+        for pt in ["the cat", "it's six o'clock", "attack at dawn!", "x-ray_id _id",
+                   "theatre", "a-the-a", "", "at\tthe\ndawn"]:
+            self.assertEqual(scorer.score(pt), regex_score(pt, words), pt)
+
     # --- helper: generate ciphertext consistent with step-before-decode ---
     def encrypt_with_stepping(self, plaintext: str, offsets: tuple[int, ...]) -> str:
         """
@@ -130,6 +183,858 @@ class TestUnknownsAndScoring(unittest.TestCase):
         self.assertEqual(results[0][1], target_offsets)        # recovered offsets
         self.assertEqual(results[0][2], plaintext)             # recovered plaintext
 
+class TestTopN(unittest.TestCase):
+    def test_keeps_best_with_sort_order(self):
+        entries = [(1, (0, 3)), (3, (2, 2)), (3, (1, 5)), (0, (0, 0)), (2, (4, 4)), (3, (1, 4))]
+        top = TopN(3)
+        for s, c in entries:
+            top.push(s, c)
+        expected = sorted(entries, key=lambda x: (-x[0], x[1]))[:3]
+        self.assertEqual(top.items(), expected)
+
+    def test_guess_offsets_matches_full_sort(self):
+        ct = "qeb nrfzh yoltk clu"
+        words = ["the", "quick", "brown", "fox", "a"]
+        results = guess_offsets(ct, ['?', '?'], {}, words, top_n=5)
+        full = []
+        for combo in expand_unknowns(['?', '?']):
+            pt = decrypt_message(ct, [Rotor(o) for o in combo], {})
+            full.append((score_plaintext(pt, words), combo, pt))
+        full.sort(key=lambda x: (-x[0], x[1]))
+        self.assertEqual(results, full[:5])
+
+    def test_parallel_matches_sequential(self):
+        ct = "qeb nrfzh yoltk clu"
+        words = ["the", "quick", "brown", "fox", "a"]
+        seq = guess_offsets(ct, ['?', '3', '?'], {}, words, top_n=7)
+        par = guess_offsets(ct, ['?', '3', '?'], {}, words, top_n=7, workers=3)
+        self.assertEqual(seq, par)
+
+
+class TestPrunedSearch(unittest.TestCase):
+    def test_pruned_search_matches_exhaustive(self):
+        plaintext = ("the enemy will attack the northern bridge at dawn, send all of the "
+                     "reserves to the river before it is too late")
+        ct = TestUnknownsAndScoring().encrypt_with_stepping(plaintext, (9, 17))
+        words = ["the", "at", "to", "of", "it", "is", "bridge", "dawn"]
+        for scorer in ("words", "quadgram"):
+            full = guess_offsets(ct, ['?', '?'], {}, words, top_n=4, scorer=scorer)
+            pruned = guess_offsets(ct, ['?', '?'], {}, words, top_n=4, scorer=scorer, prune=True)
+            self.assertEqual(full, pruned, scorer)
+
+    def test_word_bound_never_below_final_score(self):
+        scorer = WordScorer(["the", "at", "dawn", "x-ray"])
+        ct = "qeb xq axtk, x-ray!"
+        bound = scorer.bound_for(ct)
+        pt = "the at dawn, x-ray!"
+        for cut in range(len(pt) + 1):
+            self.assertGreaterEqual(bound(pt[:cut]), scorer.score(pt))
+
+    def test_quadgram_bound_is_incremental(self):
+        scorer = QuadgramScorer()
+        ct = "qeb zlksly txfqp xq qeb yofadb"
+        pt = "the convoy waits at the bridge"
+        bound = scorer.bound_for(ct)
+        for cut in (4, 12, 20, len(pt), 9):
+            self.assertAlmostEqual(bound(pt[:cut]), scorer.bound_for(ct)(pt[:cut]))
+            self.assertGreaterEqual(bound(pt[:cut]), scorer.score(pt))
+        self.assertFalse(WordScorer(["the"]).prunes_prefixes)
+
+
+class TestCascade(unittest.TestCase):
+    def test_cascade_reports_stages_and_keeps_winner(self):
+        plaintext = "the enemy will attack the northern bridge at dawn, hold the river"
+        ct = TestUnknownsAndScoring().encrypt_with_stepping(plaintext, (9, 17))
+        words = ["the", "at", "will", "bridge", "dawn", "river"]
+        stats = []
+        results = guess_offsets(ct, ['?', '?'], {}, words, top_n=3,
+                                cascade=[("letters", 32, 200), ("quadgram", None, 20)], stats=stats)
+        self.assertEqual(results[0][2], plaintext)
+        self.assertEqual([(st["candidates"], st["survivors"]) for st in stats],
+                         [(676, 200), (200, 20), (20, 3)])
+        self.assertEqual([st["stage"] for st in stats], ["letters", "quadgram", "words"])
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn", (7, 21))
+        self.words = ["hold", "the", "bridge", "at", "dawn"]
+
+    def test_snapshots_count_up_to_final_result(self):
+        snapshots = list(iter_guess_offsets(self.ct, ['?', '?'], {}, self.words, top_n=5, report_every=100))
+        counts = [snap["processed"] for snap in snapshots]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[-1], 676)
+        self.assertTrue(all(snap["total"] == 676 for snap in snapshots))
+        final = guess_offsets(self.ct, ['?', '?'], {}, self.words, top_n=5, verbose=False)
+        self.assertEqual(snapshots[-1]["top"], final)
+
+    def test_progress_callback_with_workers(self):
+        seen = []
+        results = guess_offsets(self.ct, ['?', '?'], {}, self.words, top_n=5, workers=2,
+                                progress=seen.append, verbose=False)
+        self.assertTrue(seen)
+        self.assertEqual(seen[-1]["processed"], 676)
+        self.assertEqual(seen[-1]["top"], results)
+
+
+class Interrupted(Exception):
+    pass
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn", (7, 21))
+        self.words = ["hold", "the", "bridge", "at", "dawn"]
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "checkpoint.db")
+
+    def interrupted_run(self, after):
+        # Start a checkpointed search and kill it once `after` candidates are done
+        def stop(snap):
+            if snap["processed"] >= after:
+                raise Interrupted()
+        with self.assertRaises(Interrupted):
+            guess_offsets(self.ct, ['?', '?'], {}, self.words, top_n=5, progress=stop, report_every=50,
+                          verbose=False, checkpoint=self.path, checkpoint_every=100)
+
+    def saved_rows(self):
+        database = init_checkpoints(self.path)
+        rows = database.execute("SELECT position FROM checkpoints").fetchall()
+        close_db(database)
+        return rows
+
+    def test_expand_unknowns_resumes_in_order(self):
+        pattern = ['?', '3', '?']
+        everything = list(product(range(26), [3], range(26)))
+        self.assertEqual(list(expand_unknowns(pattern)), everything)
+        for start in (0, 1, 25, 26, 400, 675, 676):
+            self.assertEqual(list(expand_unknowns(pattern, start)), everything[start:])
+
+    def test_resume_matches_uninterrupted_run(self):
+        expected = guess_offsets(self.ct, ['?', '?'], {}, self.words, top_n=5, verbose=False)
+        self.interrupted_run(after=350)
+        self.assertEqual(self.saved_rows(), [(300,)])
+
+        seen = []
+        results = guess_offsets(self.ct, ['?', '?'], {}, self.words, top_n=5, progress=seen.append,
+                                verbose=False, checkpoint=self.path, checkpoint_every=100)
+        self.assertEqual(seen[0]["processed"], 300)
+        self.assertEqual(results, expected)
+        self.assertEqual(self.saved_rows(), [])
+
+    def test_parallel_resume_from_mid_shard(self):
+        expected = guess_offsets(self.ct, ['?', '?'], {}, self.words, top_n=5, verbose=False)
+        self.interrupted_run(after=150)  # checkpoint at 100, inside the 4th first-rotor shard
+        results = guess_offsets(self.ct, ['?', '?'], {}, self.words, top_n=5, workers=2,
+                                verbose=False, checkpoint=self.path)
+        self.assertEqual(results, expected)
+
+    def test_different_search_ignores_checkpoint(self):
+        self.interrupted_run(after=150)
+        guess_offsets(self.ct, ['?', '?'], {}, self.words, top_n=3, verbose=False, checkpoint=self.path)
+        # top_n differs, so the first run's checkpoint is still waiting to be resumed
+        self.assertEqual(self.saved_rows(), [(100,)])
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn", (7, 21))
+        self.words = ["hold", "the", "bridge", "at", "dawn"]
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "cache.db")
+
+    def run_search(self, pattern, top_n=5, words=None):
+        stats = []
+        results = guess_offsets(self.ct, pattern, {}, words or self.words, top_n=top_n,
+                                verbose=False, cache=self.path, stats=stats)
+        return results, stats[0]["stage"] == "cache"
+
+    def test_each_file_holds_only_its_own_tables(self):
+        def tables(database):
+            names = {row[0] for row in database.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            close_db(database)
+            return names - {"sqlite_sequence"}
+
+        self.run_search(['?', '?'])
+        self.assertEqual(tables(init_results(self.path)), {"results"})
+        for init, expected in ((init_checkpoints, {"checkpoints"}), (init_cribs, {"cribs", "crib_fragments"}),
+                               (init_jobs, {"jobs"})):
+            self.assertEqual(tables(init(os.path.join(os.path.dirname(self.path), init.__name__))), expected)
+
+    def test_identical_rerun_is_cached(self):
+        first, hit = self.run_search(['?', '?'])
+        self.assertFalse(hit)
+        again, hit = self.run_search(['?', '?'])
+        self.assertTrue(hit)
+        self.assertEqual(again, first)
+        # Fewer results than were stored is still a hit, a different dictionary is not
+        self.assertEqual(self.run_search(['?', '?'], top_n=3), (first[:3], True))
+        self.assertFalse(self.run_search(['?', '?'], words=["dawn"])[1])
+        upper = guess_offsets(self.ct.upper(), ['?', '?'], {}, self.words, top_n=5, verbose=False,
+                              cache=self.path, stats=[])
+        self.assertEqual(upper, first)
+        self.assertIsNotNone(cached_results(self.ct.upper(), ['?', '?'], {}, self.words, 5, cache=self.path))
+
+    def test_results_from_a_candidate_set(self):
+        self.assertIsNone(cached_results(self.ct, ['?', '?'], {}, self.words, 5, cache=self.path))
+        ranked = CandidateSet(self.ct, ['?', '?'], {}).rank(self.words, top_n=5)
+        cache_results(self.ct, ['?', '?'], {}, self.words, ranked, 5, cache=self.path)
+        self.assertEqual(cached_results(self.ct, ['?', '?'], {}, self.words, 5, cache=self.path), ranked)
+        self.assertEqual(self.run_search(['?', '?']), (ranked, True))
+
+    def test_narrower_pattern_reuses_wider_result(self):
+        self.run_search(['?', '?'], top_n=676)
+        results, hit = self.run_search(['7', '?'])
+        self.assertTrue(hit)
+        self.assertEqual(results, guess_offsets(self.ct, ['7', '?'], {}, self.words, top_n=5, verbose=False))
+
+    def test_narrowing_a_short_list_searches_again(self):
+        self.run_search(['?', '?'], top_n=2)
+        results, hit = self.run_search(['3', '?'])
+        self.assertFalse(hit)
+        self.assertEqual(len(results), 5)
+
+    def test_eviction_keeps_newest_within_budget(self):
+        database = init_results(self.path)
+        for i in range(5):
+            save_results(database, f"key{i}", ['?'], 1, False, [(1.0, (i,))], max_bytes=30)
+        kept = [key for key in (f"key{i}" for i in range(5)) if load_results(database, key)]
+        close_db(database)
+        self.assertEqual(kept, ["key3", "key4"])
+
+
+class TestMeetInTheMiddle(unittest.TestCase):
+    def setUp(self):
+        self.plaintext = "hold the bridge at dawn and wait for the signal"
+        self.enc = TestUnknownsAndScoring().encrypt_with_stepping
+
+    def test_groups_cover_keyspace_and_match_brute_force(self):
+        ct = self.enc(self.plaintext, (25, 20))
+        groups = guess_offsets_mitm(ct, ['?', '?'], {}, [], top_n=1000, scorer="quadgram")
+        self.assertEqual(len(groups), 676)
+        for score, offsets, pt, _ in groups[:20]:
+            self.assertEqual(pt, decrypt_message(ct, [Rotor(o) for o in offsets], {}))
+        brute = guess_offsets(ct, ['?', '?'], {}, [], top_n=1, scorer="quadgram", verbose=False)
+        self.assertEqual(groups[0][:3], brute[0])
+
+    def test_equivalent_settings_count_the_whole_key(self):
+        ct = self.enc("attack at dawn", (3, 20, 7))
+        plaintexts = Counter(decrypt_message(ct, [Rotor(o) for o in combo], {})
+                             for combo in expand_unknowns(['?'] * 3))
+        for _, _, pt, count in guess_offsets_mitm(ct, ['?'] * 3, {}, [], top_n=30, scorer="quadgram"):
+            self.assertEqual(count, plaintexts[pt])
+
+    def test_deep_stack(self):
+        key = (4, 9, 13, 2, 17, 8)
+        ct = self.enc(self.plaintext, key)
+        score, offsets, pt, count = guess_offsets_mitm(ct, ['?'] * 6, {}, [], top_n=1, scorer="quadgram")[0]
+        self.assertEqual(pt, self.plaintext)
+        self.assertEqual(pt, decrypt_message(ct, [Rotor(o) for o in offsets], {}))
+        # The message is too short to carry out of the right two rotors, so only the
+        # digit sum of the left four matters: 26^3 of their settings share it, and
+        # right halves whose digit sums differ by a constant add more
+        self.assertGreaterEqual(count, 26 ** 3)
+
+
+class TestDepth(unittest.TestCase):
+    def setUp(self):
+        enc = TestUnknownsAndScoring().encrypt_with_stepping
+        self.messages = ["attack at dawn", "hold the bridge", "send more fuel",
+                         "the river is high", "await orders", "enemy tanks north"]
+        self.cts = [enc(m, (11, 19)) for m in self.messages]
+
+    def test_combined_evidence_beats_single_messages(self):
+        # Alone, the first message's best quadgram key is wrong
+        alone = guess_offsets(self.cts[0], ['?', '?'], {}, [], top_n=1, scorer="quadgram", verbose=False)
+        self.assertNotEqual(alone[0][2], self.messages[0])
+        score, offsets, plaintexts = guess_offsets_depth(self.cts, ['?', '?'], {}, [], top_n=1, scorer="quadgram")[0]
+        self.assertEqual(offsets, (11, 19))
+        self.assertEqual(plaintexts, self.messages)
+
+    def test_early_rejection_keeps_results(self):
+        scorer = QuadgramScorer()
+        full, pruned = TopN(5), TopN(5)
+        all_decrypts = _depth_scan(self.cts, ['?', '?'], {}, scorer, full, prune=False)
+        fewer = _depth_scan(self.cts, ['?', '?'], {}, scorer, pruned, prune=True)
+        self.assertEqual(all_decrypts, 676 * len(self.cts))
+        self.assertLess(fewer, all_decrypts)
+        self.assertEqual(pruned.items(), full.items())
+
+    def test_parallel_matches_sequential(self):
+        seq = guess_offsets_depth(self.cts, ['?', '?'], {}, ["the", "at"], top_n=5)
+        par = guess_offsets_depth(self.cts, ['?', '?'], {}, ["the", "at"], top_n=5, workers=2)
+        self.assertEqual(par, seq)
+
+
+class TestChiSquared(unittest.TestCase):
+    def setUp(self):
+        self.pb = {'a': 'q', 'q': 'a', 'e': 'z', 'z': 'e'}
+        self.plaintext = "the enemy will attack the northern bridge at dawn, hold the river"
+        enc = TestUnknownsAndScoring().encrypt_with_stepping
+        self.ct = plugboard_apply(enc(plugboard_apply(self.plaintext, self.pb), (4, 25, 23)), self.pb)
+
+    def test_histogram_pass_matches_decrypting(self):
+        # Non a-z letters still step the rotors
+        ct = self.ct + " (ÜBER alles)"
+        for pattern in (['?', '?'], ['3', '?'], ['?']):
+            fast = bombe_mod._chi2_keyspace(ct, pattern, self.pb, 15).items()
+            slow = TopN(15)
+            for combo in expand_unknowns(pattern):
+                pt = decrypt_message(ct, [Rotor(o) for o in combo], self.pb)
+                slow.push(ChiSquaredScorer().score(pt), combo)
+            self.assertEqual(fast, slow.items())
+
+    def test_chi2_prefilter_cascade(self):
+        stats = []
+        words = self.plaintext.replace(",", "").split()
+        results = guess_offsets(self.ct, ['?', '?', '?'], self.pb, words, top_n=10,
+                                cascade=[("chi2", None, 200)], stats=stats, verbose=False)
+        self.assertEqual([(st["candidates"], st["survivors"]) for st in stats], [(17576, 200), (200, 10)])
+        # Near-equivalent keys tie on words here; the right one has to be among them
+        self.assertIn(self.plaintext, [pt for _, _, pt in results])
+
+
+class TestWordList(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(7)
+        words = {"the", "bridge", "dawn", "hold"}
+        while len(words) < 100_000:
+            words.add("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10))))
+        cls.words = sorted(words)
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, "words.txt")
+        with open(cls.path, "w") as f:
+            f.write("\n".join(cls.words))
+        load_word_list(cls.path)  # compile once
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_load_reuses_compiled_list(self):
+        # Opening again maps the compiled file instead of rebuilding it (timed in benchmark.py)
+        compiled = self.path + ".bwl"
+        built = os.stat(compiled).st_mtime_ns
+        wl = load_word_list(self.path)
+        self.assertEqual(os.stat(compiled).st_mtime_ns, built)
+        self.assertEqual(wl.path, compiled)
+        self.assertEqual(len(wl), 100_000)
+        self.assertIn("BRIDGE", wl)
+        self.assertNotIn("ENIGMA", wl)
+        self.assertEqual(list(wl), [w.upper() for w in self.words])
+
+    def test_scores_match_plain_list(self):
+        wl = load_word_list(self.path).with_words(["enigma"])
+        plain = WordScorer(self.words + ["enigma"])
+        mapped = WordScorer(wl)
+        for pt in ("hold the bridge at dawn", "enigma at dawn", "xq zzv the the"):
+            self.assertEqual(mapped.score(pt), plain.score(pt))
+
+    def test_search_with_workers(self):
+        wl = load_word_list(self.path)
+        self.assertEqual(pickle.loads(pickle.dumps(wl)).get("DAWN"), 1)
+        ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn", (7, 21))
+        expected = guess_offsets(ct, ['?', '?'], {}, self.words, top_n=3, verbose=False)
+        self.assertEqual(guess_offsets(ct, ['?', '?'], {}, wl, top_n=3, workers=2, verbose=False), expected)
+
+
+class TestDistributed(unittest.TestCase):
+    def test_workers_match_local_search_despite_a_dead_worker(self):
+        ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn", (7, 21))
+        words = ["hold", "the", "bridge", "at", "dawn"]
+        coordinator = Coordinator(ct, ['?', '?'], {}, words, top_n=5, units=26)
+        host, port = coordinator.start()
+
+        # A worker that reports units it doesn't hold, then takes one and disconnects without answering
+        with socket.create_connection((host, port)) as sock:
+            stream = sock.makefile("rw")
+            for unit in (999, 25):
+                stream.write(json.dumps({"op": "result", "id": unit, "top": [[100, [0, 0]]]}) + "\n")
+            for op in ("hello", "next"):
+                stream.write(json.dumps({"op": op}) + "\n")
+                stream.flush()
+                reply = json.loads(stream.readline())
+            self.assertEqual(reply["op"], "unit")
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        workers = [subprocess.Popen([sys.executable, "-m", "bombe.distributed", "worker", host, str(port)],
+                                    cwd=root, stdout=subprocess.DEVNULL) for _ in range(2)]
+        try:
+            results = coordinator.wait(timeout=60)
+        finally:
+            for w in workers:
+                w.wait(timeout=60)
+        self.assertEqual(results, guess_offsets(ct, ['?', '?'], {}, words, top_n=5, verbose=False))
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_tiny_sweep_is_json_and_compares_with_itself(self):
+        report = run_benchmarks(lengths=(32,), dict_sizes=(10,), rotor_counts=(1,),
+                                deep_rotor_counts=(3,), repeat=1)
+        report = json.loads(json.dumps(report))
+        benches = {r["bench"] for r in report["results"]}
+        self.assertEqual(benches, {"decrypt_message", "Rotor.decrypt", "score_plaintext", "drag_crib",
+                                   "load_word_list", "expand_unknowns", "guess_offsets", "guess_offsets_mitm"})
+        self.assertIn("python", report["meta"])
+        self.assertTrue(all(r["seconds"] > 0 for r in report["results"]))
+        rows = compare(report, report)
+        self.assertEqual(len(rows), len(report["results"]))
+        self.assertTrue(all(speedup == 1 for *_, speedup in rows))
+
+
+class TestTraffic(unittest.TestCase):
+    def test_corpus_is_reproducible_and_decrypts_under_its_keys(self):
+        corpus = make_corpus(5, rotors=2, lengths=(20, 60), plugboard_pairs=(0, 4), seed=7)
+        self.assertEqual(corpus, make_corpus(5, rotors=2, lengths=(20, 60), plugboard_pairs=(0, 4), seed=7))
+        for message in corpus:
+            self.assertLessEqual(len(message["plaintext"]), 60)
+            pt = decrypt_message(message["ciphertext"], [Rotor(o) for o in message["offsets"]],
+                                 message["plugboard"])
+            self.assertEqual(pt, message["plaintext"])
+
+    def test_evaluate_reports_accuracy_and_throughput(self):
+        corpus = make_corpus(4, rotors=1, lengths=(60, 80), plugboard_pairs=(3,), seed=1)
+        report = evaluate(corpus, scorer="quadgram", top_n=3)
+        self.assertEqual((report["messages"], report["keys"]), (4, 4 * 26))
+        self.assertEqual(report["topn"], 1.0)
+        self.assertGreaterEqual(report["topn"], report["top1"])
+        self.assertGreater(report["keys_per_second"], 0)
+
+
+class TestCandidateSet(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn, the convoy waits", (7, 21))
+        cls.pb = {}
+        cls.candidates = CandidateSet(cls.ct, ['?', '?'], cls.pb)
+
+    def expected(self, words, scorer="words"):
+        return guess_offsets(self.ct, ['?', '?'], self.pb, words, top_n=10, scorer=scorer, verbose=False)
+
+    def test_equivalent_settings_share_a_plaintext(self):
+        # Short enough that rotor 3 never carries, so only rotor 1 + rotor 2 matters
+        ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge", (4, 9, 5))
+        candidates = CandidateSet(ct, ['?', '?', '5'], {})
+        self.assertEqual(sum(len(p) for p in candidates.positions), 26 * 26)
+        self.assertEqual(len(candidates.plaintexts), 26)
+        self.assertTrue(self.candidates.matches(self.ct, ['?', '?'], {}))
+        self.assertFalse(self.candidates.matches(self.ct, ['?', '3'], {}))
+
+    def test_memory_cap(self):
+        self.assertTrue(candidates_fit("x" * 100, 26 ** 3))
+        self.assertFalse(candidates_fit("x" * 100_000, 26 ** 3))
+
+    def test_rank_matches_a_full_search(self):
+        for scorer in ("words", "quadgram", "chi2"):
+            self.assertEqual(self.candidates.rank(["the", "dawn"], scorer), self.expected(["the", "dawn"], scorer))
+
+    def test_word_deltas_match_a_full_search(self):
+        candidates = CandidateSet(self.ct, ['?', '?'], self.pb)
+        for words in (["the"], ["the", "hold", "bridge"], ["the", "the", "convoy waits"], ["dawn"]):
+            self.assertEqual(candidates.rank(words), self.expected(words))
+
+    def test_word_list_extras_are_a_delta(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wl = WordList(compile_word_list(["the", "at"], os.path.join(tmp, "w.bwl")))
+            candidates = CandidateSet(self.ct, ['?', '?'], self.pb)
+            candidates.rank(wl)
+            grown = wl.with_words(["bridge", "convoy"])
+            self.assertEqual(candidates.rank(grown), self.expected(grown))
+
+
+class TestCribIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cribs.db")
+        self.pb = {'a': 'q', 'q': 'a'}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def encrypt(self, plaintext, key):
+        enc = TestUnknownsAndScoring().encrypt_with_stepping
+        return plugboard_apply(enc(plugboard_apply(plaintext, self.pb), key), self.pb)
+
+    def test_lookup_recovers_the_key(self):
+        self.assertEqual(add_cribs(["weather report", "nothing to report"], 3, self.pb, self.path), 2)
+        plaintext = "Weather report: rain in the north"
+        ct = self.encrypt(plaintext, (4, 25, 23))
+        hits = lookup_key(ct.upper().replace(" ", ""), ['?', '?', '?'], self.pb, self.path)
+        self.assertIn(("weather report", (4, 25, 23)), hits)
+        for crib, offsets in hits:
+            pt = decrypt_message(ct, [Rotor(o) for o in offsets], self.pb)
+            self.assertTrue(pt.startswith("weather report"))
+        self.assertEqual(lookup_key(ct, ['9', '?', '?'], self.pb, self.path), [])
+        self.assertEqual(lookup_key(ct, ['?', '?', '?'], {}, self.path), [])
+
+    def test_incremental_and_bounded(self):
+        self.assertEqual(add_cribs(["attack at dawn"], 2, self.pb, self.path), 1)
+        self.assertEqual(add_cribs(["attack at dawn", "hold the bridge"], 2, self.pb, self.path), 1)
+        first = self.encrypt("attack at dawn today", (3, 7))
+        self.assertIn(("attack at dawn", (3, 7)), lookup_key(first, ['?', '?'], self.pb, self.path))
+
+        # Room for about two cribs: adding a third drops the one matched least recently
+        add_cribs(["convoy leaves"], 2, self.pb, self.path, max_bytes=2 * 26 * 26 * 60)
+        self.assertIn(("attack at dawn", (3, 7)), lookup_key(first, ['?', '?'], self.pb, self.path))
+        second = self.encrypt("hold the bridge", (1, 2))
+        self.assertEqual(lookup_key(second, ['?', '?'], self.pb, self.path), [])
+
+
+class TestSegmentScorer(unittest.TestCase):
+    words = ["attack", "at", "dawn", "hold", "the", "bridge", "a", "tack"]
+
+    def test_covers_stripped_words(self):
+        scorer = SegmentScorer(self.words)
+        self.assertEqual(scorer.score("attackatdawn"), 12)
+        self.assertEqual(scorer.score("holdthexbridge"), 13)
+        self.assertEqual(scorer.score("hold the bridge"), scorer.score("holdthebridge"))
+        self.assertEqual(scorer.score("qzxv"), 0)
+        self.assertEqual(WordScorer(self.words).score("attackatdawn"), 0)
+        # Words longer than max_word_len are never tried: "at" + "tack" still covers attack, bridge is lost
+        short = SegmentScorer(self.words, max_word_len=4)
+        self.assertEqual(short.score("attackatdawn"), 12)
+        self.assertEqual(short.score("holdthebridge"), 7)
+
+    def test_word_list_matches_trie(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wl = WordList(compile_word_list(self.words, os.path.join(tmp, "w.bwl")))
+            for pt in ("attackatdawn", "xholdthebridgex at", "tackattack"):
+                self.assertEqual(SegmentScorer(wl).score(pt), SegmentScorer(self.words).score(pt))
+
+    def test_search_on_stripped_ciphertext(self):
+        ct = TestUnknownsAndScoring().encrypt_with_stepping("holdthebridgeattackatdawn", (7, 21))
+        results = guess_offsets(ct, ['?', '?'], {}, self.words, top_n=1, scorer="segment", verbose=False)
+        self.assertEqual(results[0][2], "holdthebridgeattackatdawn")
+        self.assertIsInstance(make_scorer("segment", self.words), SegmentScorer)
+
+
+class TestPatternLanguage(unittest.TestCase):
+    def test_domains(self):
+        self.assertEqual(parse_pattern("3-5, {1, 4-5, 30}, !{0-23}"), ['3-5', '{1, 4-5, 30}', '!{0-23}'])
+        combos = list(expand_unknowns(['3-5', '{1,4-5,30}', '!{0-23}&!25']))
+        self.assertEqual(combos, [(a, b, 24) for a in (3, 4, 5) for b in (1, 4, 5)])
+        self.assertEqual([c[0] for c in expand_unknowns(['24-1', '0'])], [0, 1, 24, 25])
+        for bad in ("x", "3-", "{1,2", "?,>r5", "=r1", "?,!?", "3&4", "{}"):
+            with self.assertRaises(ValueError):
+                parse_pattern(bad)
+        with self.assertRaises(ValueError):
+            guess_offsets("abc", ['?', '!?'], {}, ["the"], verbose=False)
+
+    def test_relations(self):
+        pattern = ['?', '>r1', '!=r1+1&<=r2']
+        expected = [c for c in itertools.product(range(26), repeat=3)
+                    if c[1] > c[0] and c[2] != (c[0] + 1) % 26 and c[2] <= c[1]]
+        combos = list(expand_unknowns(pattern))
+        self.assertEqual(combos, expected)
+        self.assertEqual(list(expand_unknowns(pattern, 1000)), expected[1000:])
+        self.assertEqual(estimate_run("abc", pattern, {}, ["the"], sample=5)["candidates"], len(expected))
+
+    def test_keyspace_size_counts_without_enumerating(self):
+        for pattern in (['?', '>r1', '!=r1+1&<=r2'], ['{1,2}', '?', '?&<r1'], ['?', '5', '?&>=r1-3&!=r2', '<r3']):
+            self.assertEqual(bombe_mod._keyspace_size(pattern), sum(1 for _ in expand_unknowns(pattern)))
+        # Eight strictly increasing offsets out of 26, a 26^8 product to enumerate
+        chain = ['?'] + [f'>r{i}' for i in range(1, 8)]
+        self.assertEqual(bombe_mod._keyspace_size(chain), 1562275)
+
+    def test_search_respects_relations(self):
+        ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn, the convoy waits", (7, 21))
+        full = guess_offsets(ct, ['?', '?'], {}, ["the", "dawn"], top_n=1000, verbose=False)
+        for pattern in (['?', '>r1+3'], ['{2-9}&!=r2', '?']):
+            allowed = set(expand_unknowns(pattern))
+            expected = [r for r in full if r[1] in allowed][:10]
+            self.assertEqual(guess_offsets(ct, pattern, {}, ["the", "dawn"], verbose=False), expected)
+            self.assertEqual(guess_offsets(ct, pattern, {}, ["the", "dawn"], workers=2, verbose=False), expected)
+            self.assertEqual(CandidateSet(ct, pattern, {}).rank(["the", "dawn"]), expected)
+
+    def test_estimate(self):
+        estimate = estimate_run("hold the bridge", ['?', '3-7'], {}, ["the"], sample=50)
+        self.assertEqual(estimate["candidates"], 26 * 5)
+        self.assertGreater(estimate["per_second"], 0)
+        self.assertAlmostEqual(estimate["seconds"], 130 / estimate["per_second"])
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.db")
+        self.ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn", (7, 21))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def wait(self, scheduler):
+        deadline = time.time() + 60
+        while scheduler.step() and time.time() < deadline:
+            time.sleep(0.05)
+
+    def test_priority_order_and_results(self):
+        low = submit_job(self.ct, ['?', '?'], {}, ["the", "dawn"], priority=0, path=self.path)
+        high = submit_job(self.ct, ['?', '>r1'], {}, ["the", "dawn"], priority=5, scorer="quadgram", path=self.path)
+        dropped = submit_job(self.ct, ['?', '?'], {}, priority=9, path=self.path)
+        self.assertTrue(cancel_job(dropped, self.path))
+        self.wait(Scheduler(self.path, cpus=1))
+        self.assertEqual(Scheduler(self.path, cpus=1).step(), 0)
+
+        jobs = {job["job_id"]: job for job in list_jobs(path=self.path)}
+        self.assertEqual(jobs[dropped]["status"], "cancelled")
+        self.assertLess(jobs[high]["started"], jobs[low]["started"])
+        self.assertEqual(collect(low, self.path)["results"],
+                         guess_offsets(self.ct, ['?', '?'], {}, ["the", "dawn"], verbose=False))
+        self.assertEqual(collect(high, self.path)["results"],
+                         guess_offsets(self.ct, ['?', '>r1'], {}, [], scorer="quadgram", verbose=False))
+        self.assertEqual(jobs[low]["processed"], 26 * 26)
+        self.assertFalse(cancel_job(low, self.path))
+        with self.assertRaises(ValueError):
+            submit_job(self.ct, ['?', 'x'], path=self.path)
+
+    def test_cpu_budget_and_cancel(self):
+        slow = [submit_job(self.ct, ['?'] * 4, {}, ["the"], workers=w, path=self.path) for w in (1, 1, 2)]
+        scheduler = Scheduler(self.path, cpus=2)
+        self.assertEqual(scheduler.step(), 2)
+        self.assertEqual(sorted(scheduler.running), slow[:2])
+        for job_id in slow:
+            cancel_job(job_id, self.path)
+        self.wait(scheduler)
+        self.assertEqual({job["status"] for job in list_jobs(path=self.path)}, {"cancelled"})
+
+    def test_stopped_jobs_are_requeued(self):
+        job_id = submit_job(self.ct, ['?'] * 4, {}, ["the"], path=self.path)
+        scheduler = Scheduler(self.path, cpus=1)
+        scheduler.step()
+        self.assertEqual(list_jobs("running", self.path)[0]["job_id"], job_id)
+        scheduler.stop()
+        self.assertEqual(list_jobs("queued", self.path)[0]["job_id"], job_id)
+        cancel_job(job_id, self.path)
+
+    def test_cancel_drops_the_checkpoint(self):
+        job_id = submit_job(self.ct, ['?'] * 4, {}, ["the"], path=self.path)
+        scheduler = Scheduler(self.path, cpus=1)
+        scheduler.step()
+        database = init_checkpoints(self.path)
+        deadline = time.time() + 60
+        while not database.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0] and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(cancel_job(job_id, self.path))
+        self.wait(scheduler)
+        self.assertEqual(database.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0], 0)
+        close_db(database)
+
+    def test_only_the_owner_closes_a_job(self):
+        job_id = submit_job(self.ct, ['?', '?'], {}, ["the", "dawn"], path=self.path)
+        database = init_jobs(self.path)
+        claim_job(database, "host:1:new", 1)
+        close_db(database)
+        # A worker whose job was requeued and claimed by another scheduler
+        jobs_mod._run_job(self.path, job_id, 1, "host:1:old")
+        job = collect(job_id, self.path)
+        self.assertEqual((job["status"], job["results"]), ("running", None))
+        jobs_mod._run_job(self.path, job_id, 1, "host:1:new")
+        self.assertEqual(collect(job_id, self.path)["status"], "done")
+
+    def test_schedulers_share_a_file(self):
+        slow = [submit_job(self.ct, ['?'] * 4, {}, ["the"], path=self.path) for _ in range(3)]
+        first = Scheduler(self.path, cpus=2)
+        self.assertEqual(first.step(), 2)
+        # Another scheduler leaves running jobs alone and shares their CPUs
+        second = Scheduler(self.path, cpus=2)
+        self.assertEqual(second.step(), 0)
+        second.stop()
+        running = list_jobs("running", self.path)
+        self.assertEqual(sorted(job["job_id"] for job in running), slow[:2])
+        self.assertEqual({job["owner"] for job in running}, {first.owner})
+
+        # The first scheduler dies: its jobs are taken back once it is gone or its heartbeat is stale
+        for process, _ in first.running.values():
+            process.terminate()
+            process.join()
+        Scheduler(self.path, cpus=2)
+        self.assertEqual(len(list_jobs("running", self.path)), 2)
+        gone = subprocess.Popen([sys.executable, "-c", "pass"])
+        gone.wait()
+        database = init_jobs(self.path)
+        database.execute("UPDATE jobs SET owner = ? WHERE job_id = ?",
+                         (f"{socket.gethostname()}:{gone.pid}:0", slow[0]))
+        database.execute("UPDATE jobs SET heartbeat = 0 WHERE job_id = ?", (slow[1],))
+        database.commit()
+        close_db(database)
+        Scheduler(self.path, cpus=2)
+        self.assertEqual(len(list_jobs("queued", self.path)), 3)
+        for job_id in slow:
+            cancel_job(job_id, self.path)
+
+
+class TestCribSolver(unittest.TestCase):
+    def setUp(self):
+        self.pb = {'a': 'q', 'q': 'a', 'e': 'z', 'z': 'e'}
+        self.key = (4, 25, 23)
+        self.plaintext = "weather report for today: rain in the north, attack at dawn"
+        enc = TestUnknownsAndScoring().encrypt_with_stepping
+        self.ct = plugboard_apply(enc(plugboard_apply(self.plaintext, self.pb), self.key), self.pb)
+
+    def test_every_solution_reproduces_the_crib(self):
+        solutions = solve_crib(self.ct, "attack at dawn", ['?', '?', '?'], self.pb)
+        self.assertIn((self.plaintext.index("attack"), self.key), solutions)
+        for pos, offsets in solutions:
+            pt = decrypt_message(self.ct, [Rotor(o) for o in offsets], self.pb)
+            self.assertTrue(pt[pos:].replace(" ", "").startswith("attackatdawn"))
+
+    def test_known_position_and_pattern(self):
+        pos = self.plaintext.index("rain")
+        solutions = solve_crib(self.ct, "rain in the north", ['4', '?', '?'], self.pb, position=pos)
+        self.assertIn((pos, self.key), solutions)
+        self.assertTrue(all(p == pos and off[0] == 4 for p, off in solutions))
+
+    def test_impossible_crib(self):
+        # Consecutive letters always move by at least one step, a constant shift can't happen
+        self.assertEqual(solve_crib("aaaaaaaa", "bbbbbb", ['?', '?'], {}), [])
+        self.assertEqual(solve_crib("abc", "longer than the text", ['?'], {}), [])
+
+    def test_drag_finds_the_positions_solve_crib_can_solve(self):
+        pos = self.plaintext.index("attack")
+        ranked = drag_crib(self.ct, "attack at dawn", ['?', '?', '?'], self.pb)
+        self.assertIn((pos, 0), ranked)
+        solved = {p for p, _ in solve_crib(self.ct, "attack at dawn", ['?', '?', '?'], self.pb)}
+        self.assertEqual({p for p, _ in ranked}, solved)
+
+    def test_drag_ranks_near_misses_after_fits(self):
+        # Without the plugboard the true position only fits approximately
+        pos = self.plaintext.index("rain")
+        ranked = drag_crib(self.ct, "rain in the north", ['?', '?', '?'], {}, max_mismatches=10)
+        self.assertEqual(ranked[0][0], pos)
+        self.assertGreater(ranked[0][1], 0)
+        self.assertGreater(len(ranked), 1)
+        self.assertEqual([m for _, m in ranked], sorted(m for _, m in ranked))
+        self.assertEqual(drag_crib(self.ct, "rain in the north", ['?', '?', '?'], {}, max_mismatches=10,
+                                   limit=3), ranked[:3])
+
+    def test_drag_long_message(self):
+        plaintext = "the convoy will leave the harbour at dawn. " * 2000
+        ct = TestUnknownsAndScoring().encrypt_with_stepping(plaintext, (3, 14, 9))
+        ranked = drag_crib(ct, "leave the harbour", ['?', '?', '?'])
+        positions = [p for p, _ in ranked]
+        self.assertIn(plaintext.index("leave"), positions)
+        self.assertTrue(all(plaintext.startswith("leave", p) for p in positions))
+
+
+class TestPlugboardSearch(unittest.TestCase):
+    def setUp(self):
+        self.pb = {}
+        for a, b in ("ab", "cx", "ep", "ly"):
+            add_mapping(self.pb, a, b)
+        self.key = (3, 14, 2)
+        self.plaintext = ("the light which comes from the sun is made of rays of many colours and when "
+                          "these rays fall upon a prism they are refracted by different amounts so "
+                          "that the colours are separated from each other")
+        enc = TestUnknownsAndScoring().encrypt_with_stepping
+        self.ct = plugboard_apply(enc(plugboard_apply(self.plaintext, self.pb), self.key), self.pb)
+
+    def test_recovers_plugboard_at_known_setting(self):
+        score, pb_map, pt = recover_plugboard(self.ct, self.key, max_pairs=6, restarts=6)
+        self.assertEqual(pb_map, self.pb)
+        self.assertEqual(pt, self.plaintext)
+
+    def test_recovers_setting_and_plugboard_together(self):
+        plaintext = self.plaintext[:150]
+        pb = dict(self.pb)
+        add_mapping(pb, 't', 'r')
+        ct = plugboard_apply(TestUnknownsAndScoring().encrypt_with_stepping(plugboard_apply(plaintext, pb), (22, 9)), pb)
+        # Scored with no plugboard, the true setting isn't among the leaders
+        self.assertNotIn((22, 9), [c for _, c, _ in guess_offsets(ct, ['?', '?'], {}, [], top_n=5,
+                                                                   scorer="quadgram", verbose=False)])
+        score, offsets, pb_map, pt = guess_offsets_with_plugboard(ct, ['?', '?'], settings=12, top_n=2,
+                                                                  max_pairs=6, restarts=4)[0]
+        self.assertEqual(offsets, (22, 9))
+        self.assertEqual(pb_map, pb)
+        self.assertEqual(pt, plaintext)
+
+    def test_parallel_restarts_match_sequential(self):
+        seq = recover_plugboard(self.ct, self.key, max_pairs=6, restarts=3)
+        par = recover_plugboard(self.ct, self.key, max_pairs=6, restarts=3, workers=3)
+        self.assertEqual(seq, par)
+
+
+class TestQuadgram(unittest.TestCase):
+    def test_quadgram_scores_space_stripped_text(self):
+        # Word matching finds nothing without spaces, quadgrams still rank English first
+        plaintext = "thelightofthesunisreflectedbythewater"
+        ct = TestUnknownsAndScoring().encrypt_with_stepping(plaintext, (3, 14, 2))
+        self.assertEqual(score_plaintext(plaintext, ["the", "light", "sun"]), 0)
+        results = guess_offsets(ct, ['?', '?', '?'], {}, [], top_n=3, scorer="quadgram")
+        self.assertEqual(results[0][2], plaintext)
+
+    def test_quadgram_scorer_prefers_english(self):
+        q = QuadgramScorer()
+        self.assertGreater(q.score("the light of the sun"), q.score("qzx jvkw pq xzv qqq"))
+        self.assertEqual(q.score("abc"), 0.0)  # too short for a quadgram
+        self.assertIs(make_scorer(q, []), q)
+        with self.assertRaises(ValueError):
+            make_scorer("nope", [])
+
+
+@unittest.skipIf(bombe_mod.np is None, "numpy not installed")
+class TestVectorized(unittest.TestCase):
+    def test_matches_decrypt_message(self):
+        pb = {'a': 'q', 'q': 'a', 'e': 'z', 'z': 'e'}
+        ct = "Zkq, xyzzy! ab cd efg"
+        combos = list(expand_unknowns(['?', '7', '?']))
+        matrix = decrypt_candidates(ct, combos, pb)
+        for row, combo in zip(matrix, combos):
+            pt = decrypt_message(ct, [Rotor(o) for o in combo], pb)
+            letters = ''.join(ch for ch in pt if 'a' <= ch <= 'z')
+            self.assertEqual(''.join(chr(97 + c) for c in row), letters)
+
+    def test_true_key_ranks_near_top(self):
+        plaintext = ("it is a truth universally acknowledged that a single man in possession "
+                     "of a good fortune must be in want of a wife")
+        ct = TestUnknownsAndScoring().encrypt_with_stepping(plaintext, (4, 19, 11))
+        results = guess_offsets_vectorized(ct, ['?', '?', '?'], {}, top_n=30)
+        # Letter statistics can't separate keys that differ by a couple of letters,
+        # but the true plaintext must be in the leading group
+        self.assertIn(plaintext, [pt for _, _, pt in results])
+        self.assertEqual(results, sorted(results, key=lambda x: (-x[0], x[1])))
+
+    def test_deep_stacks_and_guess_offsets_backend(self):
+        # 15 rotors: the odometer value no longer fits in int64
+        pattern = ['3'] * 13 + ['?', '?']
+        ct = "the convoy waits at the bridge"
+        combos = list(expand_unknowns(pattern))[::37]
+        for row, combo in zip(decrypt_candidates(ct, combos, {}), combos):
+            pt = decrypt_message(ct, [Rotor(o) for o in combo], {})
+            self.assertEqual(''.join(chr(97 + c) for c in row), pt.replace(" ", ""))
+
+        ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn, the convoy waits", (7, 21))
+        plain = guess_offsets(ct, ['?', '?'], {}, [], scorer="letters", verbose=False)
+        fast = guess_offsets(ct, ['?', '?'], {}, [], scorer="letters", verbose=False, vectorized=True)
+        self.assertEqual([(c, pt) for _, c, pt in fast], [(c, pt) for _, c, pt in plain])
+        for (a, _, _), (b, _, _) in zip(fast, plain):
+            self.assertAlmostEqual(a, b)
+
+    def test_chunks_keep_memory_flat(self):
+        ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn", (7, 21, 3))
+        for pattern in (['?', '?', '?'], ['2-5', '?', '>r2', '?']):
+            whole = bombe_mod._letters_keyspace(ct, pattern, {}, 10).items()
+            self.assertEqual(bombe_mod._letters_keyspace(ct, pattern, {}, 10, chunk_cells=700).items(), whole)
+        peaks = []
+        for rotors in (3, 4):
+            tracemalloc.start()
+            bombe_mod._letters_keyspace(ct, ['?'] * rotors, {}, 10, chunk_cells=20_000)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        # 26 times the candidates, about the same memory
+        self.assertLess(peaks[1], 2 * peaks[0])
+
+    def test_plugboard_must_join_letters(self):
+        with self.assertRaises(ValueError):
+            decrypt_candidates("abc", [(1, 2)], {'a': '1', '1': 'a'})
+        ct = TestUnknownsAndScoring().encrypt_with_stepping("hold the bridge at dawn", (7, 21))
+        pb = {'a': 'ab', 'ab': 'a'}
+        self.assertEqual(guess_offsets(ct, ['?', '?'], pb, [], scorer="letters", verbose=False, vectorized=True),
+                         guess_offsets(ct, ['?', '?'], pb, [], scorer="letters", verbose=False))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,147 @@
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+try:
+    from .bombe import DEFAULT_DICTIONARY, guess_offsets
+    from .scoring import SCORERS
+except ImportError:  # Running directly
+    sys.path.append(str(Path(__file__).resolve().parent.parent))  # for the enigma package
+    from bombe import DEFAULT_DICTIONARY, guess_offsets
+    from scoring import SCORERS
+
+from enigma.enigma import encrypt_message
+from enigma.plugboard import Plugboard
+from enigma.rotor import Rotor as ERotor
+
+
+# ------------------------- SYNTHETIC TRAFFIC -------------------------
+# make_corpus enciphers plaintexts under random known keys with the real
+# enigma.encrypt_message, and evaluate runs the bombe over the result, so a
+# scorer or search change can be judged on both speed and how often it still
+# finds the key:
+#
+#   python -m bombe.traffic                       20 messages, 2 rotors, every scorer
+#   python -m bombe.traffic 50 3 report.json      50 messages, 3 rotors, JSON report
+
+SENTENCES = [
+    "the convoy will leave the harbour at dawn",
+    "report the position of the enemy ships to headquarters",
+    "weather in the north is clear and the wind is from the west",
+    "all units are to hold their positions until further orders",
+    "the bridge is to be destroyed if the enemy reaches the river",
+    "send more fuel and ammunition to the second battalion",
+    "the attack on the town will begin at first light",
+    "aircraft were seen moving to the east of the airfield",
+    "the submarine is to return to port for repairs",
+    "no movement on the southern road since midnight",
+    "the general will arrive by train in the evening",
+    "keep radio silence until the signal is given",
+    "the supply train was delayed by heavy snow",
+    "two tanks and a company of infantry are in the village",
+    "confirm that the message was received and understood",
+    "the fleet is to meet at the agreed point at noon",
+]
+
+
+def _plaintext(rng: random.Random, length: int) -> str:
+    # Random sentences until the message is long enough, cut back to a whole word
+    text = ""
+    while len(text) < length:
+        text += rng.choice(SENTENCES) + " "
+    cut = text.rfind(" ", 0, length + 1)
+    return text[:cut if cut > 0 else length].strip()
+
+
+def _random_plugboard(rng: random.Random, pairs: int) -> dict:
+    letters = rng.sample("abcdefghijklmnopqrstuvwxyz", 2 * pairs)
+    plugboard_map = {}
+    for a, b in zip(letters[::2], letters[1::2]):
+        plugboard_map[a] = b
+        plugboard_map[b] = a
+    return plugboard_map
+
+
+def _enigma_plugboard(plugboard_map: dict) -> Plugboard:
+    plugboard = Plugboard()
+    plugboard.letters = [plugboard_map.get(ch, ch) for ch in plugboard.letters]
+    return plugboard
+
+
+def make_corpus(count: int, rotors: int = 3, lengths=(40, 160), plugboard_pairs=(0, 3, 6),
+                seed: int = 0, db_path: str = ":memory:") -> list[dict]:
+    """Encipher `count` random messages under random keys, reproducibly for a seed.
+
+    Each message length is drawn from the `lengths` range (inclusive) and each
+    plugboard gets a cable count picked from `plugboard_pairs`. Messages go
+    through enigma.encrypt_message, which records them in `db_path`; the default
+    keeps that in memory. Returns JSON-ready dicts with the plaintext,
+    ciphertext, offsets and plugboard of every message.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        plaintext = _plaintext(rng, rng.randint(*lengths))
+        offsets = [rng.randrange(26) for _ in range(rotors)]
+        plugboard_map = _random_plugboard(rng, rng.choice(plugboard_pairs))
+        ciphertext = encrypt_message(plaintext, [ERotor(o) for o in offsets],
+                                     _enigma_plugboard(plugboard_map), db_path)
+        corpus.append({"plaintext": plaintext, "ciphertext": ciphertext,
+                       "offsets": offsets, "plugboard": plugboard_map})
+    return corpus
+
+
+def evaluate(corpus: list[dict], dict_words=DEFAULT_DICTIONARY, scorer="words", top_n: int = 10,
+             known_plugboard: bool = True, **search) -> dict:
+    """Run guess_offsets over every message and report speed and accuracy.
+
+    A message counts as recovered when a result decrypts it back to its
+    plaintext (equivalent keys give the same plaintext, so the exact offsets are
+    not compared): "top1" is the share recovered by the best result and "topn"
+    the share recovered anywhere in the top N. With known_plugboard=False the
+    bombe is given no plugboard. Extra keyword arguments go to guess_offsets.
+    """
+    keys = top1 = topn = 0
+    started = time.perf_counter()
+    for message in corpus:
+        pattern = ['?'] * len(message["offsets"])
+        plugboard_map = message["plugboard"] if known_plugboard else {}
+        results = guess_offsets(message["ciphertext"], pattern, plugboard_map, dict_words,
+                                top_n=top_n, scorer=scorer, verbose=False, **search)
+        keys += 26 ** len(pattern)
+        found = [pt == message["plaintext"].lower() for _, _, pt in results]
+        top1 += bool(found) and found[0]
+        topn += any(found)
+    seconds = time.perf_counter() - started
+
+    n = len(corpus)
+    return {"scorer": scorer if isinstance(scorer, str) else type(scorer).__name__,
+            "messages": n, "top_n": top_n, "keys": keys, "seconds": seconds,
+            "keys_per_second": keys / seconds if seconds else None,
+            "messages_per_hour": n * 3600 / seconds if seconds else None,
+            "top1": top1 / n if n else None, "topn": topn / n if n else None}
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) > 3 or not all(a.isdigit() for a in args[:2]):
+        print("Usage: traffic.py [COUNT] [ROTORS] [OUTPUT.json]\n"
+              " Enciphers COUNT random messages and scores every bombe scorer on them")
+        sys.exit(1)
+    count = int(args[0]) if args else 20
+    rotors = int(args[1]) if len(args) > 1 else 2
+
+    corpus = make_corpus(count, rotors)
+    reports = [evaluate(corpus, scorer=name) for name in SCORERS]
+    print(f"{'Scorer':<10} {'keys/s':>10} {'msgs/hour':>10} {'top-1':>7} {'top-N':>7}")
+    for r in reports:
+        print(f"{r['scorer']:<10} {r['keys_per_second']:>10.0f} {r['messages_per_hour']:>10.0f} "
+              f"{r['top1']:>7.0%} {r['topn']:>7.0%}")
+    if len(args) > 2:
+        Path(args[2]).write_text(json.dumps({"corpus": corpus, "reports": reports}, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
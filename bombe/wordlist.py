@@ -0,0 +1,148 @@
+from array import array
+from pathlib import Path
+import hashlib
+import mmap
+import re
+import struct
+import zlib
+
+# ------------------------- COMPILED WORD LISTS -------------------------
+# A word list file (one word per line) is compiled once into a ".bwl" file next
+# to it and memory-mapped on every later run, so even a 100k+ word list opens in
+# a few milliseconds and never has to be read into Python objects.
+#
+# Layout (little endian):
+#   b"BWL1", word count (u32), slot count (u32, power of two), sha256 of the words
+#   slots: u32 per slot, 0 = empty, otherwise 1 + offset of the word in the blob
+#   blob:  the sorted words, each as a length byte followed by its UTF-8 bytes
+# Lookups hash the word with crc32 and probe the open-addressed slot table, so
+# checking a token costs about the same as a dict lookup.
+
+_MAGIC = b"BWL1"
+_HEADER = struct.Struct("<4sII32s")
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def compile_word_list(words, path) -> Path:
+    """Write `words` (any iterable of str) as a compiled word list at `path`.
+
+    Words are uppercased and deduplicated. Only single tokens are kept, the same
+    ones WordScorer can look up, and anything over 255 bytes is dropped.
+    """
+    unique = sorted({w.strip().upper() for w in words if _TOKEN_RE.fullmatch(w.strip())})
+    encoded = [w.encode() for w in unique]
+    encoded = [b for b in encoded if len(b) < 256]
+
+    slots = 1
+    while slots < 2 * len(encoded):
+        slots *= 2
+    table = array("I", [0]) * slots
+    blob = bytearray()
+    for word in encoded:
+        slot = zlib.crc32(word) & (slots - 1)
+        while table[slot]:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = len(blob) + 1
+        blob.append(len(word))
+        blob += word
+
+    digest = hashlib.sha256(b"\n".join(encoded)).digest()
+    path = Path(path)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(encoded), slots, digest))
+        f.write(table.tobytes())
+        f.write(blob)
+    return path
+
+
+class WordList:
+    """Read-only, memory-mapped word set for WordScorer (see load_word_list).
+
+    Behaves like WordScorer's weights dict: get(word) is 1 for listed words and
+    items() walks them in sorted order. with_words() adds a few extra words
+    without recompiling.
+    """
+
+    def __init__(self, path, extra=()):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._slots, digest = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} is not a compiled word list")
+        self._table = memoryview(self._map)[_HEADER.size:_HEADER.size + 4 * self._slots].cast("I")
+        self._blob = _HEADER.size + 4 * self._slots
+        self._mask = self._slots - 1
+        self._recent = {}
+        self.extra = {}
+        for w in extra:
+            up = w.strip().upper()
+            if _TOKEN_RE.fullmatch(up) and not self._lookup(up.encode()):
+                self.extra[up] = 1
+        self.base_digest = digest.hex()  # the compiled words alone, without extra
+        self.digest = hashlib.sha256(digest + "\n".join(sorted(self.extra)).encode()).hexdigest()
+
+    def __reduce__(self):
+        # Worker processes reopen the file instead of copying it
+        return WordList, (self.path, tuple(self.extra))
+
+    def _lookup(self, word: bytes) -> bool:
+        m, table, mask = self._map, self._table, self._mask
+        slot = zlib.crc32(word) & mask
+        start = table[slot]
+        while start:
+            start += self._blob
+            if m[start - 1] == len(word) and m[start:start + len(word)] == word:
+                return True
+            slot = (slot + 1) & mask
+            start = table[slot]
+        return False
+
+    def get(self, word: str, default=0):
+        # Short tokens come up in almost every candidate, remember recent answers
+        found = self._recent.get(word)
+        if found is None:
+            found = 1 if self._lookup(word.encode()) or word in self.extra else 0
+            if len(self._recent) >= 1 << 16:
+                self._recent.clear()
+            self._recent[word] = found
+        return found or default
+
+    def __contains__(self, word: str) -> bool:
+        return bool(self.get(word))
+
+    def __len__(self) -> int:
+        return self.count + len(self.extra)
+
+    def __iter__(self):
+        m = self._map
+        pos = self._blob
+        for _ in range(self.count):
+            n = m[pos]
+            yield m[pos + 1:pos + 1 + n].decode()
+            pos += 1 + n
+        yield from self.extra
+
+    def items(self):
+        for word in self:
+            yield word, 1
+
+    def with_words(self, words) -> "WordList":
+        # Same compiled list plus a few more words (e.g. typed in the GUI)
+        return WordList(self.path, tuple(self.extra) + tuple(words))
+
+
+def load_word_list(path) -> WordList:
+    """Open a word list, compiling `path` to `path + ".bwl"` first if needed.
+
+    A ".bwl" path is opened directly. For a text file, the compiled copy is
+    rebuilt whenever the text file is newer than it.
+    """
+    path = Path(path)
+    if path.suffix == ".bwl":
+        return WordList(path)
+    compiled = path.with_name(path.name + ".bwl")
+    if not compiled.exists() or compiled.stat().st_mtime < path.stat().st_mtime:
+        with open(path, encoding="utf-8") as f:
+            compile_word_list(f, compiled)
+    return WordList(compiled)
@@ -4,7 +4,7 @@ from __future__ import annotations
 import re
 import string
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import filedialog, messagebox, ttk
 
 # --- Import your real library code ---
 try:
@@ -28,11 +28,41 @@ except Exception as e:  # soft-fail so GUI can show a friendly error
 
 try:
     from bombe.bombe import guess_offsets as bombe_guess_offsets
+    from bombe.bombe import decrypt_message as bombe_decrypt, Rotor as BRotor
+    from bombe.bombe import estimate_run as bombe_estimate_run, parse_pattern as bombe_parse_pattern
+    from bombe.bombe import cached_results as bombe_cached_results, cache_results as bombe_cache_results
+    from bombe.scoring import SCORERS as BOMBE_SCORERS
+    from bombe.crib import solve_crib as bombe_solve_crib
+    from bombe.database import CACHE_PATH as BOMBE_CACHE_PATH
+    from bombe.wordlist import load_word_list as bombe_load_word_list
+    from bombe.candidates import CandidateSet as BombeCandidateSet, fits as bombe_candidates_fit
+    from bombe import jobs as bombe_jobs
 except Exception as e:  # soft-fail
     bombe_guess_offsets = None
+    bombe_decrypt = None
+    BRotor = None
+    bombe_estimate_run = None
+    bombe_parse_pattern = None
+    bombe_cached_results = None
+    bombe_cache_results = None
+    BOMBE_SCORERS = ("words",)
+    bombe_solve_crib = None
+    BOMBE_CACHE_PATH = None
+    bombe_load_word_list = None
+    BombeCandidateSet = None
+    bombe_candidates_fit = None
+    bombe_jobs = None
+
+BOMBE_CONFIRM_SECONDS = 60  # Ask before starting a Bombe run estimated to take longer
+# Scorers worth keeping a CandidateSet for: they follow the dictionary, so an edited word
+# list only rescores. The others have faster searches of their own (histograms, NumPy).
+BOMBE_RESCORE_SCORERS = ("words", "segment")
 
 ALPHABET = string.ascii_uppercase
 
+# Used when the bombe package can't be imported or doesn't provide DEFAULT_DICTIONARY
+_FALLBACK_DICTIONARY = ["THE", "AND", "TO", "OF", "YOU", "IS", "IN", "THAT", "IT", "FOR"]
+
 # add this new import near the top with the others
 import importlib
 
@@ -49,7 +79,7 @@ try:
                 break
     if not _dict:
         # sensible fallback if backend doesn't expose a list
-        _dict = ["THE", "AND", "TO", "OF", "YOU", "IS", "IN", "THAT", "IT", "FOR"]
+        _dict = list(_FALLBACK_DICTIONARY)
     # uppercase + dedup while preserving order
     seen = set()
     BOMBE_DEFAULT_DICTIONARY = []
@@ -59,7 +89,7 @@ try:
             seen.add(u)
             BOMBE_DEFAULT_DICTIONARY.append(u)
 except Exception:
-    BOMBE_DEFAULT_DICTIONARY = ["THE", "AND", "TO", "OF", "YOU", "IS", "IN", "THAT", "IT", "FOR"]
+    BOMBE_DEFAULT_DICTIONARY = list(_FALLBACK_DICTIONARY)
 
 
 # ---------- Helpers to bridge GUI state <-> your libs ----------
@@ -386,6 +416,8 @@ class BombeGUI(tk.Toplevel):
         self.enigma_window = enigma_window
         self._last_ciphertext: str | None = None
         self._last_pb_map: dict[str, str] | None = None
+        # Decrypted keyspace of the last run, so a dictionary/scorer change only rescores
+        self._candidates = None
 
         self._build_ui()
 
@@ -412,7 +444,11 @@ class BombeGUI(tk.Toplevel):
         tk.Label(inp, text="Dictionary Words (comma-separated):", bg="#333333", fg="white").grid(row=1, column=0, sticky="w", padx=5, pady=3)
         self.dictionary_entry = tk.Entry(inp, width=76, font=("Courier New", 10), bg="#111111", fg="white", insertbackground="white")
         #self.dictionary_entry.insert(-1, ", ".join(BOMBE_DEFAULT_DICTIONARY))
-        self.dictionary_entry.grid(row=1, column=1, columnspan=3, sticky="ew", padx=5, pady=3)
+        self.dictionary_entry.grid(row=1, column=1, columnspan=2, sticky="ew", padx=5, pady=3)
+        # large word list file, used on top of the words above
+        self.word_list = None
+        self.word_list_button = tk.Button(inp, text="Load Word List...", command=self._load_word_list, bg="#555555", fg="white")
+        self.word_list_button.grid(row=1, column=3, padx=5, pady=3)
         tk.Button(inp, text="Reset to Backend", command=self._reset_dictionary, bg="#555555", fg="white").grid(row=1, column=4, padx=5, pady=3)
 
         # plugboard
@@ -421,7 +457,7 @@ class BombeGUI(tk.Toplevel):
         self.plugboard_entry.grid(row=2, column=1, columnspan=4, sticky="ew", padx=5, pady=3)
 
         # rotor pattern offsets (0–25 or '?'), like CLI
-        tk.Label(inp, text="Rotor Offsets (0-25 or ?):", bg="#333333", fg="white").grid(row=3, column=0, sticky="w", padx=5, pady=3)
+        tk.Label(inp, text="Rotor Offsets (0-25, ?, 3-9, {1,4}):", bg="#333333", fg="white").grid(row=3, column=0, sticky="w", padx=5, pady=3)
         self.r_off_1 = tk.Entry(inp, width=4, bg="#111111", fg="white", justify="center")
         self.r_off_2 = tk.Entry(inp, width=4, bg="#111111", fg="white", justify="center")
         self.r_off_3 = tk.Entry(inp, width=4, bg="#111111", fg="white", justify="center")
@@ -429,8 +465,30 @@ class BombeGUI(tk.Toplevel):
             e.insert(0, "?")
             e.grid(row=3, column=i, padx=2, pady=3)
 
-        tk.Button(inp, text="Run Bombe", command=self._run_bombe,
-                  bg="#555555", fg="white", font=("Arial", 10, "bold"), relief="raised").grid(row=3, column=4, padx=8, pady=3)
+        self.run_button = tk.Button(inp, text="Run Bombe", command=self._run_bombe,
+                  bg="#555555", fg="white", font=("Arial", 10, "bold"), relief="raised")
+        self.run_button.grid(row=3, column=4, padx=8, pady=3)
+
+        # scorer used to rank candidates
+        tk.Label(inp, text="Scorer:", bg="#333333", fg="white").grid(row=4, column=0, sticky="w", padx=5, pady=3)
+        self.scorer_choice = ttk.Combobox(inp, values=list(BOMBE_SCORERS), state="readonly", width=12)
+        self.scorer_choice.set(BOMBE_SCORERS[0])
+        self.scorer_choice.grid(row=4, column=1, columnspan=2, sticky="w", padx=2, pady=3)
+
+        # queue the search as a background job instead (see bombe/jobs.py)
+        self.priority_entry = tk.Spinbox(inp, from_=-9, to=9, width=3, bg="#111111", fg="white", justify="center")
+        self.priority_entry.delete(0, tk.END)
+        self.priority_entry.insert(0, "0")
+        self.priority_entry.grid(row=4, column=3, padx=2, pady=3)
+        tk.Button(inp, text="Queue Job (priority)", command=self._queue_job,
+                  bg="#555555", fg="white").grid(row=4, column=4, padx=8, pady=3)
+
+        # crib (known plaintext) attack
+        tk.Label(inp, text="Crib (known plaintext):", bg="#333333", fg="white").grid(row=5, column=0, sticky="w", padx=5, pady=3)
+        self.crib_entry = tk.Entry(inp, width=40, font=("Courier New", 10), bg="#111111", fg="white", insertbackground="white")
+        self.crib_entry.grid(row=5, column=1, columnspan=3, sticky="ew", padx=5, pady=3)
+        tk.Button(inp, text="Crib Attack", command=self._run_crib_attack,
+                  bg="#555555", fg="white", font=("Arial", 10, "bold"), relief="raised").grid(row=5, column=4, padx=8, pady=3)
 
         # --- Results ---
         out = tk.LabelFrame(main, text="Results", bg="#333333", fg="white", font=("Arial", 10, "bold"))
@@ -446,14 +504,36 @@ class BombeGUI(tk.Toplevel):
         self.results_view.column("plaintext", width=700, anchor="w")
         self.results_view.pack(fill="both", expand=True, padx=6, pady=6)
 
+        # live search progress
+        self.progress_label = tk.Label(out, text="", bg="#333333", fg="white", anchor="w", font=("Courier New", 9))
+        self.progress_label.pack(fill="x", padx=6, pady=(0, 6))
+
         btns = tk.Frame(main, bg="#222222")
         btns.pack(fill="x", padx=6, pady=4)
         tk.Button(btns, text="Apply Selected to Enigma", command=self._apply_selected_to_enigma, bg="#4CAF50", fg="white").pack(side="left", padx=5)
         tk.Button(btns, text="Open/Focus Enigma", command=self._ensure_enigma_window, bg="#607D8B", fg="white").pack(side="left", padx=5)
+        tk.Button(btns, text="Jobs...", command=self._open_jobs, bg="#607D8B", fg="white").pack(side="left", padx=5)
 
     def _reset_dictionary(self):
         self.dictionary_entry.delete(0, tk.END)
         self.dictionary_entry.insert(0, ", ".join(BOMBE_DEFAULT_DICTIONARY))
+        self.word_list = None
+        self.word_list_button.config(text="Load Word List...")
+
+    def _load_word_list(self):
+        if bombe_load_word_list is None:
+            messagebox.showerror("Unavailable", "bombe.wordlist not available.")
+            return
+        path = filedialog.askopenfilename(title="Word list (one word per line)",
+                                          filetypes=[("Word lists", "*.txt *.bwl"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            self.word_list = bombe_load_word_list(path)
+        except Exception as e:
+            messagebox.showerror("Word List Failed", str(e))
+            return
+        self.word_list_button.config(text=f"{len(self.word_list)} words")
 
     def _ensure_enigma_window(self):
         if self.enigma_window and self.enigma_window.winfo_exists():
@@ -472,6 +552,13 @@ class BombeGUI(tk.Toplevel):
 
     def _read_rotor_pattern(self) -> list[str] | None:
         vals = [self.r_off_1.get().strip(), self.r_off_2.get().strip(), self.r_off_3.get().strip()]
+        if bombe_parse_pattern is not None:
+            # Ranges, sets, exclusions and relations between rotors (see bombe.parse_pattern)
+            try:
+                return bombe_parse_pattern(",".join(vals))
+            except ValueError as e:
+                messagebox.showerror("Rotor Error", str(e))
+                return None
         pat: list[str] = []
         for v in vals:
             if v == "":
@@ -512,6 +599,8 @@ class BombeGUI(tk.Toplevel):
             if w not in seen:
                 dict_words.append(w)
                 seen.add(w)
+        if self.word_list is not None:
+            dict_words = self.word_list.with_words(dict_words)
         pb_map = _pb_map_from_pairs(plugboard_pairs_str)
 
         # Clear previous
@@ -522,21 +611,163 @@ class BombeGUI(tk.Toplevel):
             messagebox.showerror("Unavailable", "bombe.bombe not available.")
             return
 
+        scorer = self.scorer_choice.get() or "words"
+        rescore = scorer in BOMBE_RESCORE_SCORERS
+        kept = (rescore and self._candidates is not None
+                and self._candidates.matches(ciphertext, rotor_pattern, pb_map))
+        if not kept and bombe_cached_results is not None:
+            # Re-runs of the same job (or a narrower pattern) come straight from the result cache
+            results = bombe_cached_results(ciphertext, rotor_pattern, pb_map, dict_words, 10, scorer,
+                                           BOMBE_CACHE_PATH)
+            if results:
+                self.progress_label.config(text="Results from cache")
+                self._show_bombe_results(results)
+                self._last_ciphertext = ciphertext
+                self._last_pb_map = pb_map
+                return
+
+        size = None
+        if bombe_estimate_run is not None and not kept:
+            # Exact keyspace size and a time measured on this machine, before committing to the run
+            estimate = bombe_estimate_run(ciphertext, rotor_pattern, pb_map, dict_words, scorer)
+            size = estimate["candidates"]
+            eta = estimate["seconds"]
+            self.progress_label.config(text=f"{size} candidates, about "
+                                            f"{'?' if eta is None else f'{eta:.0f}s'}")
+            self.update()
+            if eta is not None and eta > BOMBE_CONFIRM_SECONDS and not messagebox.askyesno(
+                    "Long Run", f"{size} candidates, estimated {eta:.0f}s. Run anyway?"):
+                return
+
+        self.run_button.config(state="disabled")
         try:
-            results = bombe_guess_offsets(ciphertext, rotor_pattern, pb_map, dict_words, top_n=10)
+            candidates = self._candidate_set(ciphertext, rotor_pattern, pb_map, size) if rescore else None
+            if candidates is not None:
+                # Decrypted once and kept, so a dictionary or scorer change only rescores
+                results = candidates.rank(dict_words, scorer, top_n=10)
+                bombe_cache_results(ciphertext, rotor_pattern, pb_map, dict_words, results, 10, scorer,
+                                    BOMBE_CACHE_PATH)
+            else:
+                # Too big to keep, or a scorer with its own fast search: stream it, showing the leaders
+                results = bombe_guess_offsets(ciphertext, rotor_pattern, pb_map, dict_words, top_n=10,
+                                              scorer=scorer, progress=self._show_bombe_progress,
+                                              verbose=False, cache=BOMBE_CACHE_PATH, vectorized=True)
         except Exception as e:
             messagebox.showerror("Bombe Failed", str(e))
             return
+        finally:
+            self.run_button.config(state="normal")
 
         if not results:
             messagebox.showinfo("No Results", "No candidates found.")
             return
 
+        self._show_bombe_results(results)
+        self._last_ciphertext = ciphertext
+        self._last_pb_map = pb_map
+
+    def _candidate_set(self, ciphertext, rotor_pattern, pb_map, size=None):
+        # The kept CandidateSet for this job, built now if size candidates of this message fit in memory
+        if self._candidates is not None and self._candidates.matches(ciphertext, rotor_pattern, pb_map):
+            self.progress_label.config(text="Rescored the last run's candidates")
+            return self._candidates
+        self._candidates = None
+        if BombeCandidateSet is None or size is None or not bombe_candidates_fit(ciphertext, size):
+            return None
+
+        def progress(processed, total):
+            self.progress_label.config(text=f"Decrypting {processed}/{total} candidates")
+            self.update()
+
+        self._candidates = BombeCandidateSet(ciphertext, rotor_pattern, pb_map, progress=progress)
+        return self._candidates
+
+    def _show_bombe_results(self, results):
+        for iid in self.results_view.get_children():
+            self.results_view.delete(iid)
         for (score, offsets, plaintext) in results:
             preview = plaintext.strip().replace("\n", " ")
             if len(preview) > 160:
                 preview = preview[:157] + "..."
-            self.results_view.insert("", "end", values=(score, f"{offsets}", preview))
+            self.results_view.insert("", "end", values=(f"{score:g}", f"{offsets}", preview))
+
+    def _show_bombe_progress(self, snapshot):
+        # Called by guess_offsets while it searches: show counts and the current leaders
+        eta = snapshot["eta_seconds"]
+        self.progress_label.config(text=f"{snapshot['processed']}/{snapshot['total']} candidates, "
+                                        f"{snapshot['per_second']:.0f}/s, "
+                                        f"ETA {'?' if eta is None else f'{eta:.0f}s'}")
+        self._show_bombe_results(snapshot["top"])
+        self.update()
+
+    def _queue_job(self):
+        # Same inputs as Run Bombe, searched by a job scheduler instead of this window
+        if bombe_jobs is None:
+            messagebox.showerror("Unavailable", "bombe.jobs not available.")
+            return
+        ciphertext = self.ciphertext_entry.get().strip().lower()
+        if not ciphertext:
+            messagebox.showwarning("Input Error", "Please enter ciphertext to analyze.")
+            return
+        rotor_pattern = self._read_rotor_pattern()
+        if rotor_pattern is None:
+            return
+        extras = [w.strip().lower() for w in self.dictionary_entry.get().split(',') if w.strip()]
+        dict_words = [w.lower() for w in BOMBE_DEFAULT_DICTIONARY] + extras
+        if self.word_list is not None:
+            dict_words = self.word_list.with_words(dict_words)
+        try:
+            job_id = bombe_jobs.submit_job(ciphertext, rotor_pattern,
+                                           _pb_map_from_pairs(self.plugboard_entry.get().strip().lower()),
+                                           dict_words, priority=int(self.priority_entry.get() or 0),
+                                           scorer=self.scorer_choice.get() or "words")
+        except ValueError as e:
+            messagebox.showerror("Queue Failed", str(e))
+            return
+        self.progress_label.config(text=f"Queued job #{job_id}, see Jobs...")
+
+    def _open_jobs(self):
+        if bombe_jobs is None:
+            messagebox.showerror("Unavailable", "bombe.jobs not available.")
+            return
+        JobsWindow(self)
+
+    def _run_crib_attack(self):
+        ciphertext = self.ciphertext_entry.get().strip().lower()
+        crib = self.crib_entry.get().strip().lower()
+        if not ciphertext or not crib:
+            messagebox.showwarning("Input Error", "Please enter both ciphertext and a crib.")
+            return
+
+        rotor_pattern = self._read_rotor_pattern()
+        if rotor_pattern is None:
+            return
+        pb_map = _pb_map_from_pairs(self.plugboard_entry.get().strip().lower())
+
+        for iid in self.results_view.get_children():
+            self.results_view.delete(iid)
+
+        if bombe_solve_crib is None:
+            messagebox.showerror("Unavailable", "bombe.crib not available.")
+            return
+
+        try:
+            solutions = bombe_solve_crib(ciphertext, crib, rotor_pattern, pb_map)
+        except Exception as e:
+            messagebox.showerror("Crib Attack Failed", str(e))
+            return
+
+        if not solutions:
+            messagebox.showinfo("No Results", "No rotor offsets are consistent with that crib.")
+            return
+
+        # Short cribs leave many keys open, only list the first few hundred
+        for pos, offsets in solutions[:200]:
+            plaintext = bombe_decrypt(ciphertext, [BRotor(o) for o in offsets], pb_map)
+            preview = plaintext.strip().replace("\n", " ")
+            if len(preview) > 160:
+                preview = preview[:157] + "..."
+            self.results_view.insert("", "end", values=(f"crib@{pos}", f"{offsets}", preview))
 
         self._last_ciphertext = ciphertext
         self._last_pb_map = pb_map
@@ -671,6 +902,97 @@ class BombeGUI(tk.Toplevel):
             messagebox.showerror("Decrypt Error", f"Failed to decrypt in Enigma: {e}")
 
 
+# ---------------- Jobs Window ----------------
+class JobsWindow(tk.Toplevel):
+    # Lists the queued Bombe jobs; can cancel them, load finished results into the
+    # Bombe window, and run the queue on this machine while it is open
+    def __init__(self, bombe_window: BombeGUI):
+        super().__init__(bombe_window)
+        self.title("Bombe Jobs")
+        self.geometry("820x360")
+        self.configure(bg="#222222")
+        self.bombe_window = bombe_window
+        self.scheduler = None
+
+        cols = ("job", "status", "priority", "progress", "pattern", "ciphertext")
+        self.jobs_view = ttk.Treeview(self, columns=cols, show="headings")
+        for col, width in zip(cols, (50, 80, 60, 120, 120, 360)):
+            self.jobs_view.heading(col, text=col.title())
+            self.jobs_view.column(col, width=width, anchor="center" if col != "ciphertext" else "w")
+        self.jobs_view.pack(fill="both", expand=True, padx=6, pady=6)
+
+        btns = tk.Frame(self, bg="#222222")
+        btns.pack(fill="x", padx=6, pady=4)
+        tk.Button(btns, text="Refresh", command=self._refresh, bg="#555555", fg="white").pack(side="left", padx=5)
+        tk.Button(btns, text="Cancel Job", command=self._cancel, bg="#555555", fg="white").pack(side="left", padx=5)
+        tk.Button(btns, text="Collect Results", command=self._collect, bg="#4CAF50", fg="white").pack(side="left", padx=5)
+        self.run_here = tk.BooleanVar(value=False)
+        tk.Checkbutton(btns, text="Run jobs here (all CPUs)", variable=self.run_here, command=self._toggle_scheduler,
+                       bg="#222222", fg="white", selectcolor="#333333").pack(side="right", padx=5)
+
+        self.protocol("WM_DELETE_WINDOW", self._close)
+        self._refresh()
+
+    def _selected_job(self) -> int | None:
+        sel = self.jobs_view.selection()
+        if not sel:
+            messagebox.showinfo("Select", "Select a job first.", parent=self)
+            return None
+        return int(self.jobs_view.item(sel[0], "values")[0])
+
+    def _refresh(self):
+        for iid in self.jobs_view.get_children():
+            self.jobs_view.delete(iid)
+        for job in bombe_jobs.list_jobs():
+            progress = f"{job['processed']}/{job['total']}" if job["total"] else "-"
+            self.jobs_view.insert("", "end", values=(job["job_id"], job["status"], job["priority"], progress,
+                                                     ",".join(job["params"]["rotor_pattern"]),
+                                                     job["ciphertext"][:60]))
+
+    def _cancel(self):
+        job_id = self._selected_job()
+        if job_id is not None and not bombe_jobs.cancel_job(job_id):
+            messagebox.showinfo("Cancel", f"Job #{job_id} has already finished.", parent=self)
+        self._refresh()
+
+    def _collect(self):
+        job_id = self._selected_job()
+        if job_id is None:
+            return
+        job = bombe_jobs.collect(job_id)
+        if job is None or job["status"] != "done":
+            messagebox.showinfo("Collect", (job or {}).get("error") or f"Job #{job_id} has no results yet.",
+                                parent=self)
+            return
+        self.bombe_window._show_bombe_results(job["results"])
+        self.bombe_window._last_ciphertext = job["ciphertext"]
+        self.bombe_window._last_pb_map = job["params"]["plugboard"]
+        self.bombe_window.progress_label.config(text=f"Results of job #{job_id}")
+
+    def _toggle_scheduler(self):
+        if self.run_here.get() and self.scheduler is None:
+            self.scheduler = bombe_jobs.Scheduler()
+            self._tick()
+        elif not self.run_here.get() and self.scheduler is not None:
+            # Stopped jobs go back to the queue and resume from their checkpoints
+            self.scheduler.stop()
+            self.scheduler = None
+            self._refresh()
+
+    def _tick(self):
+        if self.scheduler is None:
+            return
+        self.scheduler.step()
+        self._refresh()
+        self.after(1000, self._tick)
+
+    def _close(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+        self.destroy()
+
+
 # ---------------- Main launcher ----------------
 class MainApplication(tk.Tk):
     def __init__(self):